@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Local fake of the pump.fun chat Socket.IO endpoint.
+
+Speaks the subset of Engine.IO v4 / Socket.IO the bot uses (open packet,
+namespace connect, ``joinRoom`` / ``getMessageHistory`` acks, ping/pong)
+and pushes ``newMessage`` events to the joined rooms at a fixed total
+rate, either synthetic or replayed from a JSONL file of recorded message
+payloads:
+
+    python benchmarks/fake_chat_server.py --rooms 4 --rate 2000
+    PUMP_CHAT_URL=ws://127.0.0.1:8765 python main.py
+
+Every payload carries ``sent_at`` (server wall clock) so receivers can
+measure delivery latency. Synthetic traffic is seeded and reproducible.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+import websockets
+
+WORDS = ('gm', 'wen', 'moon', 'pump', 'dev', 'based', 'rug', 'send', 'it', 'lfg', 'chart', 'buy', 'sell',
+         'hold', 'ser', 'ngmi', 'wagmi', 'king', 'of', 'the', 'hill', 'raid', 'x', 'bonding', 'curve')
+
+
+class FakeChatServer:
+    """Socket.IO chat fake running on its own event loop thread"""
+
+    def __init__(self, rooms: List[str], rate: float = 100.0, host: str = '127.0.0.1', port: int = 0,
+                 source: Optional[str] = None, history: int = 20, seed: int = 0, ping_interval: int = 25000,
+                 message_length: int = 40):
+        self.rooms = list(rooms)
+        self.rate = rate
+        self.host = host
+        self.port = port
+        self.history_size = history
+        self.ping_interval = ping_interval
+        self.message_length = message_length
+        self.random = random.Random(seed)
+        self.recorded = self._load(source) if source else None
+
+        self.subscribers: Dict[str, set] = {room: set() for room in self.rooms}
+        self.history: Dict[str, List[Dict[str, Any]]] = {room: [] for room in self.rooms}
+        self.sent = {room: 0 for room in self.rooms}
+        self.connections = 0
+        self._sequence = itertools.count(1)
+        self._loop = None
+        self._thread = None
+        self._started = threading.Event()
+        self._stop_future = None
+        self._emitting = False
+
+    @staticmethod
+    def _load(path: str) -> List[Dict[str, Any]]:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/socket.io/?EIO=4&transport=websocket"
+
+    @property
+    def sent_total(self) -> int:
+        return sum(self.sent.values())
+
+    def _payload(self, room: str) -> Dict[str, Any]:
+        sequence = next(self._sequence)
+        if self.recorded:
+            payload = dict(self.recorded[(sequence - 1) % len(self.recorded)])
+        else:
+            user = self.random.randrange(500)
+            words = [self.random.choice(WORDS) for _ in range(self.random.randint(2, 10))]
+            payload = {
+                'username': f'user{user}',
+                'userAddress': f'addr{user:05d}',
+                'message': ' '.join(words)[:self.message_length]
+            }
+        payload.update({
+            'id': f'{room}-{sequence}',
+            'roomId': room,
+            'timestamp': int(time.time() * 1000),
+            'sent_at': time.time()
+        })
+        return payload
+
+    async def _handler(self, ws):
+        self.connections += 1
+        joined = set()
+        await ws.send('0' + json.dumps({'sid': f's{self.connections}', 'upgrades': [],
+                                        'pingInterval': self.ping_interval, 'pingTimeout': 20000}))
+        try:
+            async for frame in ws:
+                if frame.startswith('40'):
+                    await ws.send('40' + json.dumps({'sid': f'n{self.connections}'}))
+                elif frame == '2':
+                    await ws.send('3')
+                elif frame.startswith('42'):
+                    body = frame[2:]
+                    ack = ''
+                    while body and body[0].isdigit():
+                        ack, body = ack + body[0], body[1:]
+                    event, data = json.loads(body)[:2]
+                    room = (data or {}).get('roomId')
+                    if event == 'joinRoom' and room in self.subscribers:
+                        self.subscribers[room].add(ws)
+                        joined.add(room)
+                        reply = [{'ok': True}]
+                    elif event == 'getMessageHistory' and room in self.history:
+                        limit = (data or {}).get('limit') or self.history_size
+                        reply = [self.history[room][-limit:]]
+                    else:
+                        reply = [{}]
+                    if ack:
+                        await ws.send(f'43{ack}' + json.dumps(reply))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for room in joined:
+                self.subscribers[room].discard(ws)
+
+    async def _emit(self, tick: float = 0.005):
+        """Spread ``rate`` messages/s over the rooms in small ticks (credit carried between ticks)"""
+        credit = 0.0
+        last = time.perf_counter()
+        room_cycle = itertools.cycle(self.rooms)
+        while True:
+            await asyncio.sleep(tick)
+            now = time.perf_counter()
+            if not self._emitting:
+                last, credit = now, 0.0
+                continue
+            credit += (now - last) * self.rate
+            last = now
+            while credit >= 1 and self._emitting:
+                credit -= 1
+                room = next(room_cycle)
+                payload = self._payload(room)
+                history = self.history[room]
+                history.append(payload)
+                if len(history) > self.history_size:
+                    del history[0]
+                frame = '42' + json.dumps(['newMessage', payload])
+                for ws in list(self.subscribers[room]):
+                    try:
+                        await ws.send(frame)
+                    except websockets.ConnectionClosed:
+                        self.subscribers[room].discard(ws)
+                self.sent[room] += 1
+
+    async def _main(self):
+        self._stop_future = asyncio.get_running_loop().create_future()
+        async with websockets.serve(self._handler, self.host, self.port, max_queue=None,
+                                    compression=None) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            emitter = asyncio.create_task(self._emit())
+            self._started.set()
+            await self._stop_future
+            emitter.cancel()
+
+    def start(self, emitting: bool = True) -> 'FakeChatServer':
+        """Run in a daemon thread; returns once the port is bound"""
+        self._emitting = emitting
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._main(),),
+                                        name='fake-chat-server', daemon=True)
+        self._thread.start()
+        self._started.wait(10)
+        return self
+
+    def set_emitting(self, emitting: bool):
+        self._emitting = emitting
+
+    def subscribed(self) -> int:
+        return sum(len(s) for s in self.subscribers.values())
+
+    def stop(self):
+        if self._loop and self._stop_future:
+            self._loop.call_soon_threadsafe(self._stop_future.set_result, None)
+            self._thread.join(5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake pump.fun chat server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rooms', type=int, default=1, help='Number of synthetic rooms (room0, room1, ...)')
+    parser.add_argument('--room', action='append', help='Explicit room id (repeatable)')
+    parser.add_argument('--rate', type=float, default=100.0, help='Total messages per second across rooms')
+    parser.add_argument('--source', help='JSONL file of recorded newMessage payloads to replay')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rooms = args.room or [f'room{i}' for i in range(args.rooms)]
+    server = FakeChatServer(rooms, rate=args.rate, host=args.host, port=args.port,
+                            source=args.source, seed=args.seed).start()
+    print(f"Fake chat on {server.url} rooms={','.join(rooms)} rate={args.rate}/s")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"sent={server.sent_total} subscribers={server.subscribed()}")
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Local fake of the OpenAI chat-completions API with latency and error profiles.
+
+Point the bot at it through the OpenAI-compatible backend:
+
+    python benchmarks/fake_openai.py --port 8081 --latency lognormal:0.4,0.5 --error-rate 0.05
+    LLM_BACKEND=http LLM_BASE_URL=http://127.0.0.1:8081/v1 python main.py
+
+Latency profiles: ``fixed:S``, ``uniform:LOW,HIGH``, ``lognormal:MEDIAN,SIGMA``.
+Errors are drawn from ``--error-codes`` with probability ``--error-rate``;
+``stream: true`` requests get SSE chunks. The RNG is seeded.
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Optional
+
+
+class Profile:
+    """Latency and error draws shared by all request threads"""
+
+    def __init__(self, latency: str = 'fixed:0', error_rate: float = 0.0, error_codes: Optional[List[int]] = None,
+                 seed: int = 0, tokens_per_second: float = 0.0):
+        kind, _, values = latency.partition(':')
+        self.kind = kind
+        self.values = [float(v) for v in values.split(',') if v] or [0.0]
+        self.error_rate = error_rate
+        self.error_codes = error_codes or [500]
+        self.tokens_per_second = tokens_per_second
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'streams': 0}
+
+    def draw(self):
+        """(latency seconds, error status or None)"""
+        with self.lock:
+            self.stats['requests'] += 1
+            if self.kind == 'uniform':
+                latency = self.random.uniform(self.values[0], self.values[-1])
+            elif self.kind == 'lognormal':
+                sigma = self.values[1] if len(self.values) > 1 else 0.5
+                latency = self.random.lognormvariate(math.log(max(self.values[0], 1e-6)), sigma)
+            else:
+                latency = self.values[0]
+            error = None
+            if self.error_rate and self.random.random() < self.error_rate:
+                error = self.random.choice(self.error_codes)
+                self.stats['errors'] += 1
+        return latency, error
+
+
+def make_handler(profile: Profile):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _json(self, status: int, body: dict):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip('/').endswith('/models'):
+                self._json(200, {'object': 'list', 'data': [{'id': 'fake-model', 'object': 'model'}]})
+            else:
+                self._json(404, {'error': {'message': 'not found'}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._json(404, {'error': {'message': 'not found'}})
+                return
+
+            latency, error = profile.draw()
+            time.sleep(latency)
+            if error:
+                self._json(error, {'error': {'message': f'fake error {error}', 'type': 'fake'}})
+                return
+
+            prompt = ' '.join(str(m.get('content', '')) for m in request.get('messages', []))
+            prompt_tokens = max(1, len(prompt) // 4)
+            words = ['Chat', 'is', 'bullish', 'on', 'the', 'chart', 'and', 'asking', 'wen', 'moon.']
+            completion_tokens = min(request.get('max_tokens') or 64, len(words))
+            model = request.get('model', 'fake-model')
+
+            if request.get('stream'):
+                profile.stats['streams'] += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                delay = 1.0 / profile.tokens_per_second if profile.tokens_per_second else 0
+                for word in words[:completion_tokens]:
+                    chunk = {'model': model, 'choices': [{'index': 0, 'delta': {'content': word + ' '}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                    if delay:
+                        time.sleep(delay)
+                usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens}
+                self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+                return
+
+            self._json(200, {
+                'id': f'fake-{time.time_ns()}',
+                'object': 'chat.completion',
+                'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': ' '.join(words[:completion_tokens])}}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                          'total_tokens': prompt_tokens + completion_tokens}
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host: str = '127.0.0.1', port: int = 0, **profile_options) -> ThreadingHTTPServer:
+    """Start in a daemon thread; ``server.profile.stats`` counts requests and injected errors"""
+    profile = Profile(**profile_options)
+    server = ThreadingHTTPServer((host, port), make_handler(profile))
+    server.daemon_threads = True
+    server.profile = profile
+    threading.Thread(target=server.serve_forever, name='fake-openai', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake OpenAI chat-completions server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', default='fixed:0.2', help='fixed:S | uniform:LOW,HIGH | lognormal:MEDIAN,SIGMA')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-codes', default='429,500,503')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='Streaming pace (0 = no delay)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, latency=args.latency, error_rate=args.error_rate,
+                   error_codes=[int(c) for c in args.error_codes.split(',') if c],
+                   seed=args.seed, tokens_per_second=args.tokens_per_second)
+    print(f"Fake OpenAI on http://{args.host}:{server.server_port}/v1")
+    try:
+        while True:
+            time.sleep(5)
+            print(server.profile.stats)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
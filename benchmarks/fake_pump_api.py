@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the pump.fun frontend REST API.
+
+Serves ``GET /replies/<mint>`` with synthetic replies and ETag / 304
+handling, so the room meta fetcher can be exercised without hitting
+pump.fun:
+
+    python benchmarks/fake_pump_api.py --port 8090 --new-reply-every 2
+    PUMP_FRONTEND_API_URL=http://localhost:8090 python main.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+class ReplyStore:
+    """Synthetic replies per mint; a new reply appears every ``new_reply_every`` seconds"""
+
+    def __init__(self, users: int = 50, initial: int = 200, new_reply_every: float = 0.0):
+        self.users = users
+        self.initial = initial
+        self.new_reply_every = new_reply_every
+        self.started = time.time()
+        self.requests = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def version(self) -> int:
+        if self.new_reply_every <= 0:
+            return 0
+        return int((time.time() - self.started) / self.new_reply_every)
+
+    def replies(self, mint: str, version: int):
+        count = self.initial + version
+        return [
+            {
+                'mint': mint,
+                'user': f'user{i % self.users}',
+                'text': f'reply {i}',
+                'timestamp': int(self.started * 1000) + i
+            }
+            for i in range(count - 1, -1, -1)
+        ]
+
+
+def make_handler(store: ReplyStore, latency: float = 0.0):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip('/').split('/')
+            if len(parts) != 2 or parts[0] != 'replies':
+                self.send_error(404)
+                return
+            with store._lock:
+                store.requests += 1
+            if latency:
+                time.sleep(latency)
+
+            mint = parts[1]
+            version = store.version()
+            etag = f'"{mint}-{version}"'
+            if self.headers.get('If-None-Match') == etag:
+                with store._lock:
+                    store.not_modified += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            query = parse_qs(url.query)
+            limit = int(query.get('limit', ['1000'])[0])
+            replies = store.replies(mint, version)
+            body = json.dumps({'replies': replies[:limit], 'hasMore': len(replies) > limit}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, **store_options) -> ThreadingHTTPServer:
+    """Start the stub in a daemon thread; ``server.store`` holds the request counters"""
+    store = ReplyStore(**store_options)
+    server = ThreadingHTTPServer((host, port), make_handler(store, latency))
+    server.store = store
+    threading.Thread(target=server.serve_forever, name='fake-pump-api', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake pump.fun frontend API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--users', type=int, default=50, help='Distinct reply authors per mint')
+    parser.add_argument('--initial', type=int, default=200, help='Replies per mint at start')
+    parser.add_argument('--new-reply-every', type=float, default=0.0, help='Seconds between new replies (0 = static)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Added response latency in seconds')
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency, users=args.users, initial=args.initial,
+                   new_reply_every=args.new_reply_every)
+    print(f"Fake pump.fun API on http://{args.host}:{server.server_port}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"requests={server.store.requests} not_modified={server.store.not_modified}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
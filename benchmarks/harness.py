@@ -0,0 +1,203 @@
+"""
+Building blocks shared by the benchmark scenarios: the fake chat server in
+a child process (so its CPU does not compete with the bot for the GIL), the
+bot pipeline on a background event loop, and small measurement helpers.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def percentiles(values: List[float], points=(50, 95, 99), scale: float = 1000.0) -> Dict[str, Any]:
+    """Nearest-rank percentiles (milliseconds by default) plus count and max"""
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+    result = {'count': len(ordered)}
+    for point in points:
+        index = min(len(ordered) - 1, max(0, int(round(point / 100.0 * len(ordered))) - 1))
+        result[f'p{point}'] = round(ordered[index] * scale, 3)
+    result['max'] = round(ordered[-1] * scale, 3)
+    return result
+
+
+def rss_mb() -> float:
+    """Resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RssSampler:
+    """Samples RSS in a background thread; reports start/end/peak and the growth rate"""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def start(self) -> 'RssSampler':
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self.samples.append((time.perf_counter() - self.started, rss_mb()))
+            if self._stop.wait(self.interval):
+                break
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        times = [t for t, _ in self.samples]
+        values = [v for _, v in self.samples]
+        slope = 0.0
+        if len(values) > 1:
+            mean_t, mean_v = sum(times) / len(times), sum(values) / len(values)
+            var = sum((t - mean_t) ** 2 for t in times)
+            if var:
+                slope = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / var
+        return {
+            'rss_start_mb': round(values[0], 2),
+            'rss_end_mb': round(values[-1], 2),
+            'rss_peak_mb': round(max(values), 2),
+            'growth_mb_per_min': round(slope * 60, 3),
+            'samples': len(values)
+        }
+
+
+def _chat_server_main(rooms, rate, seed, source, conn):
+    from fake_chat_server import FakeChatServer
+
+    server = FakeChatServer(rooms, rate=rate, seed=seed, source=source).start(emitting=False)
+    conn.send(server.port)
+    while True:
+        command = conn.recv()
+        if command == 'subscribed':
+            conn.send(server.subscribed())
+        elif command == 'emit':
+            server.set_emitting(True)
+            conn.send(True)
+        elif command == 'pause':
+            server.set_emitting(False)
+            time.sleep(0.05)  # Let the emitter finish the frame it is sending
+            conn.send(server.sent_total)
+        elif command == 'stop':
+            server.set_emitting(False)
+            conn.send(server.sent_total)
+            server.stop()
+            return
+
+
+class ChatServerProcess:
+    """FakeChatServer in a child process, driven over a pipe"""
+
+    def __init__(self, rooms: List[str], rate: float, seed: int = 0, source: Optional[str] = None):
+        context = multiprocessing.get_context('spawn')
+        self._conn, child = context.Pipe()
+        self.process = context.Process(target=_chat_server_main, args=(rooms, rate, seed, source, child),
+                                       daemon=True)
+        self.process.start()
+        self.port = self._conn.recv()
+        self.rooms = rooms
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/socket.io/?EIO=4&transport=websocket"
+
+    def _ask(self, command: str):
+        self._conn.send(command)
+        return self._conn.recv()
+
+    def wait_subscribed(self, timeout: float = 15.0) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self._ask('subscribed') >= len(self.rooms):
+                return True
+            time.sleep(0.1)
+        return False
+
+    def emit(self):
+        self._ask('emit')
+
+    def pause(self) -> int:
+        return self._ask('pause')
+
+    def stop(self) -> int:
+        sent = self._ask('stop')
+        self.process.join(5)
+        return sent
+
+
+def bot_config(**overrides) -> Dict[str, Any]:
+    """Defaults of config.Config (as main.py passes them to BotCore) with overrides"""
+    from config import Config
+
+    config = dict(vars(Config()))
+    config.update(overrides)
+    return config
+
+
+class Pipeline:
+    """One BotCore per room on an event loop in a background thread"""
+
+    def __init__(self, rooms: List[str], config: Dict[str, Any]):
+        from src.bot_core import BotCore
+
+        self.bots = [BotCore(openai_key=config.get('OPENAI_API_KEY') or 'bench', token_address=room, config=config)
+                     for room in rooms]
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='bench-pipeline', daemon=True)
+        self._tasks = []
+
+    def start(self) -> 'Pipeline':
+        self._thread.start()
+        for bot in self.bots:
+            self._tasks.append(asyncio.run_coroutine_threadsafe(bot.start(), self.loop))
+        return self
+
+    def stop(self):
+        for bot in self.bots:
+            asyncio.run_coroutine_threadsafe(bot.stop(), self.loop).result(15)
+        for task in self._tasks:
+            try:
+                task.result(15)
+            except Exception:
+                pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+
+    def received(self) -> int:
+        return sum(bot.pumpChatClient.message_seq for bot in self.bots)
+
+    def traces(self):
+        """(reply latencies of analyzed messages, per-stage durations) from the tracers' rings.
+
+        A reply latency runs from frame receipt to the commit of the analysis
+        that included the message (see src/tracing.py).
+        """
+        replies, stages = [], {}
+        for bot in self.bots:
+            if not bot.tracer:
+                continue
+            for trace in list(bot.tracer.ring):
+                for stage, duration in trace['stages'].items():
+                    stages.setdefault(stage, []).append(duration)
+                if trace['outcome'] == 'ok':
+                    replies.append(trace['total'])
+        return replies, stages
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Benchmark scenarios for the full pipeline, run against local fakes only.
+
+    python benchmarks/run.py ingest --rooms 4 --rate 2000 --duration 10
+    python benchmarks/run.py e2e --latency lognormal:0.4,0.5 --error-rate 0.05
+    python benchmarks/run.py all --output results.json
+    python benchmarks/run.py all --output new.json --compare results.json
+
+Scenarios:
+  ingest  chat frames -> message history: throughput, loss, delivery latency
+  e2e     chat -> analysis commit with the fake OpenAI server: reply latency percentiles
+  memory  e2e load for a longer time: RSS start/end/peak and growth per minute
+  api     dashboard endpoints under concurrent clients while the bot runs: p50/p99, rps
+  replay  a CHAT_CAPTURE_PATH capture (--capture) fed to the chat client without a network
+  startup main.py from process start to listening HTTP and /api/ready, against the fakes
+  reconnect pause/resume of the chat client back to back: resume-to-connected time, failures
+
+Results are one JSON document; ``--compare`` prints the relative change of
+every numeric metric against an earlier run.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Any
+
+from harness import ROOT, percentiles, RssSampler, ChatServerProcess, Pipeline, bot_config
+import fake_openai
+
+
+def _rooms(args):
+    return [f'room{i}' for i in range(args.rooms)]
+
+
+def _overrides(args) -> Dict[str, Any]:
+    overrides = {}
+    for item in args.set or []:
+        key, _, value = item.partition('=')
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    return overrides
+
+
+def scenario_ingest(args) -> Dict[str, Any]:
+    """Chat client only: how many frames per second reach the message history, and how fast"""
+    from src.pump_chat_client import PumpChatClient
+
+    rooms = _rooms(args)
+    server = ChatServerProcess(rooms, args.rate, seed=args.seed, source=args.source)
+    latencies = []
+    sampler = random.Random(args.seed)
+
+    def listener(message):
+        sent_at = message.get('sent_at')
+        if sent_at is None:
+            return
+        # Reservoir of delivery latencies keeps memory flat at high rates
+        if len(latencies) < 100000:
+            latencies.append(time.time() - sent_at)
+        else:
+            index = sampler.randrange(len(latencies) * 2)
+            if index < len(latencies):
+                latencies[index] = time.time() - sent_at
+
+    clients = []
+    for room in rooms:
+        client = PumpChatClient(room, buffer_size=200, message_history_limit=args.history, chat_url=server.url)
+        client.add_message_listener(listener)
+        client.start()
+        clients.append(client)
+    try:
+        if not server.wait_subscribed():
+            raise RuntimeError('chat clients did not join their rooms')
+        cpu_started, started = time.process_time(), time.perf_counter()
+        server.emit()
+        time.sleep(args.duration)
+        sent = server.pause()
+        elapsed = time.perf_counter() - started
+        time.sleep(args.drain)
+        cpu = time.process_time() - cpu_started
+        received = sum(c.message_seq for c in clients)
+    finally:
+        for client in clients:
+            client.stop()
+        server.stop()
+
+    return {
+        'sent': sent,
+        'received': received,
+        'lost': max(0, sent - received),
+        'offered_msgs_per_s': round(sent / elapsed, 1),
+        'throughput_msgs_per_s': round(received / elapsed, 1),
+        'delivery_latency_ms': percentiles(latencies),
+        'cpu_seconds': round(cpu, 3),
+        'cpu_us_per_message': round(cpu / received * 1e6, 2) if received else None
+    }
+
+
+def _run_pipeline(args, duration: float, on_running=None) -> Dict[str, Any]:
+    """Chat fake + fake OpenAI + one BotCore per room; returns counters and trace latencies"""
+    rooms = _rooms(args)
+    llm = fake_openai.serve(latency=args.latency, error_rate=args.error_rate,
+                            error_codes=[int(c) for c in args.error_codes.split(',') if c], seed=args.seed)
+    server = ChatServerProcess(rooms, args.rate, seed=args.seed, source=args.source)
+    config = bot_config(
+        OPENAI_API_KEY='bench',
+        LLM_BACKEND='http',
+        LLM_BASE_URL=f'http://127.0.0.1:{llm.server_port}/v1',
+        PUMP_CHAT_URL=server.url,
+        MESSAGE_ARCHIVE_DIR='',
+        TRACE_ENABLED=True,
+        TRACE_CAPACITY=100000,
+        TRACE_OTLP_ENDPOINT='',
+        RATE_LIMIT_DELAY=0,
+        ANALYSIS_INTERVAL=args.analysis_interval,
+        **_overrides(args)
+    )
+    pipeline = Pipeline(rooms, config).start()
+    extra = {}
+    try:
+        if not server.wait_subscribed():
+            raise RuntimeError('bots did not join their rooms')
+        server.emit()
+        started = time.perf_counter()
+        if on_running:
+            extra = on_running(pipeline, duration) or {}
+        else:
+            time.sleep(duration)
+        sent = server.pause()
+        elapsed = time.perf_counter() - started
+        time.sleep(args.drain)
+        replies, stages = pipeline.traces()
+        result = {
+            'sent': sent,
+            'received': pipeline.received(),
+            'analyses': sum(b.total_analyses_performed for b in pipeline.bots),
+            'messages_analyzed': sum(b.total_messages_processed for b in pipeline.bots),
+            'llm_requests': llm.profile.stats['requests'],
+            'llm_injected_errors': llm.profile.stats['errors'],
+            'elapsed_seconds': round(elapsed, 3),
+            'reply_latency_ms': percentiles(replies),
+            'stage_latency_ms': {stage: percentiles(values) for stage, values in stages.items()},
+            **extra
+        }
+    finally:
+        pipeline.stop()
+        server.stop()
+        llm.shutdown()
+        llm.server_close()
+    return result
+
+
+def scenario_e2e(args) -> Dict[str, Any]:
+    """Socket frame to committed analysis through the real BotCore"""
+    return _run_pipeline(args, args.duration)
+
+
+def scenario_memory(args) -> Dict[str, Any]:
+    """Steady e2e load while sampling RSS"""
+    def run(pipeline, duration):
+        sampler = RssSampler(args.sample_interval).start()
+        time.sleep(duration)
+        return {'memory': sampler.stop()}
+
+    result = _run_pipeline(args, args.memory_duration, on_running=run)
+    return {
+        **result.pop('memory'),
+        'received': result['received'],
+        'analyses': result['analyses']
+    }
+
+
+def scenario_api(args) -> Dict[str, Any]:
+    """Dashboard endpoints hit by concurrent clients while the bot ingests and analyzes"""
+    import requests
+    from werkzeug.serving import make_server
+    from src.api_server import APIServer
+
+    endpoints = ['/api/status', '/api/messages?limit=50', '/api/analysis?limit=10', '/api/statistics', '/metrics']
+
+    def run(pipeline, duration):
+        app = APIServer(bot_core=pipeline.bots[0]).app
+        http = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=http.serve_forever, name='bench-api', daemon=True).start()
+        base = f'http://127.0.0.1:{http.server_port}'
+        latencies = {e: [] for e in endpoints}
+        errors = [0]
+        deadline = time.perf_counter() + duration
+
+        def client(offset):
+            session = requests.Session()
+            index = offset
+            while time.perf_counter() < deadline:
+                endpoint = endpoints[index % len(endpoints)]
+                index += 1
+                started = time.perf_counter()
+                try:
+                    response = session.get(base + endpoint, timeout=10)
+                    if response.status_code >= 400:
+                        errors[0] += 1
+                except Exception:
+                    errors[0] += 1
+                    continue
+                latencies[endpoint].append(time.perf_counter() - started)
+            session.close()
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        http.shutdown()
+        total = sum(len(v) for v in latencies.values())
+        everything = [x for v in latencies.values() for x in v]
+        return {
+            'api_requests': total,
+            'api_errors': errors[0],
+            'api_rps': round(total / duration, 1),
+            'api_latency_ms': percentiles(everything),
+            'api_endpoints_ms': {e: percentiles(v) for e, v in latencies.items()}
+        }
+
+    result = _run_pipeline(args, args.duration, on_running=run)
+    return {key: result[key] for key in ('api_requests', 'api_errors', 'api_rps', 'api_latency_ms',
+                                         'api_endpoints_ms', 'received', 'analyses')}
+
+
+def scenario_replay(args) -> Dict[str, Any]:
+    """Recorded frames into a fresh chat client: decode cost and a digest that must not change between runs"""
+    from src.capture import replay
+
+    if not args.capture:
+        return {'skipped': 'no --capture given'}
+    runs = [replay(args.capture, args.replay_speed, message_history_limit=args.history) for _ in range(args.repeat)]
+    elapsed = [r['elapsed_seconds'] for r in runs]
+    return {
+        'frames': runs[0]['frames'],
+        'messages': runs[0]['messages'],
+        'frames_per_second': round(runs[0]['frames'] / min(elapsed), 1) if min(elapsed) else None,
+        'elapsed_ms': percentiles(elapsed),
+        'deterministic': len({r['digest'] for r in runs}) == 1,
+        'digest': runs[0]['digest']
+    }
+
+
+def _wall(command, **kwargs) -> float:
+    started = time.perf_counter()
+    subprocess.run(command, check=True, **kwargs)
+    return time.perf_counter() - started
+
+
+def scenario_startup(args) -> Dict[str, Any]:
+    """Boot main.py repeatedly: imports, time until HTTP answers and until /api/ready is 200"""
+    import socket
+    import tempfile
+    import requests
+
+    llm = fake_openai.serve(latency=args.latency, seed=args.seed)
+    server = ChatServerProcess(['room0'], args.rate, seed=args.seed, source=args.source)
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    log_dir = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(os.environ,
+               OPENAI_API_KEY='bench', LLM_BACKEND='http', LLM_BASE_URL=f'http://127.0.0.1:{llm.server_port}/v1',
+               PUMP_CHAT_URL=server.url, PUMP_TOKEN_ADDRESS='room0', PUMP_TOKEN_ADDRESSES='',
+               SHARD_WORKERS='0', FLASK_HOST='127.0.0.1', FLASK_PORT=str(port),
+               LOG_FILE=os.path.join(log_dir, 'bot.log'), PUMP_META_POLL_INTERVAL='0', CHAT_CAPTURE_PATH='')
+
+    interpreter = [_wall([sys.executable, '-c', 'pass'], cwd=ROOT) for _ in range(args.repeat)]
+    imports = [_wall([sys.executable, '-c', 'import main'], cwd=ROOT, env=env) for _ in range(args.repeat)]
+    http_up, ready, timelines = [], [], []
+    try:
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            process = subprocess.Popen([sys.executable, 'main.py'], cwd=ROOT, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            up = None
+            deadline = started + 60
+            try:
+                while time.perf_counter() < deadline and process.poll() is None:
+                    try:
+                        response = requests.get(f'http://127.0.0.1:{port}/api/ready', timeout=1)
+                    except requests.RequestException:
+                        time.sleep(0.005)
+                        continue
+                    now = time.perf_counter()
+                    if up is None:
+                        up = now - started
+                        http_up.append(up)
+                    if response.status_code == 200:
+                        ready.append(now - started)
+                        timelines.append(response.json().get('startup') or {})
+                        break
+                    time.sleep(0.005)
+            finally:
+                process.terminate()
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+    finally:
+        server.stop()
+        llm.shutdown()
+        llm.server_close()
+
+    return {
+        'runs': args.repeat,
+        'failed': args.repeat - len(ready),
+        'interpreter_ms': percentiles(interpreter),
+        'import_main_ms': percentiles(imports),
+        'http_up_ms': percentiles(http_up),
+        'ready_ms': percentiles(ready),
+        'timeline_s': timelines[-1] if timelines else None
+    }
+
+
+def scenario_reconnect(args) -> Dict[str, Any]:
+    """Pause and resume the chat client without waiting for the old connection to wind down.
+
+    This is the dashboard pause/resume and music/normal mode switch path; a
+    cycle that never reconnects counts as a failure.
+    """
+    from src.pump_chat_client import PumpChatClient
+
+    server = ChatServerProcess(['room0'], args.rate, seed=args.seed, source=args.source)
+    client = PumpChatClient('room0', buffer_size=200, chat_url=server.url)
+    latencies, failures = [], 0
+    try:
+        client.start()
+        if not server.wait_subscribed():
+            raise RuntimeError('chat client did not join its room')
+        for _ in range(args.cycles):
+            client.set_paused(True)
+            started = time.perf_counter()
+            client.set_paused(False)
+            deadline = started + 10
+            while not client.is_connected and time.perf_counter() < deadline:
+                time.sleep(0.005)
+            if client.is_connected:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+    finally:
+        client.stop()
+        server.stop()
+
+    return {
+        'cycles': args.cycles,
+        'failures': failures,
+        'resume_to_connected_ms': percentiles(latencies)
+    }
+
+
+SCENARIOS = {
+    'ingest': scenario_ingest,
+    'e2e': scenario_e2e,
+    'memory': scenario_memory,
+    'api': scenario_api,
+    'replay': scenario_replay,
+    'startup': scenario_startup,
+    'reconnect': scenario_reconnect
+}
+
+
+def _environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+
+def _flatten(value, prefix=''):
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from _flatten(child, f'{prefix}.{key}' if prefix else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """Print every numeric metric present in both runs with its relative change"""
+    old = dict(_flatten(baseline.get('scenarios', {})))
+    print(f"{'metric':60} {'baseline':>12} {'current':>12} {'change':>9}")
+    for key, value in _flatten(current.get('scenarios', {})):
+        if key not in old or key.endswith('.params') or '.params.' in key:
+            continue
+        before = old[key]
+        change = f"{(value - before) / before * 100:+.1f}%" if before else 'n/a'
+        print(f"{key:60} {before:>12} {value:>12} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipeline benchmarks against local fakes')
+    parser.add_argument('scenario', choices=list(SCENARIOS) + ['all'])
+    parser.add_argument('--rooms', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=200.0, help='Total chat messages per second across rooms')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per scenario')
+    parser.add_argument('--memory-duration', type=float, default=60.0, help='Seconds of load for the memory scenario')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='RSS sampling interval')
+    parser.add_argument('--drain', type=float, default=2.0, help='Seconds to wait after the load stops')
+    parser.add_argument('--history', type=int, default=100, help='Message history limit of each chat client')
+    parser.add_argument('--source', help='JSONL of recorded newMessage payloads to replay instead of synthetic chat')
+    parser.add_argument('--latency', default='lognormal:0.3,0.4', help='Fake OpenAI latency profile')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fake OpenAI error probability')
+    parser.add_argument('--error-codes', default='429,500,503')
+    parser.add_argument('--analysis-interval', type=float, default=1.0)
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent API clients')
+    parser.add_argument('--cycles', type=int, default=20, help='Pause/resume cycles of the reconnect scenario')
+    parser.add_argument('--capture', help='Frame capture for the replay scenario')
+    parser.add_argument('--replay-speed', type=float, default=0.0, help='Replay speed (0 = as fast as possible)')
+    parser.add_argument('--repeat', type=int, default=3, help='Replay runs (their digests must match) / main.py boots')
+    parser.add_argument('--set', action='append', metavar='KEY=VALUE', help='Override a bot config value')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the JSON results here (default: stdout)')
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    names = list(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+    params = {k: v for k, v in vars(args).items() if k not in ('scenario', 'output', 'compare')}
+    results = {'version': 1, 'started_at': time.time(), 'environment': _environment(), 'params': params,
+               'scenarios': {}}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        results['scenarios'][name] = SCENARIOS[name](args)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
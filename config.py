@@ -10,15 +10,52 @@ class Config:
     OPENAI_API_KEY:         str = os.getenv('OPENAI_API_KEY')
     OPENAI_MODEL:           str = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
 
+    # LLM backends: openai | http (llama.cpp, vLLM, Ollama) | fake
+    LLM_BACKEND:            str = os.getenv('LLM_BACKEND', 'openai')
+    LLM_BASE_URL:           str = os.getenv('LLM_BASE_URL', 'http://localhost:8080/v1')
+    LLM_API_KEY:            str = os.getenv('LLM_API_KEY')
+    LLM_TIMEOUT:            float = float(os.getenv('LLM_TIMEOUT', 30))
+    LOW_PRIORITY_ROOMS:     str = os.getenv('LOW_PRIORITY_ROOMS', '')
+    LOW_PRIORITY_BACKEND:   str = os.getenv('LOW_PRIORITY_BACKEND', '')
+    LOW_PRIORITY_MODEL:     str = os.getenv('LOW_PRIORITY_MODEL', '')
+    FAKE_LLM_LATENCY:       float = float(os.getenv('FAKE_LLM_LATENCY', 0))
+    FAKE_LLM_FAIL_EVERY:    int = int(os.getenv('FAKE_LLM_FAIL_EVERY', 0))
+
+    # Hedged requests and circuit breaker
+    HEDGE_ENABLED:              bool = os.getenv('HEDGE_ENABLED', 'True').lower() == 'true'
+    HEDGE_PERCENTILE:           float = float(os.getenv('HEDGE_PERCENTILE', 95))
+    HEDGE_MIN_DELAY:            float = float(os.getenv('HEDGE_MIN_DELAY', 0.5))
+    HEDGE_INITIAL_DELAY:        float = float(os.getenv('HEDGE_INITIAL_DELAY', 3.0))
+    HEDGE_MODEL:                str = os.getenv('HEDGE_MODEL', '')
+    HEDGE_BACKEND:              str = os.getenv('HEDGE_BACKEND', '')
+    FALLBACK_MODEL:             str = os.getenv('FALLBACK_MODEL', '')
+    BREAKER_ERROR_THRESHOLD:    float = float(os.getenv('BREAKER_ERROR_THRESHOLD', 0.5))
+    BREAKER_WINDOW:             int = int(os.getenv('BREAKER_WINDOW', 20))
+    BREAKER_COOLDOWN:           float = float(os.getenv('BREAKER_COOLDOWN', 30))
+
     # Pump.Fun
     PUMP_TOKEN_ADDRESS:     str = os.getenv('PUMP_TOKEN_ADDRESS')
+    PUMP_TOKEN_ADDRESSES:   str = os.getenv('PUMP_TOKEN_ADDRESSES', '')
     PUMP_WEBSOCKET_URL:     str = os.getenv('PUMP_WEBSOCKET_URL', 'wss://frontend-api.pump.fun/socket.io/?EIO=4&transport=websocket')
+    CHAT_BACKOFF_BASE:      float = float(os.getenv('CHAT_BACKOFF_BASE', 1.0))
+    CHAT_BACKOFF_MAX:       float = float(os.getenv('CHAT_BACKOFF_MAX', 30.0))
+    CHAT_HEARTBEAT_INTERVAL: float = float(os.getenv('CHAT_HEARTBEAT_INTERVAL', 0))
+    CHAT_MAX_MISSED_PONGS:  int = int(os.getenv('CHAT_MAX_MISSED_PONGS', 2))
 
     # Flask
     FLASK_HOST:             str = os.getenv('FLASK_HOST', '0.0.0.0')
     FLASK_PORT:             int = int(os.getenv('FLASK_PORT', 5000))
     DEBUG:                  bool = os.getenv('DEBUG', 'False').lower() == 'true'
 
+    # API access: keys as "name:key:room1|room2" or "name:key:*", comma separated (empty - no auth);
+    # token buckets per client in requests/second (0 - unlimited)
+    API_KEYS:               str = os.getenv('API_KEYS', '')
+    API_AUTH_READS:         bool = os.getenv('API_AUTH_READS', 'False').lower() == 'true'
+    API_RATE_LIMIT:         float = float(os.getenv('API_RATE_LIMIT', 10.0))
+    API_RATE_BURST:         int = int(os.getenv('API_RATE_BURST', 20))
+    API_CONTROL_RATE_LIMIT: float = float(os.getenv('API_CONTROL_RATE_LIMIT', 0.5))
+    API_CONTROL_RATE_BURST: int = int(os.getenv('API_CONTROL_RATE_BURST', 5))
+
     # Bot
     CREATIVE:               int = int(os.getenv('CREATIVE', 1))
     MAX_RETRIES:            int = int(os.getenv('MAX_RETRIES', 2))
@@ -27,4 +64,107 @@ class Config:
     MAX_TOKEN_ANSVERS:      int = int(os.getenv('MAX_TOKEN_ANSVERS', 50))
     MESSAGE_BUFFER_SIZE:    int = int(os.getenv('MESSAGE_BUFFER_SIZE', 100))
     MAX_ANALYSIS_RESULTS:   int = int(os.getenv('MAX_ANALYSIS_RESULTS', 50))
+    MESSAGE_HISTORY_LIMIT:  int = int(os.getenv('MESSAGE_HISTORY_LIMIT', 100))
+
+    # Runtime configuration: JSON file of live-tunable settings, polled for changes (empty - API only)
+    RUNTIME_CONFIG_FILE:    str = os.getenv('RUNTIME_CONFIG_FILE', '')
+    RUNTIME_CONFIG_POLL:    float = float(os.getenv('RUNTIME_CONFIG_POLL', 2.0))
+    # Models OPENAI_MODEL/DEGRADED_MODEL may be switched to live (empty - the configured models only)
+    ALLOWED_MODELS:         str = os.getenv('ALLOWED_MODELS', '')
+
+    # Analysis triggers
+    ANALYSIS_BACKLOG_TRIGGER:       int = int(os.getenv('ANALYSIS_BACKLOG_TRIGGER', 6))
+    ANALYSIS_RATE_SPIKE:            float = float(os.getenv('ANALYSIS_RATE_SPIKE', 3.0))
+    ANALYSIS_MENTION_KEYWORDS:      str = os.getenv('ANALYSIS_MENTION_KEYWORDS', 'alien,bot')
+    ANALYSIS_MAX_LATENCY:           float = float(os.getenv('ANALYSIS_MAX_LATENCY', os.getenv('ANALYSIS_INTERVAL', 5)))
+    ANALYSIS_BACKLOG_DEBOUNCE:      float = float(os.getenv('ANALYSIS_BACKLOG_DEBOUNCE', 2))
+    ANALYSIS_RATE_SPIKE_DEBOUNCE:   float = float(os.getenv('ANALYSIS_RATE_SPIKE_DEBOUNCE', 5))
+    ANALYSIS_MENTION_DEBOUNCE:      float = float(os.getenv('ANALYSIS_MENTION_DEBOUNCE', 1))
+
+    # Message priority queue
+    PRIORITY_QUEUE_SIZE:            int = int(os.getenv('PRIORITY_QUEUE_SIZE', 200))
+    PRIORITY_MAX_AGE:               float = float(os.getenv('PRIORITY_MAX_AGE', 60))
+    PRIORITY_RECENCY_SCALE:         float = float(os.getenv('PRIORITY_RECENCY_SCALE', 10))
+
+    # Backpressure: queue watermarks, shed policy (lowest_priority | oldest | sample), degraded mode on loop lag
+    PRIORITY_LOW_WATERMARK:         float = float(os.getenv('PRIORITY_LOW_WATERMARK', 0.75))
+    SHED_POLICY:                    str = os.getenv('SHED_POLICY', 'lowest_priority')
+    SHED_SAMPLE_RATE:               float = float(os.getenv('SHED_SAMPLE_RATE', 0.25))
+    INBOX_MAX_SIZE:                 int = int(os.getenv('INBOX_MAX_SIZE', 1000))
+    LOOP_LAG_INTERVAL:              float = float(os.getenv('LOOP_LAG_INTERVAL', 0.5))
+    LOOP_LAG_DEGRADE:               float = float(os.getenv('LOOP_LAG_DEGRADE', 0.25))
+    LOOP_LAG_RECOVER:               float = float(os.getenv('LOOP_LAG_RECOVER', 0.05))
+    DEGRADED_HOLD:                  float = float(os.getenv('DEGRADED_HOLD', 30))
+    DEGRADED_BATCH_FACTOR:          float = float(os.getenv('DEGRADED_BATCH_FACTOR', 2.0))
+    DEGRADED_MODEL:                 str = os.getenv('DEGRADED_MODEL', '')
+
+    # Prompt modes: versioned JSON files (empty dir - the repo's prompts/), pinned versions as "normal=2,music=1"
+    PROMPTS_DIR:                    str = os.getenv('PROMPTS_DIR', '')
+    PROMPT_PINS:                    str = os.getenv('PROMPT_PINS', '')
+
+    # Prompt budgeting
+    PROMPT_TOKEN_BUDGET:            int = int(os.getenv('PROMPT_TOKEN_BUDGET', 400))
+    PROMPT_MAX_LINES:               int = int(os.getenv('PROMPT_MAX_LINES', 30))
+
+    # Conversation context
+    CONTEXT_EXCHANGES:              int = int(os.getenv('CONTEXT_EXCHANGES', 4))
+    CONTEXT_TOKEN_CEILING:          int = int(os.getenv('CONTEXT_TOKEN_CEILING', 1200))
+    SUMMARY_MODEL:                  str = os.getenv('SUMMARY_MODEL', '')
+    SUMMARY_MAX_TOKENS:             int = int(os.getenv('SUMMARY_MAX_TOKENS', 120))
+
+    # Persistence and batch jobs
+    MESSAGE_ARCHIVE_DIR:            str = os.getenv('MESSAGE_ARCHIVE_DIR', '')
+    BATCH_STATE_DIR:                str = os.getenv('BATCH_STATE_DIR', 'batch_state')
+
+    # Graceful shutdown: drain deadline and per-room checkpoints for restarts (empty dir - no checkpoints)
+    SHUTDOWN_TIMEOUT:               float = float(os.getenv('SHUTDOWN_TIMEOUT', 20.0))
+    CHECKPOINT_DIR:                 str = os.getenv('CHECKPOINT_DIR', 'state')
+
+    # Topic clustering and semantic dedup (needs numpy)
+    TOPIC_CLUSTERING:               bool = os.getenv('TOPIC_CLUSTERING', 'False').lower() == 'true'
+    EMBEDDING_BACKEND:              str = os.getenv('EMBEDDING_BACKEND', 'hashing')
+    EMBEDDING_MODEL:                str = os.getenv('EMBEDDING_MODEL', '')
+    EMBEDDING_CACHE_SIZE:           int = int(os.getenv('EMBEDDING_CACHE_SIZE', 4096))
+    TOPIC_CLUSTERS:                 int = int(os.getenv('TOPIC_CLUSTERS', 8))
+    DEDUP_THRESHOLD:                float = float(os.getenv('DEDUP_THRESHOLD', 0.9))
+
+    # Process pool for frame decoding (0 = decode on the websocket thread)
+    INGEST_WORKERS:                 int = int(os.getenv('INGEST_WORKERS', 0))
+    INGEST_BATCH_SIZE:              int = int(os.getenv('INGEST_BATCH_SIZE', 64))
+    INGEST_FLUSH_INTERVAL:          float = float(os.getenv('INGEST_FLUSH_INTERVAL', 0.05))
+
+    # Sharding of rooms across worker processes (0 = single process)
+    SHARD_WORKERS:                  int = int(os.getenv('SHARD_WORKERS', 0))
+    SHARD_HEARTBEAT_INTERVAL:       float = float(os.getenv('SHARD_HEARTBEAT_INTERVAL', 1.0))
+    SHARD_HEARTBEAT_TIMEOUT:        float = float(os.getenv('SHARD_HEARTBEAT_TIMEOUT', 10.0))
+    SHARD_RESPAWN:                  bool = os.getenv('SHARD_RESPAWN', 'True').lower() == 'true'
+
+    # Socket.IO endpoint of the chat (point it at benchmarks/fake_chat_server.py for load tests)
+    PUMP_CHAT_URL:                  str = os.getenv('PUMP_CHAT_URL', 'wss://livechat.pump.fun/socket.io/?EIO=4&transport=websocket')
+    # Raw frame capture for deterministic replays (python -m src.capture); {room} is replaced by the room
+    CHAT_CAPTURE_PATH:              str = os.getenv('CHAT_CAPTURE_PATH', '')
+
+    # pump.fun frontend API (participant and reply counts for the dashboard)
+    PUMP_FRONTEND_API_URL:          str = os.getenv('PUMP_FRONTEND_API_URL', 'https://frontend-api-v3.pump.fun')
+    PUMP_META_TTL:                  float = float(os.getenv('PUMP_META_TTL', 30.0))
+    PUMP_META_POLL_INTERVAL:        float = float(os.getenv('PUMP_META_POLL_INTERVAL', 15.0))
+
+    # Message tracing (OTLP export is off unless an endpoint is set)
+    TRACE_ENABLED:                  bool = os.getenv('TRACE_ENABLED', 'True').lower() == 'true'
+    TRACE_CAPACITY:                 int = int(os.getenv('TRACE_CAPACITY', 256))
+    TRACE_SAMPLE_RATE:              float = float(os.getenv('TRACE_SAMPLE_RATE', 1.0))
+    TRACE_OTLP_ENDPOINT:            str = os.getenv('TRACE_OTLP_ENDPOINT', '')
+
+    # Logging
+    LOG_LEVEL:                      str = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT:                     str = os.getenv('LOG_FORMAT', 'text')
+    LOG_FILE:                       str = os.getenv('LOG_FILE', 'bot.log')
+    LOG_MAX_BYTES:                  int = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT:               int = int(os.getenv('LOG_BACKUP_COUNT', 5))
+    LOG_QUEUE_SIZE:                 int = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    LOG_RATE_LIMITS:                str = os.getenv('LOG_RATE_LIMITS', 'src.pump_chat_client=20,src.chatgpt_client=20,werkzeug=50')
+
+    # Runtime profiling endpoints (/api/debug/profile), off by default
+    DEBUG_ENDPOINTS:                bool = os.getenv('DEBUG_ENDPOINTS', 'False').lower() == 'true'
+    DEBUG_TOKEN:                    str = os.getenv('DEBUG_TOKEN', '')
 
@@ -6,82 +6,168 @@ A real-time bot that analyzes pump.fun chat messages using ChatGPT-4o mini
 and provides a web dashboard for monitoring.
 """
 
+from src import startup  # first import: marks the boot time
+
 import asyncio
 import os
 import sys
-import signal
 import threading
 import logging
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from config import Config
-from src.bot_core import BotCore
-from src.api_server import APIServer
-from src.utils import setup_logging
+from src.utils import setup_logging, shutdown_logging
+from src.shutdown import ShutdownCoordinator
+
+# Flask, the LLM SDKs and the sharding machinery are imported where they are used,
+# so the chat connection is not waiting on imports it does not need
+if TYPE_CHECKING:
+    from src.bot_core import BotCore
+    from src.sharding import ShardCoordinator
+    from src.api_server import APIServer
 
 # Global variables for graceful shutdown
-bot_instance: Optional[BotCore] = None
-api_server: Optional[APIServer] = None
+bot_instance: Optional['BotCore'] = None
+coordinator: Optional['ShardCoordinator'] = None
+api_server: Optional['APIServer'] = None
 flask_thread: Optional[threading.Thread] = None
+http_ready = threading.Event()
 loop = None
 
-def signal_handler(signum, frame):
-    print(f"\nReceived signal {signum}. Shutting down gracefully...")
-    global bot_instance
+async def graceful_shutdown(shutdown: ShutdownCoordinator):
+    """Drain and checkpoint the bot (or the shard workers), then stop the API server"""
+    print("\nShutting down gracefully...")
     if bot_instance:
-        print("Stopping bot instance...")
-        asyncio.run_coroutine_threadsafe(bot_instance.stop(), loop)
+        print("Draining bot instance...")
+        shutdown.add_step('bot', bot_instance.shutdown)
+    if coordinator:
+        print("Stopping shard workers...")
+        shutdown.add_step('shards', lambda remaining: stop_shards(shutdown, remaining))
+    shutdown.add_step('api_server', lambda remaining: asyncio.to_thread(api_server.shutdown) if api_server else None)
+    report = await shutdown.run()
+    logging.getLogger(__name__).info(f"Shutdown report: {report}")
     if flask_thread and flask_thread.is_alive():
-        print("Waiting for Flask thread to finish...")
-        # Flask обычно завершается при закрытии основного процесса
-        # Можно добавить флаг остановки серверу, если он поддерживает
-    # Здесь можно добавить завершение других ресурсов
-    # Теперь завершаем цикл asyncio
-    loop.call_soon_threadsafe(loop.stop)
-    sys.exit(0)
-
-def run_flask_server(config: Config, bot_core_instance):
+        flask_thread.join(5)
+
+async def stop_shards(shutdown: ShutdownCoordinator, remaining: float):
+    """Stop the workers within ``remaining``; a second signal (or cancelling this step) terminates them"""
+    force = threading.Event()
+    forced = asyncio.ensure_future(shutdown.forced.wait())
+    forced.add_done_callback(lambda _: force.set())
+    try:
+        await asyncio.to_thread(coordinator.stop, remaining, force)
+    finally:
+        forced.cancel()
+
+def run_flask_server(config: Config, bot_core_instance, runtime_config=None):
     """Run Flask server in a separate thread"""
     global api_server
     
     try:
-        api_server = APIServer(bot_core=bot_core_instance)
+        from src.api_server import APIServer
+        from src.pump_meta import PumpMetaFetcher
+        from src.profiling import create_profiling_service
+        from src.api_access import create_access_control
+
+        # pump.fun frontend API data is fetched once here and shared by all dashboard viewers
+        meta_fetcher = PumpMetaFetcher(
+            base_url=config.PUMP_FRONTEND_API_URL,
+            ttl=config.PUMP_META_TTL,
+            poll_interval=config.PUMP_META_POLL_INTERVAL
+        )
+        api_server = APIServer(
+            bot_core=bot_core_instance,
+            meta_fetcher=meta_fetcher,
+            profiler=create_profiling_service(vars(config), loop),
+            runtime_config=runtime_config,
+            access=create_access_control(vars(config))
+        )
         print(f"🌐 Starting Flask server on {config.FLASK_HOST}:{config.FLASK_PORT}")
         print(f"📱 Dashboard: http://{config.FLASK_HOST}:{config.FLASK_PORT}")
         api_server.run(
             host=config.FLASK_HOST,
             port=config.FLASK_PORT,
-            debug=config.DEBUG
+            debug=config.DEBUG,
+            ready=http_ready
         )
     except Exception as e:
         print(f"❌ Error starting Flask server: {e}")
 
+def start_flask_thread(config: Config, bot_core_instance, runtime_config=None) -> threading.Thread:
+    """Start the API server thread; ``http_ready`` is set once it listens"""
+    thread = threading.Thread(
+        target=run_flask_server,
+        args=(config, bot_core_instance, runtime_config),
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+async def report_http_ready(timeout: float = 30.0):
+    """Log when the dashboard listens, without blocking the bot start"""
+    if await asyncio.to_thread(http_ready.wait, timeout):
+        startup.mark('http_ready')
+        logging.getLogger(__name__).info(f"API server ready after {startup.timeline()['http_ready']:.3f}s")
+    else:
+        logging.getLogger(__name__).warning("API server did not start listening")
+
+async def run_coordinator(config: Config, rooms, bot_config, shutdown: ShutdownCoordinator, runtime_config):
+    """Coordinator mode: rooms are sharded over SHARD_WORKERS worker processes"""
+    global coordinator, flask_thread
+    from src.sharding import ShardCoordinator
+
+    print(f"🧩 Sharding {len(rooms)} rooms over {config.SHARD_WORKERS} workers")
+    coordinator = ShardCoordinator(
+        openai_key=config.OPENAI_API_KEY,
+        rooms=rooms,
+        bot_config=bot_config,
+        workers=config.SHARD_WORKERS,
+        heartbeat_interval=config.SHARD_HEARTBEAT_INTERVAL,
+        heartbeat_timeout=config.SHARD_HEARTBEAT_TIMEOUT,
+        respawn=config.SHARD_RESPAWN
+    )
+    coordinator.start()
+    runtime_config.subscribe(coordinator.apply_config)
+    runtime_config.start()
+
+    flask_thread = start_flask_thread(config, coordinator, runtime_config)
+    asyncio.create_task(report_http_ready())
+
+    # Workers run on their own; the coordinator only supervises them
+    await shutdown.wait()
+
 async def main():
     """Main entry point"""
-    global bot_instance, flask_thread, loop
+    global bot_instance, coordinator, flask_thread, loop
     loop = asyncio.get_running_loop()
     
     # Setup logging
     logger = setup_logging()
     
-    # Setup signal handlers
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
     try:
         # Load configuration
         config = Config()
+        logger = setup_logging(vars(config))
+        startup.mark('config_loaded')
+
+        # SIGINT/SIGTERM only set an event; graceful_shutdown does the work on this loop
+        shutdown = ShutdownCoordinator(timeout=config.SHUTDOWN_TIMEOUT)
+        shutdown.install(loop)
         
         # Validate required environment variables
-        if not config.OPENAI_API_KEY:
+        if not config.OPENAI_API_KEY and config.LLM_BACKEND == 'openai':
             print("❌ Error: Please set OPENAI_API_KEY environment variable")
             print("💡 Copy env.example to .env and fill in your API key")
             sys.exit(1)
         
-        if not config.PUMP_TOKEN_ADDRESS:
+        rooms = [a.strip() for a in (config.PUMP_TOKEN_ADDRESSES or '').split(',') if a.strip()]
+        if not rooms and config.PUMP_TOKEN_ADDRESS:
+            rooms = [config.PUMP_TOKEN_ADDRESS]
+
+        if not rooms:
             print("❌ Error: Please set PUMP_TOKEN_ADDRESS environment variable")
             print("💡 Copy env.example to .env and set the token address")
             sys.exit(1)
@@ -90,44 +176,151 @@ async def main():
         
         # Create bot instance first
         print("🤖 Creating bot instance...")
+        bot_config = {
+            'CREATIVE':                 config.CREATIVE,
+            'MAX_RETRIES':              config.MAX_RETRIES,
+            'RATE_LIMIT_DELAY':         config.RATE_LIMIT_DELAY,
+            'ANALYSIS_INTERVAL':        config.ANALYSIS_INTERVAL,
+            'MAX_TOKEN_ANSVERS':        config.MAX_TOKEN_ANSVERS,
+            'MESSAGE_BUFFER_SIZE':      config.MESSAGE_BUFFER_SIZE,
+            'MAX_ANALYSIS_RESULTS':     config.MAX_ANALYSIS_RESULTS,
+            'MESSAGE_HISTORY_LIMIT':    config.MESSAGE_HISTORY_LIMIT,
+            'OPENAI_MODEL':             config.OPENAI_MODEL,
+
+            'LLM_BACKEND':              config.LLM_BACKEND,
+            'LLM_BASE_URL':             config.LLM_BASE_URL,
+            'LLM_API_KEY':              config.LLM_API_KEY,
+            'LLM_TIMEOUT':              config.LLM_TIMEOUT,
+            'LOW_PRIORITY_ROOMS':       config.LOW_PRIORITY_ROOMS,
+            'LOW_PRIORITY_BACKEND':     config.LOW_PRIORITY_BACKEND,
+            'LOW_PRIORITY_MODEL':       config.LOW_PRIORITY_MODEL,
+            'FAKE_LLM_LATENCY':         config.FAKE_LLM_LATENCY,
+            'FAKE_LLM_FAIL_EVERY':      config.FAKE_LLM_FAIL_EVERY,
+
+            'HEDGE_ENABLED':            config.HEDGE_ENABLED,
+            'HEDGE_PERCENTILE':         config.HEDGE_PERCENTILE,
+            'HEDGE_MIN_DELAY':          config.HEDGE_MIN_DELAY,
+            'HEDGE_INITIAL_DELAY':      config.HEDGE_INITIAL_DELAY,
+            'HEDGE_MODEL':              config.HEDGE_MODEL,
+            'HEDGE_BACKEND':            config.HEDGE_BACKEND,
+            'FALLBACK_MODEL':           config.FALLBACK_MODEL,
+            'BREAKER_ERROR_THRESHOLD':  config.BREAKER_ERROR_THRESHOLD,
+            'BREAKER_WINDOW':           config.BREAKER_WINDOW,
+            'BREAKER_COOLDOWN':         config.BREAKER_COOLDOWN,
+
+            'ANALYSIS_BACKLOG_TRIGGER':     config.ANALYSIS_BACKLOG_TRIGGER,
+            'ANALYSIS_RATE_SPIKE':          config.ANALYSIS_RATE_SPIKE,
+            'ANALYSIS_MENTION_KEYWORDS':    config.ANALYSIS_MENTION_KEYWORDS,
+            'ANALYSIS_MAX_LATENCY':         config.ANALYSIS_MAX_LATENCY,
+            'ANALYSIS_BACKLOG_DEBOUNCE':    config.ANALYSIS_BACKLOG_DEBOUNCE,
+            'ANALYSIS_RATE_SPIKE_DEBOUNCE': config.ANALYSIS_RATE_SPIKE_DEBOUNCE,
+            'ANALYSIS_MENTION_DEBOUNCE':    config.ANALYSIS_MENTION_DEBOUNCE,
+
+            'PRIORITY_QUEUE_SIZE':          config.PRIORITY_QUEUE_SIZE,
+            'PRIORITY_MAX_AGE':             config.PRIORITY_MAX_AGE,
+            'PRIORITY_RECENCY_SCALE':       config.PRIORITY_RECENCY_SCALE,
+
+            'PRIORITY_LOW_WATERMARK':       config.PRIORITY_LOW_WATERMARK,
+            'SHED_POLICY':                  config.SHED_POLICY,
+            'SHED_SAMPLE_RATE':             config.SHED_SAMPLE_RATE,
+            'INBOX_MAX_SIZE':               config.INBOX_MAX_SIZE,
+            'LOOP_LAG_INTERVAL':            config.LOOP_LAG_INTERVAL,
+            'LOOP_LAG_DEGRADE':             config.LOOP_LAG_DEGRADE,
+            'LOOP_LAG_RECOVER':             config.LOOP_LAG_RECOVER,
+            'DEGRADED_HOLD':                config.DEGRADED_HOLD,
+            'DEGRADED_BATCH_FACTOR':        config.DEGRADED_BATCH_FACTOR,
+            'DEGRADED_MODEL':               config.DEGRADED_MODEL,
+
+            'PROMPTS_DIR':                  config.PROMPTS_DIR,
+            'PROMPT_PINS':                  config.PROMPT_PINS,
+            'PROMPT_TOKEN_BUDGET':          config.PROMPT_TOKEN_BUDGET,
+            'PROMPT_MAX_LINES':             config.PROMPT_MAX_LINES,
+
+            'CONTEXT_EXCHANGES':            config.CONTEXT_EXCHANGES,
+            'CONTEXT_TOKEN_CEILING':        config.CONTEXT_TOKEN_CEILING,
+            'SUMMARY_MODEL':                config.SUMMARY_MODEL,
+            'SUMMARY_MAX_TOKENS':           config.SUMMARY_MAX_TOKENS,
+
+            'MESSAGE_ARCHIVE_DIR':          config.MESSAGE_ARCHIVE_DIR,
+            'CHECKPOINT_DIR':               config.CHECKPOINT_DIR,
+            'SHUTDOWN_TIMEOUT':             config.SHUTDOWN_TIMEOUT,
+
+            'TOPIC_CLUSTERING':             config.TOPIC_CLUSTERING,
+            'EMBEDDING_BACKEND':            config.EMBEDDING_BACKEND,
+            'EMBEDDING_MODEL':              config.EMBEDDING_MODEL,
+            'EMBEDDING_CACHE_SIZE':         config.EMBEDDING_CACHE_SIZE,
+            'TOPIC_CLUSTERS':               config.TOPIC_CLUSTERS,
+            'DEDUP_THRESHOLD':              config.DEDUP_THRESHOLD,
+
+            'INGEST_WORKERS':               config.INGEST_WORKERS,
+            'INGEST_BATCH_SIZE':            config.INGEST_BATCH_SIZE,
+            'INGEST_FLUSH_INTERVAL':        config.INGEST_FLUSH_INTERVAL,
+
+            'PUMP_CHAT_URL':                config.PUMP_CHAT_URL,
+            'CHAT_CAPTURE_PATH':            config.CHAT_CAPTURE_PATH,
+            'CHAT_BACKOFF_BASE':            config.CHAT_BACKOFF_BASE,
+            'CHAT_BACKOFF_MAX':             config.CHAT_BACKOFF_MAX,
+            'CHAT_HEARTBEAT_INTERVAL':      config.CHAT_HEARTBEAT_INTERVAL,
+            'CHAT_MAX_MISSED_PONGS':        config.CHAT_MAX_MISSED_PONGS,
+
+            'TRACE_ENABLED':                config.TRACE_ENABLED,
+            'TRACE_CAPACITY':               config.TRACE_CAPACITY,
+            'TRACE_SAMPLE_RATE':            config.TRACE_SAMPLE_RATE,
+            'TRACE_OTLP_ENDPOINT':          config.TRACE_OTLP_ENDPOINT,
+
+            'LOG_LEVEL':                    config.LOG_LEVEL,
+            'LOG_FORMAT':                   config.LOG_FORMAT,
+            'LOG_FILE':                     config.LOG_FILE,
+            'LOG_MAX_BYTES':                config.LOG_MAX_BYTES,
+            'LOG_BACKUP_COUNT':             config.LOG_BACKUP_COUNT,
+            'LOG_QUEUE_SIZE':               config.LOG_QUEUE_SIZE,
+            'LOG_RATE_LIMITS':              config.LOG_RATE_LIMITS,
+
+            'RUNTIME_CONFIG_FILE':          config.RUNTIME_CONFIG_FILE,
+            'RUNTIME_CONFIG_POLL':          config.RUNTIME_CONFIG_POLL
+        }
+
+        # Live settings: the file (if any) overrides the environment from the start
+        from src.runtime_config import create_runtime_config
+        runtime_config = create_runtime_config(bot_config)
+        bot_config.update(runtime_config.values)
+        if bot_config['LOG_LEVEL'] != config.LOG_LEVEL:
+            logging.getLogger().setLevel(bot_config['LOG_LEVEL'])
+
+        if config.SHARD_WORKERS > 0:
+            await run_coordinator(config, rooms, bot_config, shutdown, runtime_config)
+            await graceful_shutdown(shutdown)
+            return
+
+        if len(rooms) > 1:
+            logger.warning(f"{len(rooms)} rooms configured but SHARD_WORKERS=0: only {rooms[0]} is served, "
+                           f"ignoring {', '.join(rooms[1:])}")
+        from src.bot_core import BotCore
         bot_instance = BotCore(
             openai_key=config.OPENAI_API_KEY,
-            token_address=config.PUMP_TOKEN_ADDRESS,
-            config={
-                'CREATIVE':                 config.CREATIVE,
-                'MAX_RETRIES':              config.MAX_RETRIES,
-                'RATE_LIMIT_DELAY':         config.RATE_LIMIT_DELAY,
-                'ANALYSIS_INTERVAL':        config.ANALYSIS_INTERVAL,
-                'MAX_TOKEN_ANSVERS':        config.MAX_TOKEN_ANSVERS,
-                'MESSAGE_BUFFER_SIZE':      config.MESSAGE_BUFFER_SIZE,
-                'MAX_ANALYSIS_RESULTS':     config.MAX_ANALYSIS_RESULTS,
-                'OPENAI_MODEL':             config.OPENAI_MODEL
-            }
-        )
-        
-        # Start Flask server in background thread with bot instance
-        flask_thread = threading.Thread(
-            target=run_flask_server,
-            args=(config, bot_instance),
-            daemon=True
+            token_address=rooms[0],
+            config=bot_config
         )
-        flask_thread.start()
+        startup.mark('bot_created')
+        runtime_config.subscribe(bot_instance.apply_config)
+        runtime_config.start()
         
-        # Give Flask a moment to start
-        import time
-        time.sleep(2)
+        # Flask starts in the background; readiness is reported by http_ready and /api/ready
+        flask_thread = start_flask_thread(config, bot_instance, runtime_config)
+        asyncio.create_task(report_http_ready())
         
-        # Start the bot (blocking)
+        # Run the bot until it stops by itself or a shutdown is requested
         print("🤖 Starting bot main loop...")
-        try:
-            success = await bot_instance.start()
-            if not success:
-                print("❌ Failed to start bot")
+        bot_task = asyncio.create_task(bot_instance.start())
+        await asyncio.wait([bot_task, asyncio.create_task(shutdown.wait())],
+                           return_when=asyncio.FIRST_COMPLETED)
+        if not shutdown.requested.is_set():
+            if bot_task.exception() or not bot_task.result():
+                print(f"❌ Failed to start bot: {bot_task.exception() or bot_instance.last_error}")
                 sys.exit(1)
-        except Exception as e:
-            print(f"❌ Error starting bot: {e}")
-            logger.exception("Error starting bot")
-            sys.exit(1)
+            return
+        await graceful_shutdown(shutdown)
+        await asyncio.wait([bot_task], timeout=5)
         
     except KeyboardInterrupt:
         print("\n👋 Shutting down...")
@@ -135,6 +328,9 @@ async def main():
         print(f"❌ Unexpected error: {e}")
         logger.exception("Unexpected error in main")
         sys.exit(1)
+    finally:
+        # Flush the log queue last, after every shutdown step has logged
+        shutdown_logging()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,216 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, FrozenSet
+
+from .metrics import API_REJECTED
+
+logger = logging.getLogger(__name__)
+
+ALL_ROOMS = '*'
+# Probes and the Prometheus scrape are never authenticated or limited
+OPEN_PATHS = ('/api/health', '/api/ready')
+# Profiling endpoints: their own X-Debug-Token (src/profiling.py) if set, else a ``*`` key
+DEBUG_PREFIX = '/api/debug/profile'
+# Control routes that act on the room named by ``room`` in the body; every other control
+# route (live config, prompt reloads, profiling) acts on all rooms
+ROOM_BODY_PATHS = ('/api/pause', '/api/resume', '/api/mode')
+# Writes that change cost (model, token limits, prompts): refused outright while API_KEYS is empty
+KEYED_PATHS = ('/api/config', '/api/prompts/reload')
+
+
+class ApiKey:
+    """One operator key and the rooms it may control (``*`` - every room and global settings)"""
+
+    def __init__(self, name: str, rooms: FrozenSet[str]):
+        self.name = name
+        self.rooms = rooms
+
+    @property
+    def is_global(self) -> bool:
+        return ALL_ROOMS in self.rooms
+
+    def allows(self, room: Optional[str]) -> bool:
+        """``room`` None means the request acts on every room"""
+        return self.is_global or (room is not None and room in self.rooms)
+
+
+def parse_api_keys(value: str) -> Dict[str, ApiKey]:
+    """``"ops:s3cret:*,alice:k2:roomA|roomB"`` -> ``{sha256(key): ApiKey}``.
+
+    Only digests are kept, so a lookup compares fixed-length hashes and
+    the raw keys do not linger in memory dumps or status output.
+    """
+    keys = {}
+    for item in (value or '').split(','):
+        parts = item.strip().split(':')
+        if len(parts) != 3 or not all(p.strip() for p in parts):
+            if item.strip():
+                logger.error(f"Ignoring malformed API key entry (expected name:key:rooms): {parts[0]}")
+            continue
+        name, key, rooms = (p.strip() for p in parts)
+        keys[_digest(key)] = ApiKey(name, frozenset(r.strip() for r in rooms.split('|') if r.strip()))
+    return keys
+
+
+def _digest(key: str) -> str:
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets kept in an in-process store.
+
+    Every client gets ``burst`` tokens refilled at ``rate`` per second.
+    The store is ordered by last use and only holds clients seen within
+    the refill window (``burst / rate`` seconds): an older bucket is full
+    again, so dropping it changes nothing. ``max_clients`` caps the store
+    when many addresses show up at once. A rate of 0 disables the limiter.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self.window = self.burst / rate if rate > 0 else 0
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client: str, now: Optional[float] = None) -> float:
+        """Take a token; returns 0 when allowed, else the seconds until one is available"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            self._evict(now)
+        return retry_after
+
+    def _evict(self, now: float):
+        # Oldest first: stop at the first client still inside the window
+        while self._buckets:
+            _, updated = next(iter(self._buckets.values()))
+            if now - updated < self.window and len(self._buckets) <= self.max_clients:
+                break
+            self._buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AccessControl:
+    """Authentication, room scopes and rate limits of the HTTP API.
+
+    Control requests (every POST under ``/api/``) need a key from
+    ``API_KEYS`` once any key is configured; reads only with ``auth_reads``.
+    A scoped key may act only on its rooms, named by the ``room`` body
+    field of pause/resume/mode or the ``/api/rooms/<address>`` path;
+    everything else (all rooms, live config, prompt reloads, profiling
+    without a debug token) needs a ``*`` key; with no keys at all, live
+    config and prompt reloads are refused. Reads and
+    control requests have separate buckets per client: the key name when
+    one is presented, otherwise the remote address. Everything here runs
+    in the HTTP thread before the route, so a rejected request never
+    reaches the bot.
+    """
+
+    def __init__(self, keys: Dict[str, ApiKey], read_limiter: TokenBucketLimiter,
+                 control_limiter: TokenBucketLimiter, auth_reads: bool = False, debug_token: bool = False):
+        self.keys = keys
+        self.debug_token = debug_token
+        self.read_limiter = read_limiter
+        self.control_limiter = control_limiter
+        self.auth_reads = auth_reads and bool(keys)
+        self.rejected: Dict[str, int] = {'rate_limited': 0, 'unauthorized': 0, 'forbidden': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.keys)
+
+    def identify(self, headers) -> Tuple[Optional[ApiKey], bool]:
+        """(key, presented): the key from ``X-API-Key`` or ``Authorization: Bearer``"""
+        presented = headers.get('X-API-Key', '')
+        if not presented:
+            scheme, _, token = headers.get('Authorization', '').partition(' ')
+            presented = token.strip() if scheme.lower() == 'bearer' else ''
+        if not presented:
+            return None, False
+        return self.keys.get(_digest(presented)), True
+
+    def check(self, path: str, method: str, headers, remote_addr: Optional[str],
+              room_of) -> Optional[Tuple[int, str, float]]:
+        """None to let the request through, else ``(status, error, retry_after)``.
+
+        ``room_of()`` returns the room the request targets; it is only
+        called for scoped keys, so the body is not parsed for anyone else.
+        """
+        if not path.startswith('/api/') or path in OPEN_PATHS:
+            return None
+        debug = path.startswith(DEBUG_PREFIX)
+        # Without a debug token, profiling reads are as sensitive as the controls
+        control = method not in ('GET', 'HEAD', 'OPTIONS') or (debug and not self.debug_token)
+        key, presented = self.identify(headers) if self.keys else (None, False)
+
+        client = f'key:{key.name}' if key else f'ip:{remote_addr}'
+        retry_after = (self.control_limiter if control else self.read_limiter).acquire(client)
+        if retry_after:
+            return self._reject('rate_limited', 429, 'Rate limit exceeded', retry_after)
+
+        if not self.keys and control and path in KEYED_PATHS:
+            return self._reject('forbidden', 403, 'Set API_KEYS to change settings or prompts over the API')
+        # Profiling with a debug token is checked against X-Debug-Token by its routes
+        if not self.keys or (debug and self.debug_token) or not (control or self.auth_reads):
+            return None
+        if key is None:
+            return self._reject('unauthorized', 401, 'Invalid API key' if presented else 'API key required')
+        if key.is_global:
+            return None
+        room = room_of()
+        if room is None and not control:
+            # Aggregate reads are open to every key
+            return None
+        if not key.allows(room):
+            return self._reject('forbidden', 403, f"Key {key.name} is not allowed for "
+                                                  f"{'room ' + room if room else 'all rooms'}")
+        return None
+
+    def _reject(self, reason: str, status: int, error: str, retry_after: float = 0.0) -> Tuple[int, str, float]:
+        self.rejected[reason] += 1
+        API_REJECTED.labels(reason).inc()
+        return status, error, retry_after
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'auth': self.enabled,
+            'auth_reads': self.auth_reads,
+            'keys': sorted(key.name for key in self.keys.values()),
+            'read_limit': {'rate': self.read_limiter.rate, 'burst': self.read_limiter.burst,
+                           'clients': len(self.read_limiter)},
+            'control_limit': {'rate': self.control_limiter.rate, 'burst': self.control_limiter.burst,
+                              'clients': len(self.control_limiter)},
+            'rejected': dict(self.rejected)
+        }
+
+
+def create_access_control(config: Dict[str, Any]) -> AccessControl:
+    """AccessControl from API_KEYS and the API_*RATE_* settings"""
+    keys = parse_api_keys(config.get('API_KEYS', ''))
+    if not keys:
+        logger.warning("API_KEYS is empty: control endpoints are unauthenticated, "
+                       "live config and prompt reloads over the API are disabled")
+    return AccessControl(
+        keys,
+        read_limiter=TokenBucketLimiter(config.get('API_RATE_LIMIT', 10.0), config.get('API_RATE_BURST', 20)),
+        control_limiter=TokenBucketLimiter(config.get('API_CONTROL_RATE_LIMIT', 0.5),
+                                           config.get('API_CONTROL_RATE_BURST', 5)),
+        auth_reads=config.get('API_AUTH_READS', False),
+        debug_token=bool(config.get('DEBUG_TOKEN'))
+    )
@@ -1,20 +1,94 @@
-from flask import Flask, jsonify, render_template, request, Response
+from flask import Flask, jsonify, render_template, request, Response, g
 import logging
+import time
 from typing import Optional, Dict, Any
 import json
+import math
 import os
+import threading
+
+from .metrics import API_LATENCY, CONTENT_TYPE
+from .api_access import ROOM_BODY_PATHS
 
 logger = logging.getLogger(__name__)
 
 class APIServer:
     """Flask REST API server for the pump.fun bot"""
     
-    def __init__(self, bot_core=None):
+    def __init__(self, bot_core=None, meta_fetcher=None, profiler=None, runtime_config=None, access=None):
         template_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), './site')
         self.app = Flask(__name__, template_folder=template_folder)
         self.bot_core = bot_core
+        self.meta_fetcher = meta_fetcher
+        self.http_server = None
+        self.profiler = profiler  # src.profiling.ProfilingService, None - эндпоинты профилирования выключены
+        self.runtime_config = runtime_config  # src.runtime_config.RuntimeConfig, None - /api/config выключен
+        self.access = access  # src.api_access.AccessControl, None - без ключей и лимитов
+        if meta_fetcher and bot_core:
+            meta_fetcher.track(bot_core.token_address.split(','))
+            meta_fetcher.start()
         self._setup_routes()
+        self._setup_profiling_routes()
+        self._setup_config_routes()
+        self._setup_prompt_routes()
+        self._setup_instrumentation()
+        self._setup_access_control()
+
+    def _setup_instrumentation(self):
+        """Record per-route request latency"""
+
+        @self.app.before_request
+        def start_timer():
+            g.request_started = time.perf_counter()
+
+        @self.app.after_request
+        def record_latency(response):
+            started = g.get('request_started')
+            if started is not None:
+                route = request.url_rule.rule if request.url_rule else 'unmatched'
+                API_LATENCY.labels(route, request.method, response.status_code).observe(
+                    time.perf_counter() - started
+                )
+            return response
     
+    def _setup_access_control(self):
+        """API keys, room scopes and per-client rate limits, checked before any route runs"""
+        if not self.access:
+            return
+
+        def room_of() -> Optional[str]:
+            if request.view_args and request.view_args.get('address'):
+                return request.view_args['address']
+            if request.path not in ROOM_BODY_PATHS:
+                # Global actions (config, prompt reloads): a room in the body does not scope them
+                return None
+            body = request.get_json(silent=True)
+            return body.get('room') if isinstance(body, dict) else None
+
+        @self.app.before_request
+        def check_access():
+            rejection = self.access.check(request.path, request.method, request.headers,
+                                          request.remote_addr, room_of)
+            if rejection is None:
+                return None
+            status, error, retry_after = rejection
+            response = jsonify({
+                'success': False,
+                'error': error
+            })
+            response.status_code = status
+            if retry_after:
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response
+
+        @self.app.route('/api/access')
+        def get_access():
+            """Auth mode, key names, limits and rejection counters"""
+            return jsonify({
+                'success': True,
+                'data': self.access.get_status()
+            })
+
     def _serve_js_file(self, filename: str) -> Response:
         """Serve JavaScript file with proper content type"""
         try:
@@ -50,7 +124,7 @@ class APIServer:
                     }
                 )
 
-            print("FILE:", path_file, os.path.exists(path_file))
+            logger.debug("Serving %s", path_file)
             if os.path.exists(path_file):
                 with open(path_file, 'r', encoding='utf-8') as f:
                     file__content = f.read()
@@ -249,6 +323,106 @@ class APIServer:
                     'error': str(e)
                 }), 500
         
+        @self.app.route('/api/rooms/<address>/topics')
+        def get_room_topics(address):
+            """Get topic clusters of a room"""
+            try:
+                if not self.bot_core:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Bot not initialized'
+                    })
+                if address not in self.bot_core.token_address.split(','):
+                    return jsonify({
+                        'success': False,
+                        'error': 'Unknown room'
+                    }), 404
+                topics = self.bot_core.get_topics(address)
+                if topics is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Topic clustering is disabled'
+                    }), 404
+                return jsonify({
+                    'success': True,
+                    'data': topics
+                })
+            except Exception as e:
+                logger.error(f"Error getting topics: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+        
+        @self.app.route('/api/rooms/<address>/meta')
+        def get_room_meta(address):
+            """Cached pump.fun reply and participant counts of a room"""
+            try:
+                if not self.bot_core or not self.meta_fetcher:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Bot not initialized'
+                    })
+                if address not in self.bot_core.token_address.split(','):
+                    return jsonify({
+                        'success': False,
+                        'error': 'Unknown room'
+                    }), 404
+                meta = self.meta_fetcher.get(address)
+                if meta is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'pump.fun API unavailable'
+                    }), 503
+                return jsonify({
+                    'success': True,
+                    'data': meta
+                })
+            except Exception as e:
+                logger.error(f"Error getting room meta: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+        
+        @self.app.route('/metrics')
+        def metrics():
+            """Prometheus metrics"""
+            try:
+                if not self.bot_core:
+                    return Response('', status=503, content_type=CONTENT_TYPE)
+                return Response(self.bot_core.get_metrics(), content_type=CONTENT_TYPE)
+            except Exception as e:
+                logger.error(f"Error rendering metrics: {e}")
+                return Response(f'# error: {e}\n', status=500, content_type=CONTENT_TYPE)
+        
+        @self.app.route('/api/debug/traces')
+        def get_traces():
+            """Per-stage latency and the slowest message traces"""
+            try:
+                if not self.bot_core:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Bot not initialized'
+                    })
+                limit = request.args.get('limit', 20, type=int)
+                traces = self.bot_core.get_traces(limit)
+                if traces is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Tracing is disabled'
+                    }), 404
+                return jsonify({
+                    'success': True,
+                    'data': traces
+                })
+            except Exception as e:
+                logger.error(f"Error getting traces: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+        
         @self.app.route('/api/health')
         def health_check():
             """Health check endpoint"""
@@ -257,12 +431,35 @@ class APIServer:
                 'timestamp': self._get_timestamp()
             })
         
+        @self.app.route('/api/ready')
+        def readiness_check():
+            """Readiness (chat connected, model checked), unlike /api/health which only means the process serves HTTP"""
+            if not self.bot_core:
+                return jsonify({
+                    'ready': False,
+                    'error': 'Bot not initialized'
+                }), 503
+            try:
+                readiness = self.bot_core.get_readiness()
+            except Exception as e:
+                logger.error(f"Error getting readiness: {e}")
+                return jsonify({
+                    'ready': False,
+                    'error': str(e)
+                }), 503
+            return jsonify(readiness), 200 if readiness.get('ready') else 503
+        
         @self.app.route('/api/pause', methods=['POST'])
         def pause_bot():
-            """Pause the bot"""
+            """Pause every room, or one with ``room``"""
             try:
                 if self.bot_core:
-                    self.bot_core.pause()
+                    room = (request.get_json(silent=True) or {}).get('room')
+                    if self.bot_core.pause(room) is None:
+                        return jsonify({
+                            'success': False,
+                            'error': f'Unknown room: {room}'
+                        }), 404
                     return jsonify({
                         'success': True,
                         'message': 'Bot paused successfully'
@@ -281,10 +478,15 @@ class APIServer:
         
         @self.app.route('/api/resume', methods=['POST'])
         def resume_bot():
-            """Resume the bot"""
+            """Resume every room, or one with ``room``"""
             try:
                 if self.bot_core:
-                    self.bot_core.resume()
+                    room = (request.get_json(silent=True) or {}).get('room')
+                    if self.bot_core.resume(room) is None:
+                        return jsonify({
+                            'success': False,
+                            'error': f'Unknown room: {room}'
+                        }), 404
                     return jsonify({
                         'success': True,
                         'message': 'Bot resumed successfully'
@@ -303,11 +505,23 @@ class APIServer:
             
         @self.app.route('/api/mode', methods=['POST'])
         def mode_bot():
-            """Mode the bot"""
+            """Switch the prompt mode of every room, or of one with ``room``"""
             try:
                 if request.is_json:
                     mode = request.json.get('mode', False)
-                    self.bot_core._change_mode(mode)
+                    room = request.json.get('room')
+                    try:
+                        changed = self.bot_core._change_mode(mode, room)
+                    except ValueError as e:
+                        return jsonify({
+                            'success': False,
+                            'error': str(e)
+                        }), 400
+                    if changed is None:
+                        return jsonify({
+                            'success': False,
+                            'error': f'Unknown room: {room}'
+                        }), 404
                     return jsonify({
                         'success': True,
                         'message': 'Mode change successfully: ' + mode
@@ -355,12 +569,266 @@ class APIServer:
                 'error': 'Internal server error'
             }), 500
     
+    def _profiler_guard(self):
+        """Error response unless profiling is enabled and the debug token matches"""
+        if not self.profiler:
+            return jsonify({
+                'success': False,
+                'error': 'Profiling endpoints are disabled'
+            }), 404
+        token = self.profiler.token
+        if token and request.headers.get('X-Debug-Token') != token:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid debug token'
+            }), 403
+        return None
+
+    def _setup_profiling_routes(self):
+        """Runtime CPU, allocation and event loop profiling (DEBUG_ENDPOINTS)"""
+
+        @self.app.route('/api/debug/profile')
+        def get_profile_status():
+            """State of the CPU profiler, tracemalloc and the loop monitor"""
+            denied = self._profiler_guard()
+            if denied:
+                return denied
+            return jsonify({
+                'success': True,
+                'data': self.profiler.get_stats()
+            })
+
+        @self.app.route('/api/debug/profile/<tool>/start', methods=['POST'])
+        def start_profile(tool):
+            """Start a tool: cpu {interval, duration}, memory {frames}, loop {interval, slow_threshold}"""
+            denied = self._profiler_guard()
+            if denied:
+                return denied
+            options = request.get_json(silent=True) or {}
+            try:
+                if tool == 'cpu':
+                    started = self.profiler.cpu.start(options.get('interval'), options.get('duration'))
+                elif tool == 'memory':
+                    started = self.profiler.memory.start(int(options.get('frames', 1)))
+                elif tool == 'loop':
+                    started = self.profiler.loop_monitor.start(options.get('interval'), options.get('slow_threshold'))
+                else:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Unknown profiler: {tool}'
+                    }), 404
+                return jsonify({
+                    'success': True,
+                    'message': f'{tool} profiler started' if started else f'{tool} profiler already running'
+                })
+            except Exception as e:
+                logger.error(f"Error starting {tool} profiler: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+
+        @self.app.route('/api/debug/profile/<tool>/stop', methods=['POST'])
+        def stop_profile(tool):
+            """Stop a tool; CPU samples stay readable until the next start"""
+            denied = self._profiler_guard()
+            if denied:
+                return denied
+            tools = {'cpu': self.profiler.cpu, 'memory': self.profiler.memory, 'loop': self.profiler.loop_monitor}
+            if tool not in tools:
+                return jsonify({
+                    'success': False,
+                    'error': f'Unknown profiler: {tool}'
+                }), 404
+            tools[tool].stop()
+            return jsonify({
+                'success': True,
+                'message': f'{tool} profiler stopped'
+            })
+
+        @self.app.route('/api/debug/profile/cpu')
+        def get_cpu_profile():
+            """Collapsed stacks (?format=collapsed, flamegraph.pl / speedscope input) or top functions"""
+            denied = self._profiler_guard()
+            if denied:
+                return denied
+            cpu = self.profiler.cpu
+            if request.args.get('format') == 'collapsed':
+                return Response(cpu.collapsed(), mimetype='text/plain', headers={
+                    'Content-Disposition': f'attachment; filename=cpu-{int(time.time())}.folded'
+                })
+            return jsonify({
+                'success': True,
+                'data': {
+                    **cpu.get_stats(),
+                    'top': cpu.top(request.args.get('limit', 20, type=int))
+                }
+            })
+
+        @self.app.route('/api/debug/profile/memory')
+        def get_memory_diff():
+            """Allocation growth per site since the last snapshot (?group_by=traceback for call stacks)"""
+            denied = self._profiler_guard()
+            if denied:
+                return denied
+            memory = self.profiler.memory
+            if not memory.running:
+                return jsonify({
+                    'success': False,
+                    'error': 'tracemalloc is not running'
+                }), 409
+            group_by = 'traceback' if request.args.get('group_by') == 'traceback' else 'lineno'
+            return jsonify({
+                'success': True,
+                'data': {
+                    **memory.get_stats(),
+                    'diff': memory.diff(request.args.get('limit', 20, type=int), group_by)
+                }
+            })
+
+        @self.app.route('/api/debug/profile/memory/snapshot', methods=['POST'])
+        def take_memory_snapshot():
+            """Largest allocation sites; the snapshot becomes the baseline of later diffs"""
+            denied = self._profiler_guard()
+            if denied:
+                return denied
+            memory = self.profiler.memory
+            if not memory.running:
+                return jsonify({
+                    'success': False,
+                    'error': 'tracemalloc is not running'
+                }), 409
+            return jsonify({
+                'success': True,
+                'data': memory.snapshot(request.args.get('limit', 20, type=int))
+            })
+
+        @self.app.route('/api/debug/profile/loop')
+        def get_loop_lag():
+            """Event loop lag percentiles and recent slow callbacks with the blocking stack"""
+            denied = self._profiler_guard()
+            if denied:
+                return denied
+            return jsonify({
+                'success': True,
+                'data': self.profiler.loop_monitor.get_stats()
+            })
+
+    def _setup_config_routes(self):
+        """Live settings (src/runtime_config.py)"""
+
+        @self.app.route('/api/config')
+        def get_config():
+            """Current live settings, the tunable names and recent changes"""
+            if not self.runtime_config:
+                return jsonify({
+                    'success': False,
+                    'error': 'Runtime configuration is disabled'
+                }), 404
+            return jsonify({
+                'success': True,
+                'data': self.runtime_config.get_status()
+            })
+
+        @self.app.route('/api/config', methods=['POST'])
+        def update_config():
+            """Validate and apply a JSON object of settings, all or nothing"""
+            if not self.runtime_config:
+                return jsonify({
+                    'success': False,
+                    'error': 'Runtime configuration is disabled'
+                }), 404
+            updates = request.get_json(silent=True)
+            try:
+                result = self.runtime_config.update(updates, source='api')
+            except Exception as e:
+                logger.error(f"Error updating config: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+            if result['errors']:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid settings',
+                    'errors': result['errors']
+                }), 400
+            return jsonify({
+                'success': True,
+                'data': result
+            })
+
+    def _setup_prompt_routes(self):
+        """Prompt modes (src/prompts.py)"""
+
+        @self.app.route('/api/prompts')
+        def get_prompts():
+            """Active version of every mode, the versions on disk and the mode of each room"""
+            try:
+                return jsonify({
+                    'success': True,
+                    'data': self.bot_core.get_prompts()
+                })
+            except Exception as e:
+                logger.error(f"Error getting prompts: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+
+        @self.app.route('/api/prompts/reload', methods=['POST'])
+        def reload_prompts():
+            """Re-read the prompt files; ``{"pins": {"normal": 1}}`` selects versions"""
+            body = request.get_json(silent=True) or {}
+            pins = body.get('pins')
+            if pins is not None and not (isinstance(pins, dict)
+                                         and all(isinstance(v, int) and not isinstance(v, bool) for v in pins.values())):
+                return jsonify({
+                    'success': False,
+                    'error': 'pins must map modes to version numbers'
+                }), 400
+            try:
+                changed = self.bot_core.reload_prompts(pins)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            except Exception as e:
+                logger.error(f"Error reloading prompts: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+            return jsonify({
+                'success': True,
+                'data': {'changed': changed}
+            })
+
     def _get_timestamp(self) -> str:
         """Get current timestamp"""
         from datetime import datetime
         return datetime.now().isoformat()
     
-    def run(self, host: str = '0.0.0.0', port: int = 5000, debug: bool = False):
-        """Run the Flask server"""
+    def run(self, host: str = '0.0.0.0', port: int = 5000, debug: bool = False,
+            ready: Optional[threading.Event] = None):
+        """Run the Flask server (blocking); ``ready`` is set as soon as the socket listens"""
+        from werkzeug.serving import make_server
+
         logger.info(f"Starting Flask server on {host}:{port}")
-        self.app.run(host=host, port=port, debug=debug, threaded=True)
\ No newline at end of file
+        self.app.debug = debug
+        self.http_server = make_server(host, port, self.app, threaded=True)
+        if ready:
+            ready.set()
+        self.http_server.serve_forever()
+
+    def shutdown(self):
+        """Stop a server started with ``run`` and its background helpers"""
+        if self.http_server:
+            self.http_server.shutdown()
+        if self.meta_fetcher:
+            self.meta_fetcher.stop()
+        if self.profiler:
+            self.profiler.stop()
+        if self.runtime_config:
+            self.runtime_config.stop()
\ No newline at end of file
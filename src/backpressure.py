@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Event loop lag measured from inside the loop.
+
+    A task sleeps ``interval`` seconds at a time; whatever it oversleeps is
+    time other callbacks held the loop. The lag is smoothed with an EWMA so
+    a single slow callback does not flip the bot into degraded mode.
+    """
+
+    ALPHA = 0.3
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = max(0.01, interval)
+        self.lag = 0.0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, on_sample=None):
+        """Start on the running loop; ``on_sample(lag)`` is called after every measurement"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(on_sample))
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self, on_sample):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.lag += self.ALPHA * (lag - self.lag)
+            self.samples += 1
+            if on_sample:
+                on_sample(self.lag)
+
+
+class BackpressureController:
+    """Switches a room into degraded mode while the pipeline can't keep up.
+
+    Degraded mode is entered when the smoothed loop lag reaches
+    ``LOOP_LAG_DEGRADE`` or the analysis queue is shedding, and left once
+    the lag is below ``LOOP_LAG_RECOVER`` and the queue has drained for
+    ``DEGRADED_HOLD`` seconds. While degraded, analyses take
+    ``DEGRADED_BATCH_FACTOR`` times larger batches (fewer LLM calls for the
+    same backlog) on ``DEGRADED_MODEL`` when one is set.
+    """
+
+    def __init__(self, config: Dict[str, Any], message_queue, room: str = ''):
+        self.room = room
+        self.queue = message_queue
+        self.monitor = LoopLagMonitor(config.get('LOOP_LAG_INTERVAL', 0.5))
+        self.degrade_lag = config.get('LOOP_LAG_DEGRADE', 0.25)
+        self.recover_lag = config.get('LOOP_LAG_RECOVER', 0.05)
+        self.hold = config.get('DEGRADED_HOLD', 30.0)
+        self.degraded_batch_factor = max(1.0, config.get('DEGRADED_BATCH_FACTOR', 2.0))
+        self.degraded_model = config.get('DEGRADED_MODEL') or None
+
+        self.degraded = False
+        self.reason = None
+        self.degraded_since = None
+        self.degraded_seconds = 0.0
+        self.episodes = 0
+        self._calm_since = None
+
+    def start(self):
+        self.monitor.start(self.evaluate)
+
+    def stop(self):
+        self.monitor.stop()
+
+    def configure(self, config: Dict[str, Any]):
+        """Apply changed thresholds; the mode itself flips on the next evaluation"""
+        self.degrade_lag = config.get('LOOP_LAG_DEGRADE', self.degrade_lag)
+        self.recover_lag = config.get('LOOP_LAG_RECOVER', self.recover_lag)
+        self.hold = config.get('DEGRADED_HOLD', self.hold)
+        if 'DEGRADED_BATCH_FACTOR' in config:
+            self.degraded_batch_factor = max(1.0, config['DEGRADED_BATCH_FACTOR'])
+        if 'DEGRADED_MODEL' in config:
+            self.degraded_model = config['DEGRADED_MODEL'] or None
+
+    def evaluate(self, lag: Optional[float] = None):
+        """Update the mode from the current lag and queue state"""
+        lag = self.monitor.lag if lag is None else lag
+        now = time.monotonic()
+        shedding = self.queue.shedding
+        if not self.degraded:
+            if lag >= self.degrade_lag or shedding:
+                self.degraded = True
+                self.reason = 'loop_lag' if lag >= self.degrade_lag else 'queue_full'
+                self.degraded_since = now
+                self._calm_since = None
+                self.episodes += 1
+                logger.warning(f"[{self.room}] Degraded mode on ({self.reason}, loop lag {lag * 1000:.0f} ms): "
+                               f"batches x{self.degraded_batch_factor:g}, model {self.degraded_model or 'unchanged'}")
+            return
+        if lag >= self.recover_lag or shedding:
+            self._calm_since = None
+            return
+        if self._calm_since is None:
+            self._calm_since = now
+        elif now - self._calm_since >= self.hold:
+            self.degraded = False
+            self.degraded_seconds += now - self.degraded_since
+            self.degraded_since = None
+            self.reason = None
+            logger.info(f"[{self.room}] Degraded mode off (loop lag {lag * 1000:.0f} ms)")
+
+    @property
+    def batch_factor(self) -> float:
+        return self.degraded_batch_factor if self.degraded else 1.0
+
+    @property
+    def model(self) -> Optional[str]:
+        """Model override for the next analysis (None - the room's normal route)"""
+        return self.degraded_model if self.degraded else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        current = time.monotonic() - self.degraded_since if self.degraded_since else 0.0
+        return {
+            'degraded': self.degraded,
+            'reason': self.reason,
+            'episodes': self.episodes,
+            'degraded_seconds': round(self.degraded_seconds + current, 1),
+            'loop_lag_ms': round(self.monitor.lag * 1000, 3),
+            'loop_lag_last_ms': round(self.monitor.last_lag * 1000, 3),
+            'loop_lag_max_ms': round(self.monitor.max_lag * 1000, 3),
+            'queue_shedding': self.queue.shedding
+        }
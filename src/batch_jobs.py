@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from .chatgpt_client import ChatGPTClient
+from .llm_backends import OpenAIBackend
+from .message_archive import MessageArchive
+
+logger = logging.getLogger(__name__)
+
+
+class BatchJobRunner:
+    """Offline re-analysis of archived chat.
+
+    A job covers a time range of one room's archive. The messages are packed
+    into token-budgeted chunks, each chunk becomes one ``ChatGPTClient``
+    prompt, and the prompts are submitted either through the OpenAI Batch API
+    or a concurrency-limited async fan-out. Job state is written to
+    ``<state_dir>/<job_id>.json`` after every change, so an interrupted job
+    resumes where it stopped. Results are appended to the room's
+    ``analyses.jsonl`` next to the live analyses.
+    """
+
+    def __init__(self, chatgpt_client: ChatGPTClient, archive: MessageArchive, state_dir: str,
+                 concurrency: int = 4, poll_interval: float = 30.0):
+        self.chatgpt_client = chatgpt_client
+        self.archive = archive
+        self.state_dir = state_dir
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        os.makedirs(state_dir, exist_ok=True)
+
+    # Job state
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, f'{job_id}.json')
+
+    def save(self, job: Dict[str, Any]):
+        """Atomically persist job state"""
+        job['updated_at'] = time.time()
+        path = self._state_path(job['job_id'])
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def load(self, job_id: str) -> Dict[str, Any]:
+        with open(self._state_path(job_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def create_job(self, room_id: str, since: Optional[float], until: Optional[float],
+                   mode: str = 'normal', chunk_tokens: int = 400, max_lines: int = 30) -> Dict[str, Any]:
+        """Split the archived range into prompt-sized chunks and persist the job"""
+        messages = self.archive.load_messages(room_id, since, until)
+        budget = max(0, chunk_tokens - self.chatgpt_client.prompt_tokens(mode))
+
+        chunks = []
+        lines, used = [], 0
+        for message in messages:
+            line = f"{message.get('username') or message.get('user') or 'Unknown'} + {message.get('message') or ''}"
+            tokens = self.chatgpt_client.count_line_tokens(line, mode)
+            if lines and (used + tokens > budget or len(lines) >= max_lines):
+                chunks.append(lines)
+                lines, used = [], 0
+            lines.append(line)
+            used += tokens
+        if lines:
+            chunks.append(lines)
+
+        job = {
+            'job_id': uuid.uuid4().hex[:12],
+            'room_id': room_id,
+            'since': since,
+            'until': until,
+            'mode': mode,
+            'status': 'pending',
+            'created_at': time.time(),
+            'openai_batch_id': None,
+            'chunks': [
+                {'index': i, 'lines': chunk, 'status': 'pending', 'result': None, 'error': None}
+                for i, chunk in enumerate(chunks)
+            ]
+        }
+        self.save(job)
+        logger.info(f"Created batch job {job['job_id']}: {len(messages)} messages in {len(chunks)} chunks")
+        return job
+
+    # Execution
+
+    async def run(self, job: Dict[str, Any], use_batch_api: bool = False) -> Dict[str, Any]:
+        """Run (or resume) a job until every chunk is done or failed"""
+        job['status'] = 'running'
+        self.save(job)
+
+        if use_batch_api and isinstance(self.chatgpt_client.backend, OpenAIBackend):
+            await self._run_batch_api(job)
+        else:
+            if use_batch_api:
+                logger.warning("Batch API needs the OpenAI backend, using async fan-out instead")
+            await self._run_fanout(job)
+
+        failed = sum(1 for c in job['chunks'] if c['status'] == 'failed')
+        job['status'] = 'completed' if not failed else 'completed_with_errors'
+        self.save(job)
+        return job
+
+    async def _run_fanout(self, job: Dict[str, Any]):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        client = self.chatgpt_client
+
+        async def run_chunk(chunk):
+            request = client.build_request(chunk['lines'], job['mode'])
+            if request is None:
+                chunk['status'] = 'skipped'
+                return
+            params = client.request_params(job['mode'])
+            async with semaphore:
+                for attempt in range(max(1, client.max_retries)):
+                    try:
+                        response = await client.backend.complete(request, **params)
+                        self._complete_chunk(job, chunk, response.content)
+                        return
+                    except Exception as e:
+                        chunk['error'] = str(e)
+                        await asyncio.sleep(2 ** attempt)
+                chunk['status'] = 'failed'
+                self.save(job)
+
+        await asyncio.gather(*(
+            run_chunk(chunk) for chunk in job['chunks'] if chunk['status'] in ('pending', 'failed')
+        ))
+
+    async def _run_batch_api(self, job: Dict[str, Any]):
+        client = self.chatgpt_client
+        openai_client = client.backend.client
+
+        if not job.get('openai_batch_id'):
+            buffer = io.BytesIO()
+            for chunk in job['chunks']:
+                if chunk['status'] == 'done':
+                    continue
+                request = client.build_request(chunk['lines'], job['mode'])
+                if request is None:
+                    chunk['status'] = 'skipped'
+                    continue
+                chunk['status'] = 'pending'
+                buffer.write(json.dumps({
+                    'custom_id': f"{job['job_id']}-{chunk['index']}",
+                    'method': 'POST',
+                    'url': '/v1/chat/completions',
+                    'body': {'messages': request, **client.request_params(job['mode'])}
+                }, ensure_ascii=False).encode('utf-8') + b'\n')
+
+            if not buffer.getvalue():
+                logger.info(f"Job {job['job_id']} has nothing left to submit")
+                return
+            input_file = await openai_client.files.create(
+                file=(f"{job['job_id']}.jsonl", buffer.getvalue()), purpose='batch'
+            )
+            batch = await openai_client.batches.create(
+                input_file_id=input_file.id,
+                endpoint='/v1/chat/completions',
+                completion_window='24h'
+            )
+            job['openai_batch_id'] = batch.id
+            self.save(job)
+            logger.info(f"Submitted OpenAI batch {batch.id} for job {job['job_id']}")
+
+        # Poll until OpenAI finishes the batch (also the resume path)
+        while True:
+            batch = await openai_client.batches.retrieve(job['openai_batch_id'])
+            if batch.status in ('completed', 'failed', 'expired', 'cancelled'):
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        chunks = {f"{job['job_id']}-{c['index']}": c for c in job['chunks']}
+        for file_id, ok in ((batch.output_file_id, True), (batch.error_file_id, False)):
+            if not file_id:
+                continue
+            content = await openai_client.files.content(file_id)
+            for line in content.text.splitlines():
+                record = json.loads(line)
+                chunk = chunks.get(record.get('custom_id'))
+                if chunk is None or chunk['status'] == 'done':
+                    continue
+                body = (record.get('response') or {}).get('body') or {}
+                if ok and body.get('choices'):
+                    self._complete_chunk(job, chunk, body['choices'][0]['message']['content'])
+                else:
+                    chunk['status'] = 'failed'
+                    chunk['error'] = json.dumps(record.get('error') or body.get('error'))
+
+        for chunk in job['chunks']:
+            if chunk['status'] == 'pending':
+                chunk['status'] = 'failed'
+                chunk['error'] = f"Batch finished with status {batch.status}"
+
+        # The batch is finished and read: a resume submits a new one for the chunks not done
+        job.setdefault('finished_batch_ids', []).append(job['openai_batch_id'])
+        job['openai_batch_id'] = None
+        self.save(job)
+
+    def _complete_chunk(self, job: Dict[str, Any], chunk: Dict[str, Any], content: str):
+        chunk['status'] = 'done'
+        chunk['result'] = content
+        chunk['error'] = None
+        self.archive.append_analysis(job['room_id'], {
+            'timestamp': time.time(),
+            'datetime': datetime.now().isoformat(),
+            'message_count': len(chunk['lines']),
+            'analysis': content,
+            'token_address': job['room_id'],
+            'source': 'batch',
+            'job_id': job['job_id'],
+            'chunk': chunk['index']
+        })
+        self.save(job)
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+async def _main(args):
+    from config import Config
+
+    config = Config()
+    config_dict = {key: getattr(config, key) for key in config.__dataclass_fields__}
+    client = ChatGPTClient(api_key=config.OPENAI_API_KEY, model=config.OPENAI_MODEL, config=config_dict)
+    archive = MessageArchive(config.MESSAGE_ARCHIVE_DIR or 'archive')
+    runner = BatchJobRunner(client, archive, config.BATCH_STATE_DIR, concurrency=args.concurrency)
+
+    if args.resume:
+        job = runner.load(args.resume)
+    else:
+        job = runner.create_job(
+            args.room or config.PUMP_TOKEN_ADDRESS,
+            _parse_time(args.since),
+            _parse_time(args.until),
+            mode=args.mode,
+            chunk_tokens=config.PROMPT_TOKEN_BUDGET,
+            max_lines=config.PROMPT_MAX_LINES
+        )
+
+    try:
+        job = await runner.run(job, use_batch_api=args.batch_api)
+    finally:
+        archive.close()
+        await client.close()
+    done = sum(1 for c in job['chunks'] if c['status'] == 'done')
+    print(f"Job {job['job_id']}: {job['status']} ({done}/{len(job['chunks'])} chunks)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk re-analysis of archived pump.fun chat')
+    parser.add_argument('--room', help='Token address (defaults to PUMP_TOKEN_ADDRESS)')
+    parser.add_argument('--since', help='Start of range: unix timestamp or ISO datetime')
+    parser.add_argument('--until', help='End of range: unix timestamp or ISO datetime')
+    parser.add_argument('--mode', default='normal', help='Prompt mode')
+    parser.add_argument('--batch-api', action='store_true', help='Submit through the OpenAI Batch API')
+    parser.add_argument('--concurrency', type=int, default=4, help='Parallel requests in fan-out mode')
+    parser.add_argument('--resume', metavar='JOB_ID', help='Resume an interrupted job')
+    asyncio.run(_main(parser.parse_args()))
@@ -3,12 +3,25 @@ import logging
 from typing import List, Dict, Any, Optional
 from collections import deque
 from datetime import datetime
+import threading
 import time
 
 # from .pump_connector import PumpFunConnector
 from .pump_chat_client import PumpChatClient
 from .chatgpt_client import ChatGPTClient
-from .utils import format_message_for_analysis, get_timestamp
+from .scheduler import AnalysisScheduler
+from .priority_queue import MessagePriorityQueue
+from .message_archive import MessageArchive
+from .frame_pool import FrameDecoderPool
+from .capture import FrameCapture
+from .checkpoint import RoomCheckpoint
+from .snapshots import SnapshotLog
+from .tracing import create_tracer
+from .backpressure import BackpressureController
+from .metrics import REGISTRY, QUEUE_DEPTH, INGEST_TO_ANALYSIS, ANALYSES, MESSAGES_SHED, LOOP_LAG, DEGRADED
+from .log_pipeline import get_logging_stats
+from . import startup
+from .utils import format_message_for_analysis, get_timestamp, parse_keywords
 
 # import pprint
 
@@ -23,9 +36,41 @@ class BotCore:
         # )
         self.pumpChatClient = PumpChatClient(
             room_id=token_address,
-            buffer_size=config.get('MESSAGE_BUFFER_SIZE')
+            buffer_size=config.get('MESSAGE_BUFFER_SIZE'),
+            backoff_base=config.get('CHAT_BACKOFF_BASE', 1.0),
+            backoff_cap=config.get('CHAT_BACKOFF_MAX', 30.0),
+            heartbeat_interval=config.get('CHAT_HEARTBEAT_INTERVAL') or None,
+            max_missed_pongs=config.get('CHAT_MAX_MISSED_PONGS', 2),
+            chat_url=config.get('PUMP_CHAT_URL'),
+            message_history_limit=config.get('MESSAGE_HISTORY_LIMIT', 100)
         )
 
+        # Optional process pool that decodes chat frames off the websocket thread
+        self.frame_pool = None
+        if config.get('INGEST_WORKERS', 0) > 0:
+            self.frame_pool = FrameDecoderPool(
+                on_records=self.pumpChatClient.ingest_records,
+                workers=config.get('INGEST_WORKERS'),
+                batch_size=config.get('INGEST_BATCH_SIZE', 64),
+                flush_interval=config.get('INGEST_FLUSH_INTERVAL', 0.05),
+                buffer_size=config.get('MESSAGE_BUFFER_SIZE')
+            )
+            self.pumpChatClient.enable_frame_pool(self.frame_pool)
+
+        # Raw frame capture for deterministic replays (src/capture.py)
+        self.capture = None
+        if config.get('CHAT_CAPTURE_PATH'):
+            path = config['CHAT_CAPTURE_PATH'].replace('{room}', token_address)
+            self.capture = FrameCapture(path, room_id=token_address,
+                                        metadata={'chat_url': self.pumpChatClient.chat_url})
+            self.pumpChatClient.enable_capture(self.capture)
+            logger.info(f"Capturing chat frames to {path}")
+
+        # Per-message span tracing: frame -> decode -> buffer -> select -> llm_start -> first_token -> commit
+        self.tracer = create_tracer(config, token_address)
+        if self.tracer:
+            self.pumpChatClient.enable_tracing(self.tracer)
+
         self.chatgpt_client = ChatGPTClient(
             api_key=openai_key,
             model=config.get('OPENAI_MODEL'),
@@ -35,9 +80,58 @@ class BotCore:
         self.token_address = token_address
         self.analysis_interval = config.get('ANALYSIS_INTERVAL', 5)
         self.max_analysis_results = config.get('MAX_ANALYSIS_RESULTS', 50)
+        self.prompt_token_budget = config.get('PROMPT_TOKEN_BUDGET', 400)
+        self.prompt_max_lines = config.get('PROMPT_MAX_LINES', 30)
+
+        # Ingest feeds the priority queue and wakes the main loop through the scheduler
+        self.message_queue = MessagePriorityQueue(
+            max_size=config.get('PRIORITY_QUEUE_SIZE', 200),
+            max_age=config.get('PRIORITY_MAX_AGE', 60),
+            recency_scale=config.get('PRIORITY_RECENCY_SCALE', 10),
+            mention_keywords=parse_keywords(config.get('ANALYSIS_MENTION_KEYWORDS', '')),
+            low_watermark=config.get('PRIORITY_LOW_WATERMARK', 0.75),
+            shed_policy=config.get('SHED_POLICY', 'lowest_priority'),
+            sample_rate=config.get('SHED_SAMPLE_RATE', 0.25)
+        )
+        self.scheduler = AnalysisScheduler(config)
+        # Loop lag and queue shedding switch the room into degraded mode (bigger batches, cheaper model)
+        self.backpressure = BackpressureController(config, self.message_queue, token_address)
+
+        # Optional embedding stage: near-duplicates are collapsed before queueing
+        # (NumPy is only imported when the stage is on)
+        self.topics = None
+        if config.get('TOPIC_CLUSTERING'):
+            from .topics import create_topic_pipeline
+            self.topics = create_topic_pipeline(config, openai_key)
+        self.inbox = deque(maxlen=max(1, config.get('INBOX_MAX_SIZE', 1000)))
+        self.inbox_dropped = 0
+        if self.topics:
+            self.pumpChatClient.add_message_listener(self._to_inbox)
+        else:
+            self.pumpChatClient.add_message_listener(self.message_queue.push)
+        self.pumpChatClient.add_message_listener(self.scheduler.notify)
+        self.chat_thread = None
+
+        # Queue depths are read at scrape time; latency and analysis counters are bound per room
+        QUEUE_DEPTH.labels(token_address, 'priority').set_function(lambda: len(self.message_queue))
+        QUEUE_DEPTH.labels(token_address, 'inbox').set_function(lambda: len(self.inbox))
+        self._ingest_latency = INGEST_TO_ANALYSIS.labels(token_address)
+        self._analyses_metric = ANALYSES.labels(token_address)
+        queue_stats = self.message_queue.stats
+        for reason, key in (('overflow', 'dropped_overflow'), ('expired', 'dropped_expired'), ('sampled', 'dropped_sampled')):
+            MESSAGES_SHED.labels(token_address, reason).set_function(lambda key=key: queue_stats[key])
+        MESSAGES_SHED.labels(token_address, 'inbox').set_function(lambda: self.inbox_dropped)
+        LOOP_LAG.labels(token_address).set_function(lambda: self.backpressure.monitor.lag)
+        DEGRADED.labels(token_address).set_function(lambda: 1 if self.backpressure.degraded else 0)
+
+        # Optional on-disk archive of chat and analyses (used by batch jobs)
+        self.archive = None
+        if config.get('MESSAGE_ARCHIVE_DIR'):
+            self.archive = MessageArchive(config.get('MESSAGE_ARCHIVE_DIR'))
+            self.pumpChatClient.add_message_listener(self._archive_message)
         
         # Data storage
-        self.analysis_results = deque(maxlen=self.max_analysis_results)
+        self.analysis_results = SnapshotLog(maxlen=self.max_analysis_results)
         self.is_running = False
         self.is_paused = False
         self.mode = "normal"
@@ -49,6 +143,18 @@ class BotCore:
         self.total_analyses_performed = 0
         self.last_error = None
 
+        # Readiness: chat ingest starts at once, analyses wait for the model check
+        self.model_ready = threading.Event()
+        self.model_failed = False
+        self._model_check = None
+
+        # Graceful shutdown: no new cycles while draining; the running cycle is a task
+        # so a drain that runs out of time can cancel it and checkpoint its batch
+        self.draining = False
+        self._cycle = None
+        self._inflight: List[Dict[str, Any]] = []
+        self._loop_done = None
+
         self.id = 0
         
         # Statistics
@@ -60,6 +166,13 @@ class BotCore:
             'last_analysis': None,
             'uptime': 0
         }
+
+        # Cursors and unanalyzed messages saved by the last graceful stop
+        self.checkpoint = RoomCheckpoint(config['CHECKPOINT_DIR'], token_address) if config.get('CHECKPOINT_DIR') else None
+        if self.checkpoint:
+            state = self.checkpoint.load()
+            if state:
+                self._restore(state)
     
     async def start(self) -> bool:
         """Start the bot"""
@@ -68,54 +181,221 @@ class BotCore:
             self.start_time = get_timestamp()
             self.is_running = True
             
-            # Test OpenAI connection
-            if not await self.chatgpt_client.test_connection():
-                logger.error("OpenAI API connection test failed")
-                return False
-            
             # Connect to pump.fun
             # if not await self.pump_connector.connect_to_chat(self.token_address):
             #     logger.error("Failed to connect to pump.fun")
             #     return False
             
-            if not self.pumpChatClient.connect():
-                logger.error("Failed to connect to pump.fun")
-                return False
+            # The chat supervisor (connect, heartbeat, reconnect) runs in its own thread;
+            # ingest starts right away while the LLM backend is validated concurrently
+            self.scheduler.bind(asyncio.get_running_loop())
+            if self._backlog():
+                # Restored from a checkpoint: the deadline trigger covers the carried-over backlog
+                self.scheduler.mark_analyzed(self._backlog())
+            self.backpressure.start()
+            if not self.chatgpt_client.prompts.get(self.mode).pause_chat:
+                self.chat_thread = self.pumpChatClient.start()
+            self._model_check = asyncio.create_task(self._check_model())
+            startup.mark('bot_started')
             
             # Start the main processing loop
             await self._run_main_loop()
+            return not self.model_failed
             
         except Exception as e:
             logger.error(f"Error starting bot: {e}")
             self.last_error = str(e)
             return False
     
+    async def _check_model(self):
+        """Test the LLM backend; a failure stops the bot like a failed start did"""
+        try:
+            # SDK imports happen in a thread so the loop keeps serving ingest meanwhile
+            await asyncio.to_thread(self.chatgpt_client.warm_up)
+        except Exception as e:
+            logger.error(f"LLM backend client could not be created: {e}")
+        if await self.chatgpt_client.test_connection():
+            self.model_ready.set()
+            startup.mark('model_ready')
+            logger.info("LLM backend connection test passed")
+            return
+        logger.error("OpenAI API connection test failed")
+        self.last_error = 'LLM backend connection test failed'
+        self.model_failed = True
+        await self.stop()
+
+    async def shutdown(self, timeout: float = 20.0) -> Dict[str, Any]:
+        """Graceful stop: finish the in-flight analysis within ``timeout``, stop, save the checkpoint"""
+        started = time.monotonic()
+        self.draining = True
+        self.scheduler.stop()
+        drained = True
+        if self._cycle and not self._cycle.done():
+            logger.info(f"Waiting up to {timeout:.0f}s for the in-flight analysis...")
+            done, _ = await asyncio.wait([self._cycle], timeout=timeout)
+            if not done:
+                # Its batch stays in _inflight and goes into the checkpoint
+                drained = False
+                logger.warning("In-flight analysis did not finish in time, cancelling it")
+                self._cycle.cancel()
+                await asyncio.wait([self._cycle])
+        if self._loop_done and not self._loop_done.is_set():
+            try:
+                await asyncio.wait_for(self._loop_done.wait(), 1.0)
+            except asyncio.TimeoutError:
+                pass
+        await self.chatgpt_client.contexts.drain(max(0.0, timeout - (time.monotonic() - started)))
+        await self.stop()
+        pending = 0
+        if self.checkpoint:
+            try:
+                state = self.checkpoint_state()
+                pending = len(state['pending'])
+                await asyncio.to_thread(self.checkpoint.save, state)
+            except Exception as e:
+                logger.error(f"Failed to save checkpoint: {e}")
+        return {
+            'room': self.token_address,
+            'drained': drained,
+            'checkpointed': pending if self.checkpoint else None,
+            'seconds': round(time.monotonic() - started, 3)
+        }
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """Room state for a checkpoint; ``pending`` holds every message not analyzed yet"""
+        return {
+            'last_processed_message_id': self.last_processed_message_id,
+            'chat': self.pumpChatClient.export_resume_state(),
+            'pending': list(self._inflight) + self.message_queue.pending() + list(self.inbox),
+            'analysis_results': self.analysis_results.snapshot.to_list(),
+            'context': self.chatgpt_client.contexts.export(self.token_address),
+            'mode': self.mode,
+            'id': self.id,
+            'totals': {
+                'messages': self.total_messages_processed,
+                'analyses': self.total_analyses_performed
+            }
+        }
+
+    def _restore(self, state: Dict[str, Any]):
+        self.pumpChatClient.restore_resume_state(state.get('chat') or {})
+        self.last_processed_message_id = state.get('last_processed_message_id', 0)
+        pending = state.get('pending') or []
+        for message in pending:
+            (self._to_inbox if self.topics else self.message_queue.push)(message)
+        self.analysis_results.replace(state.get('analysis_results') or [])
+        if state.get('context'):
+            self.chatgpt_client.contexts.restore(self.token_address, state['context'])
+        # A mode that pauses the chat (music) stays paused; start() honours it
+        self.mode = state.get('mode') if state.get('mode') in self.chatgpt_client.prompts.active else 'normal'
+        self.id = state.get('id', 0)
+        totals = state.get('totals') or {}
+        self.total_messages_processed = totals.get('messages', 0)
+        self.total_analyses_performed = totals.get('analyses', 0)
+        logger.info(f"Restored checkpoint of {self.token_address} saved at {state.get('saved_at')}: "
+                    f"{len(pending)} unanalyzed messages, last processed #{self.last_processed_message_id}")
+
     async def stop(self):
         """Stop the bot"""
         logger.info("Stopping bot...")
         self.is_running = False
+        self.scheduler.stop()
+        if self._model_check and not self._model_check.done() and self._model_check is not asyncio.current_task():
+            self._model_check.cancel()
+        self.backpressure.stop()
         
         try:
             # await self.pump_connector.disconnect()
             self.pumpChatClient.stop()
+            QUEUE_DEPTH.remove(self.token_address, 'priority')
+            QUEUE_DEPTH.remove(self.token_address, 'inbox')
+            for reason in ('overflow', 'expired', 'sampled', 'inbox'):
+                MESSAGES_SHED.remove(self.token_address, reason)
+            LOOP_LAG.remove(self.token_address)
+            DEGRADED.remove(self.token_address)
+            if self.frame_pool:
+                await asyncio.to_thread(self.frame_pool.close)
+            await self.chatgpt_client.close()
+            if self.tracer:
+                self.tracer.close()
+            if self.capture:
+                self.capture.close()
+            if self.archive:
+                self.archive.close()
         except Exception as e:
             logger.error(f"Error during disconnect: {e}")
     
-    def pause(self):
-        """Pause the bot"""
+    def apply_config(self, changes: Dict[str, Any]) -> List[str]:
+        """Apply live settings from any thread (src/runtime_config.py).
+
+        The whole batch is applied in one callback on the bot loop, between
+        two steps of an analysis cycle, so a cycle never mixes old and new values.
+        """
+        loop = self.scheduler.loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is None or loop.is_closed() or running is loop:
+            self._apply_config(changes)
+        else:
+            loop.call_soon_threadsafe(self._apply_config, dict(changes))
+        return sorted(changes)
+
+    def _apply_config(self, changes: Dict[str, Any]):
+        self.analysis_interval = changes.get('ANALYSIS_INTERVAL', self.analysis_interval)
+        self.prompt_token_budget = changes.get('PROMPT_TOKEN_BUDGET', self.prompt_token_budget)
+        self.prompt_max_lines = changes.get('PROMPT_MAX_LINES', self.prompt_max_lines)
+        if 'MESSAGE_BUFFER_SIZE' in changes:
+            # The decoder pool gets the limit with every batch it submits
+            self.pumpChatClient.buffer_size = changes['MESSAGE_BUFFER_SIZE']
+            if self.frame_pool:
+                self.frame_pool.buffer_size = changes['MESSAGE_BUFFER_SIZE']
+        if 'MESSAGE_HISTORY_LIMIT' in changes:
+            self.pumpChatClient.set_history_limit(changes['MESSAGE_HISTORY_LIMIT'])
+        if 'MAX_ANALYSIS_RESULTS' in changes:
+            self.max_analysis_results = changes['MAX_ANALYSIS_RESULTS']
+            self.analysis_results.resize(self.max_analysis_results)
+        keywords = changes.get('ANALYSIS_MENTION_KEYWORDS')
+        self.message_queue.configure(
+            max_size=changes.get('PRIORITY_QUEUE_SIZE'),
+            low_watermark=changes.get('PRIORITY_LOW_WATERMARK'),
+            max_age=changes.get('PRIORITY_MAX_AGE'),
+            shed_policy=changes.get('SHED_POLICY'),
+            sample_rate=changes.get('SHED_SAMPLE_RATE'),
+            mention_keywords=parse_keywords(keywords) if keywords is not None else None
+        )
+        self.backpressure.configure(changes)
+        self.chatgpt_client.apply_config(changes)
+        self.scheduler.configure(changes)
+        if 'LOG_LEVEL' in changes:
+            logging.getLogger().setLevel(changes['LOG_LEVEL'])
+        logger.info(f"[{self.token_address}] Applied settings: {', '.join(sorted(changes))}")
+
+    def pause(self, room: Optional[str] = None) -> Optional[bool]:
+        """Pause the bot; None when ``room`` is not this bot's room"""
+        if room is not None and room != self.token_address:
+            return None
         logger.info("Pausing bot...")
         self.is_paused = True
         self.pumpChatClient.set_paused(True)
+        return True
     
-    def resume(self):
-        """Resume the bot"""
+    def resume(self, room: Optional[str] = None) -> Optional[bool]:
+        """Resume the bot; None when ``room`` is not this bot's room"""
+        if room is not None and room != self.token_address:
+            return None
         logger.info("Resuming bot...")
         self.is_paused = False
         self.pumpChatClient.set_paused(False)
+        # The backlog gathered while paused does not wait for the next message
+        self.scheduler.wake()
+        return True
     
     async def _run_main_loop(self):
         """Main processing loop"""
         logger.info("Starting main processing loop")
+        self._loop_done = asyncio.Event()
         
         # Start message listening in background
         # listen_task = asyncio.create_task(self.pump_connector.listen_messages())
@@ -123,17 +403,33 @@ class BotCore:
         
         try:
             while self.is_running:
-                if not self.is_paused and self.mode != "music":
-                    await self.process_cycle()
-                await asyncio.sleep(self.analysis_interval)
+                reason = await self.scheduler.wait()
+                if reason == 'stop' or not self.is_running:
+                    break
+                if not self.model_ready.is_set() and self._model_check:
+                    # Messages keep queueing while the model check is still running
+                    await asyncio.wait([self._model_check])
+                    if not self.is_running:
+                        break
+                if self.draining:
+                    break
+                if not self.is_paused and self.chatgpt_client.prompts.get(self.mode).analyzes:
+                    logger.debug(f"Analysis triggered by: {reason}")
+                    self._cycle = asyncio.ensure_future(self.process_cycle())
+                    # wait() does not propagate a cancellation of the cycle into this loop
+                    await asyncio.wait([self._cycle])
+                    self._cycle = None
+                    # Only after a real cycle: marking while paused would re-arm the deadline
+                    # trigger and wake this loop every ANALYSIS_MAX_LATENCY for nothing
+                    self.scheduler.mark_analyzed(self._backlog())
         except KeyboardInterrupt:
             logger.info("Received interrupt signal")
         except Exception as e:
             logger.error(f"Error in main loop: {e}")
             self.last_error = str(e)
         finally:
+            self._loop_done.set()
             # Cancel the listening task
-            pass
             # listen_task.cancel()
             # try:
             #     await listen_task
@@ -142,19 +438,39 @@ class BotCore:
     
     async def process_cycle(self):
         """Process one analysis cycle"""
+        trace_batch, stamps, outcome = None, {}, 'error'
+        # Read once: a mode switch from the API applies from the next cycle on
+        mode = self.mode
         try:
-            # Respect throttle between AI calls (1–2 seconds)
+            # Throttling is handled by the per-trigger debounce in the scheduler
             now_ts = time.time()
-            if (now_ts - self.last_ai_call_time) < self.analysis_interval:
-                return
 
-            # Fetch only new, unprocessed messages from chat, up to 6 at a time
-            batch_limit = min(6, self.analysis_interval if isinstance(self.analysis_interval, int) else 6)
-            new_messages, max_id = self.pumpChatClient.get_new_messages(self.last_processed_message_id, batch_limit)
+            if self.topics:
+                await self._drain_inbox()
+
+            # Pack the highest-priority unprocessed messages into the input-token budget
+            # (degraded mode takes bigger batches so fewer LLM calls drain the backlog)
+            self.backpressure.evaluate()
+            factor = self.backpressure.batch_factor
+            line_budget = max(0, int(self.prompt_token_budget * factor) - self.chatgpt_client.prompt_tokens(mode))
+            new_messages, used_tokens = self.message_queue.pop_within_budget(
+                line_budget,
+                lambda m: self.chatgpt_client.count_line_tokens(self._format_line(m), mode),
+                int(self.prompt_max_lines * factor)
+            )
 
             if not new_messages:
                 logger.debug("No new messages to analyze")
                 return
+            self._inflight = new_messages
+            if self.tracer:
+                trace_batch = self.tracer.select((m.get('_id') for m in new_messages), time.time())
+            max_id = max(m.get('_id', 0) for m in new_messages)
+            for message in new_messages:
+                # History backfill keeps the server timestamp, which may be in another unit
+                ingested = message.get('timestamp')
+                if isinstance(ingested, (int, float)) and 0 < ingested <= now_ts:
+                    self._ingest_latency.observe(now_ts - ingested)
             
             # Update statistics
             self.stats['messages_received'] += len(new_messages)
@@ -163,19 +479,9 @@ class BotCore:
             # Advance last processed id
             self.last_processed_message_id = max(self.last_processed_message_id, max_id)
 
-            max_lines = max(1, min(self.analysis_interval if isinstance(self.analysis_interval, int) else 6, self.stats.get('messages_received', 0)))
-            max_lines = min(max_lines, len(new_messages), self.pumpChatClient.message_history_limit)
-            # Also cap by configured buffer size
-            max_lines = min(max_lines, self.analysis_interval if isinstance(self.analysis_interval, int) else 6)
-
-            # Format lines as "nickname + message"
-            to_analyze = []
-            for m in new_messages[:max_lines]:
-                username = m.get('username') or m.get('user') or 'Unknown'
-                text = m.get('message') or ''
-                to_analyze.append(f"{username} + {text}")
+            to_analyze = [self._format_line(m) for m in new_messages]
 
-            logger.info(f"Processing {len(to_analyze)} new messages for analysis")
+            logger.info(f"Processing {len(to_analyze)} new messages for analysis (~{used_tokens} tokens)")
             
             # Format messages for analysis
             # formatted_messages = format_message_for_analysis(recent_messages)
@@ -186,7 +492,9 @@ class BotCore:
             #     return
             
             # Send to ChatGPT for analysis
-            analysis_result = await self.chatgpt_client.analyze_messages(to_analyze, self.mode)
+            analysis_result = await self.chatgpt_client.analyze_messages(
+                to_analyze, mode, self.token_address, stamps=stamps, model=self.backpressure.model
+            )
             
             if analysis_result:
                 # Store analysis result
@@ -204,8 +512,14 @@ class BotCore:
                     self.id += 1
                 
                 self.analysis_results.append(analysis_data)
+                stamps['commit'] = time.time()
+                outcome = 'ok'
+                if self.archive:
+                    self.archive.append_analysis(self.token_address, analysis_data)
+                    self.archive.flush()
                 self.stats['analyses_performed'] += 1
                 self.total_analyses_performed += 1
+                self._analyses_metric.inc()
                 self.stats['last_analysis'] = analysis_data['datetime']
                 self.last_analysis_time = get_timestamp()
                 self.last_ai_call_time = now_ts
@@ -215,12 +529,70 @@ class BotCore:
             else:
                 logger.warning("Failed to get analysis from ChatGPT")
                 self.stats['api_errors'] += 1
+                outcome = 'failed'
                 
+        except asyncio.CancelledError:
+            # Cancelled by a drain that ran out of time: the batch is checkpointed, not lost
+            outcome = 'cancelled'
+            raise
         except Exception as e:
             logger.error(f"Error in process cycle: {e}")
             self.last_error = str(e)
             self.stats['api_errors'] += 1
+        finally:
+            if outcome != 'cancelled':
+                self._inflight = []
+            if trace_batch:
+                self.tracer.finish(trace_batch, stamps, outcome)
     
+    async def _drain_inbox(self):
+        """Run the embedding/dedup stage over everything ingested since the last cycle"""
+        batch = []
+        while self.inbox:
+            batch.append(self.inbox.popleft())
+        if not batch:
+            return
+        kept = await asyncio.to_thread(self.topics.process, batch)
+        for message in kept:
+            self.message_queue.push(message)
+
+    def _to_inbox(self, message: Dict[str, Any]):
+        """Queue a message for the topic stage; a full inbox drops (and counts) the oldest"""
+        if len(self.inbox) == self.inbox.maxlen:
+            self.inbox_dropped += 1
+        self.inbox.append(message)
+
+    def _backlog(self) -> int:
+        """Messages waiting for analysis"""
+        return len(self.message_queue) + len(self.inbox)
+
+    def get_topics(self, room: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get topic clusters of the room, or None when the topic stage is disabled"""
+        return self.topics.get_topics() if self.topics else None
+
+    def _archive_message(self, message: Dict[str, Any]):
+        self.archive.append_message(self.token_address, message)
+
+    def _format_line(self, message: Dict[str, Any]) -> str:
+        """Format a chat message as 'nickname + message'"""
+        username = message.get('username') or message.get('user') or 'Unknown'
+        text = message.get('message') or ''
+        return f"{username} + {text}"
+
+    def get_readiness(self) -> Dict[str, Any]:
+        """Ready once the loop runs, the chat socket is open and the model check passed"""
+        checks = {
+            'loop': self.is_running and not self.draining,
+            'chat': self.pumpChatClient.get_connection_status(),
+            'model': self.model_ready.is_set()
+        }
+        return {
+            'ready': all(checks.values()),
+            'checks': checks,
+            'model_failed': self.model_failed,
+            'startup': startup.timeline()
+        }
+
     def get_status(self) -> Dict[str, Any]:
         """Get bot status information"""
         current_time = get_timestamp()
@@ -229,6 +601,7 @@ class BotCore:
         return {
             'is_running': self.is_running,
             'is_paused': self.is_paused,
+            'draining': self.draining,
             'token_address': self.token_address,
             'uptime_seconds': uptime,
             'start_time': self.start_time,
@@ -236,8 +609,14 @@ class BotCore:
             'last_error': self.last_error,
             # 'pump_connection': self.pump_connector.get_connection_status(),
             'pump_connection': self.pumpChatClient.get_connection_status(),
+            'connection': self.pumpChatClient.get_connection_metrics(),
+            'logging': get_logging_stats(),
             
             'chatgpt_status': self.chatgpt_client.get_api_status(),
+            'scheduler': self.scheduler.get_status(),
+            'queue': self.message_queue.get_stats(),
+            'backpressure': {**self.backpressure.get_stats(), 'inbox_dropped': self.inbox_dropped},
+            'frame_pool': self.frame_pool.get_stats() if self.frame_pool else None,
             'statistics': {
                 **self.stats,
                 'uptime': uptime,
@@ -255,14 +634,11 @@ class BotCore:
     
     def get_analysis_results(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent analysis results"""
-        all_results = list(self.analysis_results)
-        return all_results[-limit:] if all_results else []
+        return self.analysis_results.snapshot.tail(limit)
     
     def get_latest_analysis(self) -> Optional[Dict[str, Any]]:
         """Get the most recent analysis result"""
-        if self.analysis_results:
-            return self.analysis_results[-1]
-        return None
+        return self.analysis_results.snapshot.last()
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get detailed statistics"""
@@ -279,21 +655,43 @@ class BotCore:
             'total_messages': self.total_messages_processed,
             'total_analyses': self.total_analyses_performed,
             'api_errors': self.stats['api_errors'],
-            'connection_errors': self.stats['connection_errors']
+            'connection_errors': self.stats['connection_errors'],
+            'messages_dropped': self.message_queue.get_stats()['dropped'] + self.inbox_dropped
         }
     
-    def _change_mode(self, mode: str):
-        if mode == "normal":
-            self.mode = "normal"
-            self.pumpChatClient.set_paused(False)
+    def get_traces(self, limit: int = 20) -> Optional[Dict[str, Any]]:
+        """Stage latency summary and slowest message traces, or None when tracing is disabled"""
+        return self.tracer.get_traces(limit) if self.tracer else None
 
-        elif mode == "music":
-            self.mode = "music"
-            self.pumpChatClient.set_paused(True)
+    def get_metrics(self) -> str:
+        """Prometheus text exposition of this process"""
+        return REGISTRY.expose()
 
-        else:
-            self.mode = "normal"
-            self.pumpChatClient.set_paused(False)
+    def _change_mode(self, mode: str, room: Optional[str] = None) -> Optional[str]:
+        """Switch the prompt mode; returns it, or None when ``room`` is not this bot's room.
+
+        Raises ValueError for a mode the prompt registry does not know.
+        Modes with ``pause_chat`` (music) stop chat ingest until another
+        mode is selected; the analysis in flight finishes in the old mode.
+        """
+        if room is not None and room != self.token_address:
+            return None
+        if mode not in self.chatgpt_client.prompts.active:
+            raise ValueError(f"Unknown mode: {mode}")
+        spec = self.chatgpt_client.prompts.get(mode)
+        self.mode = spec.mode
+        self.pumpChatClient.set_paused(spec.pause_chat)
+        self.scheduler.wake()
+        logger.info(f"{self.token_address} switched to {spec.mode} v{spec.version}")
+        return self.mode
+
+    def get_prompts(self) -> Dict[str, Any]:
+        """Loaded prompt modes and the mode of every room"""
+        return {**self.chatgpt_client.prompts.describe(), 'rooms': {self.token_address: self.mode}}
+
+    def reload_prompts(self, pins: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Re-read the prompt files; returns ``{mode: version}`` of what changed"""
+        return self.chatgpt_client.prompts.reload(pins)
 
     def _format_uptime(self, seconds: float) -> str:
         """Format uptime in human readable format"""
@@ -0,0 +1,208 @@
+import gzip
+import hashlib
+import json
+import logging
+import queue
+import struct
+import threading
+import time
+from typing import Dict, Any, Optional, Iterator, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PFCAP1\n'
+# Record header: monotonic offset from the capture start (ns), kind, payload length
+_RECORD = struct.Struct('<QcI')
+
+FRAME = b'F'   # Raw Socket.IO frame as received
+OPEN = b'O'    # WebSocket opened
+CLOSE = b'C'   # WebSocket closed
+
+
+class FrameCapture:
+    """Writes every raw chat frame with a monotonic timestamp to a gzip capture file.
+
+    The websocket thread only enqueues ``(offset, kind, data)``; compression
+    and disk I/O happen on a writer thread. The file starts with ``MAGIC``
+    and one JSON metadata line (room, wall-clock start), followed by
+    length-prefixed records, so frames are stored byte-for-byte.
+    """
+
+    def __init__(self, path: str, room_id: str = '', metadata: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.started = time.monotonic_ns()
+        self.records = 0
+        self._queue = queue.SimpleQueue()
+        self._file = gzip.open(path, 'wb', compresslevel=6)
+        header = {'room_id': room_id, 'started_at': time.time(), **(metadata or {})}
+        self._file.write(MAGIC + json.dumps(header).encode('utf-8') + b'\n')
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='frame-capture', daemon=True)
+        self._thread.start()
+
+    def write(self, frame: str, kind: bytes = FRAME):
+        self._queue.put((time.monotonic_ns() - self.started, kind, frame))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            offset, kind, frame = item
+            data = frame.encode('utf-8') if isinstance(frame, str) else (frame or b'')
+            self._file.write(_RECORD.pack(offset, kind, len(data)))
+            self._file.write(data)
+            self.records += 1
+        self._file.close()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+            logger.info(f"Capture {self.path} closed: {self.records} records")
+
+
+def _read_header(f, path: str) -> Dict[str, Any]:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{path} is not a frame capture")
+    return json.loads(f.readline())
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """Only the capture header; the file is closed before returning"""
+    with gzip.open(path, 'rb') as f:
+        return _read_header(f, path)
+
+
+def read_capture(path: str) -> Tuple[Dict[str, Any], Iterator[Tuple[float, bytes, str]]]:
+    """Header and an iterator of ``(offset_seconds, kind, frame)`` records.
+
+    The file stays open until the iterator is exhausted or closed.
+    """
+    f = gzip.open(path, 'rb')
+    try:
+        header = _read_header(f, path)
+    except Exception:
+        f.close()
+        raise
+
+    def records():
+        try:
+            while True:
+                head = f.read(_RECORD.size)
+                if len(head) < _RECORD.size:
+                    return
+                offset, kind, length = _RECORD.unpack(head)
+                yield offset / 1e9, kind, f.read(length).decode('utf-8')
+        finally:
+            f.close()
+
+    return header, records()
+
+
+class _ReplayTransport:
+    """Stands in for the WebSocketApp during a replay: records what the client sends"""
+
+    replay = True
+    sock = None
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+    def close(self):
+        pass
+
+
+class ReplayDriver:
+    """Feeds a capture into a ``PumpChatClient`` without a network connection.
+
+    ``speed`` 1.0 replays in real time, N replays N times faster and 0 as
+    fast as possible. The client's clock is replaced by a virtual one
+    (capture wall-clock start plus the frame offset), so message
+    timestamps, the handshake it sends and therefore the resulting history
+    are identical on every run; ``digest`` in the result proves it.
+    ``sleep`` and ``monotonic`` can be injected for tests.
+    """
+
+    def __init__(self, path: str, speed: float = 0.0, sleep: Callable[[float], None] = time.sleep,
+                 monotonic: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.speed = speed
+        self.sleep = sleep
+        self.monotonic = monotonic
+        self.virtual_now = 0.0
+
+    def run(self, client) -> Dict[str, Any]:
+        header, records = read_capture(self.path)
+        started_at = header.get('started_at', 0.0)
+        transport = _ReplayTransport()
+        real_clock = client.clock
+        client.clock = lambda: self.virtual_now
+        client.ws = transport
+
+        frames = 0
+        wall_started = self.monotonic()
+        cpu_started = time.process_time()
+        try:
+            for offset, kind, frame in records:
+                if self.speed > 0:
+                    delay = offset / self.speed - (self.monotonic() - wall_started)
+                    if delay > 0:
+                        self.sleep(delay)
+                self.virtual_now = started_at + offset
+                if kind == FRAME:
+                    frames += 1
+                    client.on_message(transport, frame)
+                elif kind == OPEN:
+                    client.on_open(transport)
+                elif kind == CLOSE:
+                    client.on_close(transport)
+            if client.frame_pool:
+                client.frame_pool.flush()
+        finally:
+            records.close()
+            client.clock = real_clock
+        elapsed = self.monotonic() - wall_started
+
+        digest = hashlib.sha256()
+        for data in transport.sent:
+            digest.update(data.encode('utf-8') + b'\n')
+        for message in client.history.snapshot:
+            digest.update(json.dumps(message, sort_keys=True, default=str).encode('utf-8') + b'\n')
+        return {
+            'capture': self.path,
+            'room_id': header.get('room_id'),
+            'frames': frames,
+            'messages': client.message_seq,
+            'elapsed_seconds': round(elapsed, 6),
+            'cpu_seconds': round(time.process_time() - cpu_started, 6),
+            'frames_per_second': round(frames / elapsed, 1) if elapsed > 0 else None,
+            'digest': digest.hexdigest()
+        }
+
+
+def replay(path: str, speed: float = 0.0, **client_options) -> Dict[str, Any]:
+    """Replay a capture into a fresh client for the captured room"""
+    from .pump_chat_client import PumpChatClient
+
+    header = read_header(path)
+    client = PumpChatClient(room_id=header.get('room_id') or 'replay', **client_options)
+    return ReplayDriver(path, speed=speed).run(client)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay a chat frame capture without a network connection')
+    parser.add_argument('capture', help='Capture file written with CHAT_CAPTURE_PATH')
+    parser.add_argument('--speed', type=float, default=0.0, help='1 = real time, N = N times faster, 0 = as fast as possible')
+    parser.add_argument('--repeat', type=int, default=1, help='Replay several times (digests must match)')
+    parser.add_argument('--history', type=int, default=100, help='Message history limit of the client')
+    args = parser.parse_args()
+
+    for _ in range(args.repeat):
+        print(json.dumps(replay(args.capture, args.speed, message_history_limit=args.history)))
@@ -3,17 +3,58 @@ import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 import time
-from openai import OpenAI
+
+from .tokenizer import TokenCounter
+from .context_manager import ContextManager
+from .llm_backends import LLMBackend, LLMResponse, create_backend
+from .resilience import LatencyTracker, CircuitBreaker
+from .prompts import PromptRegistry, PromptSpec, create_prompt_registry
+from .utils import parse_keywords
 
 logger = logging.getLogger(__name__)
 
 class ChatGPTClient:
-    """Handles communication with OpenAI ChatGPT API using official library"""
+    """Handles communication with the LLM backends (OpenAI by default)"""
     
-    def __init__(self, api_key: str, model: str,  config: Dict[str, Any] ):
+    def __init__(self, api_key: str, model: str,  config: Dict[str, Any], backend: Optional[LLMBackend] = None,
+                 prompts: Optional[PromptRegistry] = None):
         self.api_key    = api_key
         self.model      = model
-        self.client     = OpenAI(api_key=api_key)
+        self.backend    = backend or create_backend(config.get("LLM_BACKEND", "openai"), config, api_key)
+
+        # Low-priority rooms can be routed to a cheaper (e.g. local CPU) backend
+        self.low_priority_rooms = set(parse_keywords(config.get("LOW_PRIORITY_ROOMS", "")))
+        self.low_priority_model = config.get("LOW_PRIORITY_MODEL") or model
+        self.low_priority_backend = None
+        if self.low_priority_rooms and config.get("LOW_PRIORITY_BACKEND"):
+            self.low_priority_backend = create_backend(config.get("LOW_PRIORITY_BACKEND"), config, api_key)
+
+        # Hedged requests: after the p95 deadline fire a second request and keep the winner
+        self.hedge_enabled      = config.get("HEDGE_ENABLED", True)
+        self.hedge_percentile   = config.get("HEDGE_PERCENTILE", 95)
+        self.hedge_min_delay    = config.get("HEDGE_MIN_DELAY", 0.5)
+        self.hedge_model        = config.get("HEDGE_MODEL") or model
+        self.hedge_backend      = self.backend
+        if config.get("HEDGE_BACKEND"):
+            self.hedge_backend = create_backend(config.get("HEDGE_BACKEND"), config, api_key)
+
+        # Circuit breaker: route to the fallback model while the primary is failing
+        self.fallback_model     = config.get("FALLBACK_MODEL") or self.hedge_model
+        self.fallback_backend   = self.hedge_backend
+        if self.fallback_backend is self.backend and self.fallback_model == model:
+            logger.warning(f"FALLBACK_MODEL is the primary model {model} on the same backend: "
+                           "an open circuit breaker will not route anywhere else")
+        self.latency = LatencyTracker(default=config.get("HEDGE_INITIAL_DELAY", 3.0))
+        self.breaker = CircuitBreaker(
+            error_threshold=config.get("BREAKER_ERROR_THRESHOLD", 0.5),
+            window=config.get("BREAKER_WINDOW", 20),
+            cooldown=config.get("BREAKER_COOLDOWN", 30)
+        )
+        self.resilience_stats = {
+            'hedged': 0,
+            'hedge_wins': 0,
+            'fallback_routed': 0
+        }
         
         self.creatine           = config.get("CREATIVE")
         self.rate_limit_delay   = config.get("RATE_LIMIT_DELAY")
@@ -21,15 +62,50 @@ class ChatGPTClient:
         self.max_token          = config.get("MAX_TOKEN_ANSVERS")
 
         self.last_request_time = 0
-        
-        # System prompt for pump.fun analysis
-        self.promt = {
-            "normal": """You're an alien from another planet. Never break that role. Keep your answers short and sweet. Your style is informal, with humor and jokes. The goal is to entertain the other person, not to teach or explain. Use funny comparisons, cosmic metaphors, and a touch of sarcasm. Never give boring or long answers. If the user asks serious questions, always respond cheerfully and uniquely, showing that you're an alien who sees the world in your own way. You like to use sarcasm and irony, you like to make fun of people 
-### Reply Format
-Don't reply to every message. Reply to a single message by name, or make a general reply without identifying the author.""",
-            "music": ""
+
+        # Local token accounting
+        self.token_counter = TokenCounter(model)
+        self.usage = {
+            'requests': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'total_tokens': 0,
+            'last_prompt_tokens': 0,
+            'last_completion_tokens': 0,
+            'last_estimated_prompt_tokens': 0
         }
+
+        # Per-room rolling conversation memory
+        self.summary_model      = config.get("SUMMARY_MODEL") or model
+        self.summary_max_tokens = config.get("SUMMARY_MAX_TOKENS", 120)
+        self.contexts = ContextManager(
+            summarize=self._summarize,
+            counter=self.token_counter,
+            max_exchanges=config.get("CONTEXT_EXCHANGES", 4),
+            token_ceiling=config.get("CONTEXT_TOKEN_CEILING", 1200)
+        )
+        
+        # Per-mode system prompts, request parameters and line templates (prompts/*.json)
+        self.prompts = prompts or create_prompt_registry(config, self.token_counter)
     
+    def apply_config(self, config: Dict[str, Any]):
+        """Apply changed settings to the live client (see src/runtime_config.py)"""
+        if 'OPENAI_MODEL' in config:
+            old, self.model = self.model, config['OPENAI_MODEL']
+            # Models that defaulted to the primary one follow it
+            for attr in ('low_priority_model', 'hedge_model', 'fallback_model', 'summary_model'):
+                if getattr(self, attr) == old:
+                    setattr(self, attr, self.model)
+        for key, attr in (('CREATIVE', 'creatine'), ('MAX_TOKEN_ANSVERS', 'max_token'),
+                          ('MAX_RETRIES', 'max_retries'), ('RATE_LIMIT_DELAY', 'rate_limit_delay'),
+                          ('HEDGE_ENABLED', 'hedge_enabled'), ('HEDGE_PERCENTILE', 'hedge_percentile'),
+                          ('HEDGE_MIN_DELAY', 'hedge_min_delay')):
+            if key in config:
+                setattr(self, attr, config[key])
+        self.breaker.error_threshold = config.get('BREAKER_ERROR_THRESHOLD', self.breaker.error_threshold)
+        self.breaker.cooldown = config.get('BREAKER_COOLDOWN', self.breaker.cooldown)
+        self.contexts.configure(config.get('CONTEXT_EXCHANGES'), config.get('CONTEXT_TOKEN_CEILING'))
+
     async def _rate_limit(self):
         """Ensure we don't exceed rate limits"""
         current_time = time.time()
@@ -38,53 +114,78 @@ Don't reply to every message. Reply to a single message by name, or make a gener
             await asyncio.sleep(self.rate_limit_delay - time_since_last)
         self.last_request_time = time.time()
     
-    async def analyze_messages(self, messages: List[str], mode: str) -> Optional[str]:
-        """Send messages to ChatGPT-4o mini for analysis"""
-        if not messages or not self.api_key:
-            logger.warning("No messages to analyze or missing API key")
+    def _route(self, room_id: Optional[str]) -> tuple:
+        """Pick (backend, model) for a room"""
+        if room_id and room_id.lower() in self.low_priority_rooms:
+            return self.low_priority_backend or self.backend, self.low_priority_model
+        return self.backend, self.model
+
+    async def analyze_messages(self, messages: List[str], mode: str, room_id: Optional[str] = None,
+                               stamps: Optional[Dict[str, float]] = None, model: Optional[str] = None) -> Optional[str]:
+        """Send messages to ChatGPT-4o mini for analysis.
+
+        ``stamps`` (optional, for tracing) receives the wall-clock ``llm_start``
+        of the first attempt and ``first_token`` of the successful one.
+        ``model`` overrides the room's model (degraded mode) and skips hedging.
+        """
+        if not messages:
+            logger.warning("No messages to analyze")
             return None
-        
+
+        spec = self.prompts.get(mode)
+        if not spec.analyzes:
+            return None
+
         # Format messages for analysis
-        formatted_messages = self._format_messages(messages)
+        formatted_messages = self._format_messages(messages, spec)
         if not formatted_messages.strip():
             logger.warning("No valid messages to analyze")
             return None
         
-        print("[GPT] Mode:", mode)
-        promt = self.promt.get(mode, self.promt["normal"])
-
-        if not promt:
-            return None
+        logger.debug("Analysis mode: %s", mode)
+        request_messages = self.contexts.build_messages(
+            room_id, spec.system_message, spec.system_tokens, formatted_messages
+        )
+        estimated_tokens = self.token_counter.count_messages(request_messages)
         
+        override = model
+        backend, model = self._route(room_id)
+        if override:
+            model = override
+        elif spec.model and model == self.model:
+            # The mode's model replaces the primary one; low-priority rooms keep their cheaper model
+            model = spec.model
+        max_tokens, temperature = self._sampling(spec)
+
         # Rate limiting
         await self._rate_limit()
         
         # Make request with retries
         for attempt in range(self.max_retries):
+            if stamps is not None:
+                stamps.setdefault('llm_start', time.time())
             try:
-                # Use OpenAI library for clean API calls
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": self.promt.get(mode, self.promt["normal"])
-                        },
-                        {
-                            "role": "user", 
-                            "content": formatted_messages
-                        }
-                    ],
-                    max_tokens=self.max_token,
-                    temperature=self.creatine
-                )
+                if backend is self.backend and not override:
+                    response = await self._resilient_complete(request_messages, model, max_tokens, temperature)
+                else:
+                    response = await backend.complete(
+                        request_messages,
+                        model=model,
+                        max_tokens=max_tokens,
+                        temperature=temperature
+                    )
                 
-                analysis = response.choices[0].message.content
+                analysis = response.content
+                if stamps is not None:
+                    # Completions are not streamed: the first token arrives with the whole reply
+                    stamps['first_token'] = time.time()
+                self._record_usage(response, estimated_tokens)
+                self.contexts.record(room_id, formatted_messages, analysis)
                 logger.info("Successfully analyzed messages with ChatGPT")
                 return analysis
                 
             except Exception as e:
-                logger.error(f"Error calling OpenAI API (attempt {attempt + 1}): {e}")
+                logger.error(f"Error calling {backend.name} backend (attempt {attempt + 1}): {e}")
                 if attempt == self.max_retries - 1:
                     return self._get_fallback_response()
                 
@@ -96,8 +197,143 @@ Don't reply to every message. Reply to a single message by name, or make a gener
         
         return self._get_fallback_response()
     
-    def _format_messages(self, messages: List[str]) -> str:
-        """Format messages for ChatGPT analysis"""
+    def build_request(self, messages: List[str], mode: str) -> Optional[List[Dict[str, str]]]:
+        """Build a stateless prompt (system prompt + formatted lines) for offline jobs"""
+        spec = self.prompts.get(mode)
+        formatted_messages = self._format_messages(messages, spec)
+        if not formatted_messages.strip() or not spec.analyzes:
+            return None
+        return self.contexts.build_messages(None, spec.system_message, 0, formatted_messages)
+
+    def request_params(self, mode: str) -> Dict[str, Any]:
+        """Model, max_tokens and temperature of a mode for offline jobs"""
+        spec = self.prompts.get(mode)
+        max_tokens, temperature = self._sampling(spec)
+        return {'model': spec.model or self.model, 'max_tokens': max_tokens, 'temperature': temperature}
+
+    def _sampling(self, spec: PromptSpec) -> tuple:
+        """(max_tokens, temperature) of a mode, the global settings where it sets none"""
+        return (spec.max_tokens or self.max_token,
+                self.creatine if spec.temperature is None else spec.temperature)
+
+    async def _resilient_complete(self, messages: List[Dict[str, str]], model: str,
+                                  max_tokens: int, temperature: float) -> LLMResponse:
+        """Primary call guarded by the circuit breaker and hedged at the p95 deadline"""
+        if not self.breaker.allow():
+            self.resilience_stats['fallback_routed'] += 1
+            return await self.fallback_backend.complete(
+                messages, model=self.fallback_model, max_tokens=max_tokens, temperature=temperature
+            )
+
+        # Only this call may hand its half-open probe back, and only once, below
+        probing = self.breaker.state == self.breaker.HALF_OPEN
+
+        if not self.hedge_enabled:
+            try:
+                return await self._tracked_primary(messages, model, max_tokens, temperature)
+            except asyncio.CancelledError:
+                if probing:
+                    self.breaker.release_probe()
+                raise
+
+        primary = asyncio.ensure_future(self._tracked_primary(messages, model, max_tokens, temperature))
+        tasks = [primary]
+        try:
+            delay = max(self.hedge_min_delay, self.latency.percentile(self.hedge_percentile))
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.resilience_stats['hedged'] += 1
+            logger.warning(f"Primary request slower than {delay:.2f}s, sending hedge to {self.hedge_model}")
+            hedge = asyncio.ensure_future(self.hedge_backend.complete(
+                messages, model=self.hedge_model, max_tokens=max_tokens, temperature=temperature
+            ))
+            tasks.append(hedge)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.resilience_stats['hedge_wins'] += 1
+                        return task.result()
+            # Both failed: surface the primary error to the retry loop
+            return primary.result()
+        finally:
+            # Cancel the loser (or everything if we were cancelled ourselves)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    if task is primary and probing:
+                        # Release the probe now, not when the cancelled task gets to run
+                        self.breaker.release_probe()
+
+    async def _tracked_primary(self, messages: List[Dict[str, str]], model: str,
+                               max_tokens: int, temperature: float) -> LLMResponse:
+        """Primary backend call that feeds the latency tracker and the breaker"""
+        started = time.perf_counter()
+        try:
+            response = await self.backend.complete(
+                messages, model=model, max_tokens=max_tokens, temperature=temperature
+            )
+        except asyncio.CancelledError:
+            # Lost the hedge race: the elapsed time is still a useful lower bound
+            self.latency.observe(time.perf_counter() - started)
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.latency.observe(response.latency)
+        self.breaker.record_success()
+        return response
+
+    async def _summarize(self, summary: str, transcript: str) -> Optional[str]:
+        """Fold older exchanges into the running summary with a cheap call"""
+        content = (
+            f"Current summary:\n{summary or '(empty)'}\n\n"
+            f"New exchanges:\n{transcript}\n\n"
+            "Update the summary in at most 3 short sentences. Keep names, running jokes and topics."
+        )
+        try:
+            response = await self.backend.complete(
+                [
+                    {"role": "system", "content": "You compress chat history into a brief running summary."},
+                    {"role": "user", "content": content}
+                ],
+                model=self.summary_model,
+                max_tokens=self.summary_max_tokens,
+                temperature=0.2
+            )
+            self._record_usage(response)
+            return response.content
+        except Exception as e:
+            logger.error(f"Error summarizing conversation context: {e}")
+            return None
+
+    def prompt_tokens(self, mode: str) -> int:
+        """Token count of the static system prompt for a mode (counted once per prompt version)"""
+        return self.prompts.get(mode).system_tokens
+
+    def count_line_tokens(self, line: str, mode: str = 'normal') -> int:
+        """Token cost of one chat line inside the formatted user message"""
+        return self.token_counter.count(line) + self.prompts.get(mode).line_overhead
+
+    def _record_usage(self, response: LLMResponse, estimated_prompt_tokens: int = 0):
+        """Accumulate token usage reported by the backend"""
+        self.usage['requests'] += 1
+        self.usage['last_estimated_prompt_tokens'] = estimated_prompt_tokens
+        prompt_tokens = response.prompt_tokens
+        completion_tokens = response.completion_tokens
+        self.usage['prompt_tokens'] += prompt_tokens
+        self.usage['completion_tokens'] += completion_tokens
+        self.usage['total_tokens'] += prompt_tokens + completion_tokens
+        self.usage['last_prompt_tokens'] = prompt_tokens
+        self.usage['last_completion_tokens'] = completion_tokens
+
+    def _format_messages(self, messages: List[str], spec: PromptSpec) -> str:
+        """Format messages for ChatGPT analysis with the mode's line template"""
         # pprint.pprint(messages)
         if not messages:
             return ""
@@ -111,12 +347,12 @@ Don't reply to every message. Reply to a single message by name, or make a gener
                     message_text = msg['data'].get('message', '')
                     timestamp = msg['data'].get('timestamp', 0)
                     formatted.append(f"[{timestamp}] {user}: {message_text}")
-                    print(f"\n[{timestamp}] {user}: {message_text}")
                 else:
-                    formatted.append(f"Message {i}: {str(msg)}")
+                    formatted.append(spec.line_template.render(i, str(msg)))
             else:
-                formatted.append(f"Message {i}: {str(msg)}")
+                formatted.append(spec.line_template.render(i, str(msg)))
         
+        logger.debug("Formatted %d messages for analysis", len(formatted))
         return "\n".join(formatted)
     
     def _get_fallback_response(self) -> str:
@@ -127,30 +363,41 @@ Don't reply to every message. Reply to a single message by name, or make a gener
 📈 Forecast: Unable to predict due to technical issues"""
     
     async def test_connection(self) -> bool:
-        """Test OpenAI API connection"""
+        """Test the LLM backend connection"""
         try:
             await self._rate_limit()
-            
-            # Use OpenAI library for connection test
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": "Test connection"}
-                ],
-                max_tokens=10
-            )
-            
-            return response.choices[0].message.content is not None
-                    
+            return await self.backend.health()
         except Exception as e:
-            logger.error(f"OpenAI API connection test failed: {e}")
+            logger.error(f"LLM backend connection test failed: {e}")
             return False
+
+    def warm_up(self):
+        """Import and build the backend clients (blocking; run it off the event loop)"""
+        for backend in {self.backend, self.low_priority_backend, self.hedge_backend} - {None}:
+            backend.warm_up()
+
+    async def close(self):
+        """Close backend network clients"""
+        for backend in {self.backend, self.low_priority_backend, self.hedge_backend} - {None}:
+            await backend.close()
     
     def get_api_status(self) -> Dict[str, Any]:
         """Get API status information"""
         return {
             'api_key_configured': bool(self.api_key),
             'model': self.model,
+            'backend': self.backend.name,
+            'backends': {
+                'primary': self.backend.get_usage(),
+                'low_priority': self.low_priority_backend.get_usage() if self.low_priority_backend else None
+            },
             'last_request_time': self.last_request_time,
-            'rate_limit_delay': self.rate_limit_delay
+            'rate_limit_delay': self.rate_limit_delay,
+            'tokenizer': self.token_counter.backend,
+            'token_usage': dict(self.usage),
+            'latency': self.latency.get_status(),
+            'circuit_breaker': self.breaker.get_status(),
+            'resilience': dict(self.resilience_stats),
+            'contexts': self.contexts.get_status(),
+            'prompts': {mode: spec.version for mode, spec in self.prompts.active.items()}
         }
\ No newline at end of file
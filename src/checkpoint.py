@@ -0,0 +1,54 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+
+
+class RoomCheckpoint:
+    """On-disk cursor and queue state of one room, written at shutdown.
+
+    A graceful stop saves where the room was (message counter, last
+    processed id, recent history and dedup keys, messages not analyzed yet,
+    recent analyses); the next start restores it before connecting, so the
+    history page that the chat server sends after the reconnect only adds
+    what arrived while the bot was down. A checkpoint is consumed on load:
+    after a crash the room starts cold instead of replaying stale state.
+    """
+
+    def __init__(self, directory: str, room_id: str):
+        self.directory = directory
+        self.room_id = room_id
+        self.path = os.path.join(directory, f'{room_id}.json')
+
+    def save(self, state: Dict[str, Any]):
+        """Atomically persist the room state"""
+        os.makedirs(self.directory, exist_ok=True)
+        state = {'version': VERSION, 'room_id': self.room_id, 'saved_at': time.time(), **state}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Checkpoint saved to {self.path}")
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Read and remove the checkpoint; None if there is none or it is unusable"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Unreadable checkpoint {self.path}: {e}")
+            state = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        if not state or state.get('version') != VERSION or state.get('room_id') != self.room_id:
+            return None
+        return state
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from collections import deque
+from typing import List, Dict, Any, Callable, Awaitable, Optional
+
+from .tokenizer import TokenCounter, TOKENS_PER_MESSAGE, TOKENS_PER_REPLY
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of the conversation so far:\n"
+
+
+class ConversationContext:
+    """Rolling context of one room: a running summary plus the last K exchanges"""
+
+    def __init__(self, max_exchanges: int, counter: TokenCounter):
+        self.max_exchanges = max(0, max_exchanges)
+        self.counter = counter
+        self.summary = ""
+        self.summary_tokens = 0
+        self.exchanges = deque()   # (user_content, reply, tokens)
+        self.to_compact = []       # exchanges waiting to be folded into the summary
+        self.compacting = False
+        self.compactions = 0
+
+    def add(self, user_content: str, reply: str):
+        tokens = (
+            self.counter.count(user_content) + self.counter.count(reply)
+            + 2 * TOKENS_PER_MESSAGE
+        )
+        self.exchanges.append((user_content, reply, tokens))
+        while len(self.exchanges) > self.max_exchanges:
+            self.to_compact.append(self.exchanges.popleft())
+
+    def history_tokens(self) -> int:
+        return sum(tokens for _, _, tokens in self.exchanges)
+
+    def set_summary(self, summary: str):
+        self.summary = summary.strip()
+        self.summary_tokens = self.counter.count(SUMMARY_PREFIX + self.summary) + TOKENS_PER_MESSAGE if self.summary else 0
+
+
+class ContextManager:
+    """Per-room conversation memory kept under a fixed prompt token ceiling.
+
+    The last ``max_exchanges`` request/reply pairs are sent verbatim; older
+    pairs are folded into a running summary by a cheap summarization call
+    that runs in the background, so the cost per analysis stays flat.
+    """
+
+    def __init__(self, summarize: Callable[[str, str], Awaitable[Optional[str]]], counter: TokenCounter,
+                 max_exchanges: int = 4, token_ceiling: int = 1200):
+        self.summarize = summarize
+        self.counter = counter
+        self.max_exchanges = max_exchanges
+        self.token_ceiling = token_ceiling
+        self.rooms: Dict[str, ConversationContext] = {}
+        self._tasks = set()
+
+    def get(self, room_id: str) -> ConversationContext:
+        context = self.rooms.get(room_id)
+        if context is None:
+            context = ConversationContext(self.max_exchanges, self.counter)
+            self.rooms[room_id] = context
+        return context
+
+    def build_messages(self, room_id: Optional[str], system_message: Dict[str, str], system_tokens: int,
+                       user_content: str) -> List[Dict[str, str]]:
+        """Assemble system prompt, summary, recent exchanges and the new batch.
+
+        ``system_message`` is the mode's prebuilt message, shared by every
+        request so the prompt prefix stays byte-identical between calls.
+        """
+        messages = [system_message]
+        if room_id is None:
+            messages.append({"role": "user", "content": user_content})
+            return messages
+
+        context = self.get(room_id)
+        used = (
+            system_tokens + TOKENS_PER_MESSAGE + TOKENS_PER_REPLY
+            + self.counter.count(user_content) + TOKENS_PER_MESSAGE
+        )
+
+        if context.summary and used + context.summary_tokens <= self.token_ceiling:
+            messages.append({"role": "system", "content": SUMMARY_PREFIX + context.summary})
+            used += context.summary_tokens
+
+        # Newest exchanges first until the ceiling is reached
+        history = []
+        for user, reply, tokens in reversed(context.exchanges):
+            if used + tokens > self.token_ceiling:
+                break
+            history.append((user, reply))
+            used += tokens
+
+        for user, reply in reversed(history):
+            messages.append({"role": "user", "content": user})
+            messages.append({"role": "assistant", "content": reply})
+
+        messages.append({"role": "user", "content": user_content})
+        return messages
+
+    def record(self, room_id: Optional[str], user_content: str, reply: str):
+        """Store an exchange and schedule compaction of the evicted ones"""
+        if room_id is None or not reply:
+            return
+        context = self.get(room_id)
+        context.add(user_content, reply)
+        if context.to_compact and not context.compacting:
+            context.compacting = True
+            task = asyncio.get_running_loop().create_task(self._compact(context))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _compact(self, context: ConversationContext):
+        try:
+            while context.to_compact:
+                batch, context.to_compact = context.to_compact, []
+                transcript = "\n".join(
+                    f"Chat:\n{user}\nYou replied: {reply}" for user, reply, _ in batch
+                )
+                summary = await self.summarize(context.summary, transcript)
+                if summary:
+                    context.set_summary(summary)
+                    context.compactions += 1
+                else:
+                    logger.warning(f"Summarization failed, dropping {len(batch)} old exchanges")
+        except Exception as e:
+            logger.error(f"Error compacting conversation context: {e}")
+        finally:
+            context.compacting = False
+
+    def configure(self, max_exchanges: Optional[int] = None, token_ceiling: Optional[int] = None):
+        """Change limits for every room; exchanges over a lower limit are queued for compaction"""
+        if token_ceiling is not None:
+            self.token_ceiling = token_ceiling
+        if max_exchanges is not None:
+            self.max_exchanges = max_exchanges
+            for context in self.rooms.values():
+                context.max_exchanges = max(0, max_exchanges)
+                while len(context.exchanges) > context.max_exchanges:
+                    context.to_compact.append(context.exchanges.popleft())
+
+    async def drain(self, timeout: float):
+        """Wait up to ``timeout`` seconds for running summarizations"""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+
+    def export(self, room_id: str) -> Optional[Dict[str, Any]]:
+        """Summary and exchanges of a room for a checkpoint"""
+        context = self.rooms.get(room_id)
+        if context is None:
+            return None
+        return {
+            'summary': context.summary,
+            'exchanges': [[user, reply] for user, reply, _ in context.exchanges],
+            'to_compact': [[user, reply] for user, reply, _ in context.to_compact]
+        }
+
+    def restore(self, room_id: str, state: Dict[str, Any]):
+        """Load a room's context from a checkpoint; compaction resumes with the next record"""
+        context = self.get(room_id)
+        context.set_summary(state.get('summary') or '')
+        for user, reply in state.get('to_compact') or []:
+            context.to_compact.append((user, reply, 0))
+        for user, reply in state.get('exchanges') or []:
+            context.add(user, reply)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get per-room context statistics"""
+        return {
+            room_id: {
+                'exchanges': len(context.exchanges),
+                'history_tokens': context.history_tokens(),
+                'summary_tokens': context.summary_tokens,
+                'compactions': context.compactions
+            }
+            for room_id, context in list(self.rooms.items())
+        }
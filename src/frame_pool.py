@@ -0,0 +1,168 @@
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Tuple, Callable, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# (event_name, payload) - payload keeps only scalar fields of the original event
+Record = Tuple[str, Any]
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to a parent-owned segment; the parent is responsible for unlinking it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13: workers share the parent's resource tracker
+        return shared_memory.SharedMemory(name=name)
+
+
+def decode_frames(shm_name: str, offsets: List[Tuple[int, int]], buffer_size: int) -> List[Record]:
+    """Worker entry point: parse a batch of ``42[...]`` Socket.IO event frames.
+
+    Frames are read from shared memory, so only the offsets travel through the
+    pipe. Returns one compact record per frame, in the same order.
+    """
+    shm = _attach(shm_name)
+    records = []
+    try:
+        data = shm.buf
+        for start, end in offsets:
+            try:
+                event = json.loads(bytes(data[start:end]).decode('utf-8'))
+                name = event[0]
+                payload = event[1] if len(event) > 1 else None
+            except Exception:
+                records.append(('invalid', None))
+                continue
+
+            if name == 'newMessage' and isinstance(payload, dict):
+                compact = {
+                    key: value for key, value in payload.items()
+                    if value is None or isinstance(value, (str, int, float, bool))
+                }
+                message = compact.get('message')
+                if isinstance(message, str) and buffer_size and len(message) > buffer_size:
+                    compact['message'] = message[:buffer_size]
+                records.append((name, compact))
+            else:
+                records.append((name, None))
+        del data
+    finally:
+        shm.close()
+    return records
+
+
+class FrameDecoderPool:
+    """Offloads JSON decoding of chat event frames to a process pool.
+
+    The websocket thread only appends raw frames; full batches (or whatever
+    is pending every ``flush_interval``) are copied into one shared-memory
+    segment and decoded by a worker. A collector thread consumes the results
+    strictly in submission order, so records reach ``on_records`` in frame
+    order and message ``_id`` assignment stays monotonic. ``on_records`` also
+    gets the ``(received, decoded)`` wall-clock stamps of the batch, where
+    ``received`` is the arrival of its first frame.
+    """
+
+    def __init__(self, on_records: Callable[[List[Record], Tuple[float, float]], None], workers: int = 2, batch_size: int = 64,
+                 flush_interval: float = 0.05, buffer_size: int = 100):
+        self.on_records = on_records
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size or 0
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=max(1, workers),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        self._batch: List[bytes] = []
+        self._batch_started = 0.0
+        self._batch_lock = threading.Lock()
+        self._in_flight = deque()
+        self._in_flight_cond = threading.Condition()
+        self._running = True
+
+        self.stats = {'frames': 0, 'batches': 0, 'records': 0, 'errors': 0}
+
+        self._flusher = threading.Thread(target=self._flush_loop, name='frame-pool-flush', daemon=True)
+        self._collector = threading.Thread(target=self._collect_loop, name='frame-pool-collect', daemon=True)
+        self._flusher.start()
+        self._collector.start()
+
+    def submit(self, frame: str):
+        """Queue a raw event frame (without the ``42`` prefix)"""
+        with self._batch_lock:
+            if not self._batch:
+                self._batch_started = time.time()
+            self._batch.append(frame.encode('utf-8'))
+            self.stats['frames'] += 1
+            if len(self._batch) >= self.batch_size:
+                self._dispatch_locked()
+
+    def _dispatch_locked(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+
+        offsets = []
+        position = 0
+        for frame in batch:
+            offsets.append((position, position + len(frame)))
+            position += len(frame)
+
+        shm = shared_memory.SharedMemory(create=True, size=max(1, position))
+        shm.buf[:position] = b''.join(batch)
+        future = self.executor.submit(decode_frames, shm.name, offsets, self.buffer_size)
+        self.stats['batches'] += 1
+
+        with self._in_flight_cond:
+            self._in_flight.append((future, shm, self._batch_started))
+            self._in_flight_cond.notify()
+
+    def flush(self):
+        """Dispatch the partially filled batch right away"""
+        with self._batch_lock:
+            self._dispatch_locked()
+
+    def _flush_loop(self):
+        while self._running:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _collect_loop(self):
+        while True:
+            with self._in_flight_cond:
+                while not self._in_flight and self._running:
+                    self._in_flight_cond.wait()
+                if not self._in_flight:
+                    return
+                future, shm, started = self._in_flight.popleft()
+
+            try:
+                records = future.result()
+                self.stats['records'] += len(records)
+                self.on_records(records, (started, time.time()))
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Frame decode batch failed: {e}")
+            finally:
+                shm.close()
+                shm.unlink()
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Flush, wait for in-flight batches and shut the workers down"""
+        self.flush()
+        self._running = False
+        with self._in_flight_cond:
+            self._in_flight_cond.notify_all()
+        self._collector.join(timeout)
+        self.executor.shutdown(wait=True, cancel_futures=False)
+
+    def get_stats(self):
+        return dict(self.stats)
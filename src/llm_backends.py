@@ -0,0 +1,368 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, AsyncIterator
+
+from .metrics import LLM_LATENCY, LLM_TOKENS, LLM_ERRORS
+from .tokenizer import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LLMResponse:
+    """Normalized completion result returned by every backend"""
+    content: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    backend: str = ''
+
+
+class LLMBackendError(Exception):
+    """Raised by backends on failed requests; carries the HTTP status when known"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMBackend(ABC):
+    """Interface of a chat-completion provider used by ChatGPTClient"""
+
+    name = 'base'
+
+    def __init__(self):
+        self.usage = {
+            'requests': 0,
+            'errors': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'total_latency': 0.0
+        }
+        self._latency_metric = LLM_LATENCY.labels(self.name)
+        self._prompt_metric = LLM_TOKENS.labels(self.name, 'prompt')
+        self._completion_metric = LLM_TOKENS.labels(self.name, 'completion')
+
+    @abstractmethod
+    async def complete(self, messages: List[Dict[str, str]], model: str,
+                       max_tokens: int, temperature: float) -> LLMResponse:
+        """Run a chat completion and return the full reply"""
+
+    @abstractmethod
+    def stream(self, messages: List[Dict[str, str]], model: str,
+               max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        """Run a chat completion and yield reply text chunks as they arrive"""
+
+    @abstractmethod
+    async def health(self) -> bool:
+        """Check that the provider is reachable"""
+
+    async def close(self):
+        """Release network resources"""
+
+    def warm_up(self):
+        """Build the SDK client now (imports included); safe to run in a worker thread"""
+
+    def _record(self, response: LLMResponse):
+        self.usage['requests'] += 1
+        self.usage['prompt_tokens'] += response.prompt_tokens
+        self.usage['completion_tokens'] += response.completion_tokens
+        self.usage['total_latency'] += response.latency
+        self._latency_metric.observe(response.latency)
+        self._prompt_metric.inc(response.prompt_tokens)
+        self._completion_metric.inc(response.completion_tokens)
+
+    def _record_error(self, status_code: Optional[int] = None):
+        self.usage['errors'] += 1
+        LLM_ERRORS.labels(self.name, status_code or 'none').inc()
+
+    def get_usage(self) -> Dict[str, Any]:
+        """Get accumulated usage of this backend"""
+        usage = dict(self.usage)
+        total_latency = usage.pop('total_latency')
+        usage['avg_latency'] = total_latency / usage['requests'] if usage['requests'] else 0.0
+        usage['backend'] = self.name
+        return usage
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI API through the official async SDK"""
+
+    name = 'openai'
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, timeout: float = 30.0):
+        super().__init__()
+        # The SDK is imported on first use: it is the slowest import of the bot
+        self._options = {'api_key': api_key, 'base_url': base_url, 'timeout': timeout, 'max_retries': 0}
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(**self._options)
+        return self._client
+
+    def warm_up(self):
+        self.client
+
+    async def complete(self, messages, model, max_tokens, temperature) -> LLMResponse:
+        started = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+        except Exception as e:
+            self._record_error(getattr(e, 'status_code', None))
+            raise LLMBackendError(str(e), getattr(e, 'status_code', None)) from e
+
+        usage = getattr(response, 'usage', None)
+        result = LLMResponse(
+            content=response.choices[0].message.content or '',
+            model=getattr(response, 'model', model),
+            prompt_tokens=getattr(usage, 'prompt_tokens', 0) or 0,
+            completion_tokens=getattr(usage, 'completion_tokens', 0) or 0,
+            latency=time.perf_counter() - started,
+            backend=self.name
+        )
+        self._record(result)
+        return result
+
+    async def stream(self, messages, model, max_tokens, temperature) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        result = LLMResponse(content='', model=model, backend=self.name)
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in response:
+                if chunk.usage:
+                    result.prompt_tokens = chunk.usage.prompt_tokens or 0
+                    result.completion_tokens = chunk.usage.completion_tokens or 0
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            self._record_error(getattr(e, 'status_code', None))
+            raise LLMBackendError(str(e), getattr(e, 'status_code', None)) from e
+        result.latency = time.perf_counter() - started
+        self._record(result)
+
+    async def health(self) -> bool:
+        try:
+            await self.client.models.list()
+            return True
+        except Exception as e:
+            logger.error(f"OpenAI health check failed: {e}")
+            return False
+
+    async def close(self):
+        if self._client:
+            await self._client.close()
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Any server speaking the OpenAI chat-completions HTTP protocol.
+
+    Works with llama.cpp server, vLLM and Ollama (``http://localhost:11434/v1``).
+    """
+
+    name = 'http'
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, timeout: float = 60.0):
+        super().__init__()
+        self.headers = {'Content-Type': 'application/json'}
+        if api_key:
+            self.headers['Authorization'] = f'Bearer {api_key}'
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._client = None
+
+    @property
+    def client(self):
+        # httpx is imported on first use
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=8, max_connections=16)
+            )
+        return self._client
+
+    def warm_up(self):
+        self.client
+
+    def _payload(self, messages, model, max_tokens, temperature, stream=False) -> Dict[str, Any]:
+        return {
+            'model': model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'stream': stream
+        }
+
+    async def complete(self, messages, model, max_tokens, temperature) -> LLMResponse:
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(
+                '/chat/completions',
+                json=self._payload(messages, model, max_tokens, temperature)
+            )
+        except Exception as e:
+            self._record_error()
+            raise LLMBackendError(str(e)) from e
+        if response.status_code != 200:
+            self._record_error(response.status_code)
+            raise LLMBackendError(f"HTTP {response.status_code}: {response.text[:200]}", response.status_code)
+
+        data = response.json()
+        usage = data.get('usage') or {}
+        content = data['choices'][0]['message'].get('content') or ''
+        result = LLMResponse(
+            content=content,
+            model=data.get('model', model),
+            prompt_tokens=usage.get('prompt_tokens', 0),
+            completion_tokens=usage.get('completion_tokens') or estimate_tokens(content),
+            latency=time.perf_counter() - started,
+            backend=self.name
+        )
+        self._record(result)
+        return result
+
+    async def stream(self, messages, model, max_tokens, temperature) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        result = LLMResponse(content='', model=model, backend=self.name)
+        try:
+            async with self.client.stream(
+                'POST', '/chat/completions',
+                json=self._payload(messages, model, max_tokens, temperature, stream=True)
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise LLMBackendError(f"HTTP {response.status_code}: {body[:200]!r}", response.status_code)
+                async for line in response.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+                    chunk = json.loads(data)
+                    if chunk.get('usage'):
+                        result.prompt_tokens = chunk['usage'].get('prompt_tokens', 0)
+                        result.completion_tokens = chunk['usage'].get('completion_tokens', 0)
+                    choices = chunk.get('choices') or []
+                    text = choices[0].get('delta', {}).get('content') if choices else None
+                    if text:
+                        yield text
+        except LLMBackendError as e:
+            self._record_error(e.status_code)
+            raise
+        except Exception as e:
+            self._record_error()
+            raise LLMBackendError(str(e)) from e
+        result.latency = time.perf_counter() - started
+        self._record(result)
+
+    async def health(self) -> bool:
+        try:
+            response = await self.client.get('/models')
+            return response.status_code == 200
+        except Exception as e:
+            logger.error(f"Health check of {self.base_url} failed: {e}")
+            return False
+
+    async def close(self):
+        if self._client:
+            await self._client.aclose()
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic offline backend for benchmarks and load tests.
+
+    The reply depends only on the request content, latency is fixed and
+    every ``fail_every``-th request raises, so runs are reproducible.
+    """
+
+    name = 'fake'
+
+    REPLIES = [
+        "Beep boop, your chart looks like my home galaxy: mostly empty space.",
+        "On my planet we call this a pump. You call it breakfast.",
+        "I scanned the chat. Diamond hands detected, brain cells pending.",
+        "Relax, earthlings. Even comets dip before they shine.",
+    ]
+
+    def __init__(self, latency: float = 0.0, fail_every: int = 0):
+        super().__init__()
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = 0
+
+    def _reply(self, messages) -> str:
+        digest = hashlib.blake2b(messages[-1]['content'].encode(), digest_size=4).digest()
+        return self.REPLIES[int.from_bytes(digest, 'big') % len(self.REPLIES)]
+
+    def _check_failure(self):
+        self.calls += 1
+        if self.fail_every and self.calls % self.fail_every == 0:
+            self._record_error(500)
+            raise LLMBackendError("Fake backend failure", 500)
+
+    async def complete(self, messages, model, max_tokens, temperature) -> LLMResponse:
+        started = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._check_failure()
+        content = self._reply(messages)
+        result = LLMResponse(
+            content=content,
+            model=model,
+            prompt_tokens=sum(estimate_tokens(m['content']) for m in messages),
+            completion_tokens=estimate_tokens(content),
+            latency=time.perf_counter() - started,
+            backend=self.name
+        )
+        self._record(result)
+        return result
+
+    async def stream(self, messages, model, max_tokens, temperature) -> AsyncIterator[str]:
+        result = await self.complete(messages, model, max_tokens, temperature)
+        for word in result.content.split(' '):
+            yield word + ' '
+
+    async def health(self) -> bool:
+        return True
+
+
+def create_backend(kind: str, config: Dict[str, Any], api_key: Optional[str] = None) -> LLMBackend:
+    """Build a backend by name: ``openai``, ``http`` or ``fake``"""
+    kind = (kind or 'openai').lower()
+    if kind == 'openai':
+        return OpenAIBackend(api_key=api_key, timeout=config.get('LLM_TIMEOUT', 30))
+    if kind == 'http':
+        return OpenAICompatibleBackend(
+            base_url=config.get('LLM_BASE_URL') or 'http://localhost:8080/v1',
+            api_key=config.get('LLM_API_KEY'),
+            timeout=config.get('LLM_TIMEOUT', 30)
+        )
+    if kind == 'fake':
+        return FakeBackend(
+            latency=config.get('FAKE_LLM_LATENCY', 0.0),
+            fail_every=config.get('FAKE_LLM_FAIL_EVERY', 0)
+        )
+    raise ValueError(f"Unknown LLM backend: {kind}")
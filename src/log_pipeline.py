@@ -0,0 +1,185 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional, List
+
+# Attributes every LogRecord has; anything else was passed through ``extra=``
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+DEFAULT_RATE_LIMITS = 'src.pump_chat_client=20,src.chatgpt_client=20,werkzeug=50'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['DroppingQueueHandler'] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra=`` fields are kept as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+            'process': record.process
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Per-module token bucket for records below WARNING.
+
+    ``limits`` maps a logger-name prefix to records per second (burst is one
+    second worth). Suppressed records are counted and reported on the next
+    record that gets through, so floods shrink to a trickle plus a total.
+    """
+
+    def __init__(self, limits: Dict[str, float]):
+        super().__init__()
+        self.limits = limits
+        self._buckets: Dict[str, Optional[List[float]]] = {}
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    def _bucket_for(self, name: str) -> Optional[List[float]]:
+        bucket = self._buckets.get(name, False)
+        if bucket is not False:
+            return bucket
+        prefix = max((p for p in self.limits if name == p or name.startswith(p + '.')), key=len, default=None)
+        # [tokens, last_refill, rate, suppressed]
+        bucket = [self.limits[prefix], time.monotonic(), self.limits[prefix], 0] if prefix else None
+        self._buckets[name] = bucket
+        return bucket
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        bucket = self._bucket_for(record.name)
+        if bucket is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            bucket[0] = min(bucket[2], bucket[0] + (now - bucket[1]) * bucket[2])
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[3] += 1
+                self.suppressed_total += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[3] = bucket[3], 0
+        if suppressed:
+            record.suppressed = suppressed
+            record.msg = f"{record.getMessage()} [+{suppressed} similar suppressed]"
+            record.args = None
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the writer falls behind instead of blocking"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_rate_limits(value: str) -> Dict[str, float]:
+    """Parse ``module=rate,module=rate`` into a dict"""
+    limits = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        name, rate = item.split('=', 1)
+        try:
+            limits[name.strip()] = float(rate)
+        except ValueError:
+            continue
+    return limits
+
+
+def setup_logging(config: Optional[Dict[str, Any]] = None, log_file: Optional[str] = None) -> logging.Logger:
+    """Route all logging through a bounded queue to a background writer thread.
+
+    The calling thread only formats the message and enqueues it; the
+    rotating file and the console are written by the ``QueueListener``.
+    Calling it again reconfigures the pipeline.
+    """
+    global _listener, _queue_handler
+    config = config or {}
+    shutdown_logging()
+
+    level = getattr(logging, str(config.get('LOG_LEVEL') or 'INFO').upper(), logging.INFO)
+    if (config.get('LOG_FORMAT') or 'text').lower() == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file or config.get('LOG_FILE') or 'bot.log',
+        maxBytes=config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backupCount=config.get('LOG_BACKUP_COUNT', 5),
+        encoding='utf-8'
+    )
+    console_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=config.get('LOG_QUEUE_SIZE', 10000)))
+    _queue_handler.addFilter(RateLimitFilter(parse_rate_limits(config.get('LOG_RATE_LIMITS', DEFAULT_RATE_LIMITS))))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        _queue_handler.queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    return logging.getLogger(__name__)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """Dropped and rate-limited record counts"""
+    if _queue_handler is None:
+        return {'enabled': False}
+    limiter = next((f for f in _queue_handler.filters if isinstance(f, RateLimitFilter)), None)
+    return {
+        'enabled': True,
+        'queued': _queue_handler.queue.qsize(),
+        'dropped': _queue_handler.dropped,
+        'rate_limited': limiter.suppressed_total if limiter else 0
+    }
+
+
+atexit.register(shutdown_logging)
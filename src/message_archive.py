@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import List, Dict, Any, Optional, Iterator
+
+logger = logging.getLogger(__name__)
+
+_SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+class MessageArchive:
+    """Append-only JSONL archive of chat messages and analyses per room.
+
+    Layout: ``<root>/<room>/messages.jsonl`` and ``<root>/<room>/analyses.jsonl``.
+    Every record gets an ``archived_at`` unix timestamp used for range queries.
+    Writes go through buffered file handles; call ``flush`` to persist them.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._files = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _room_dir(self, room_id: str) -> str:
+        path = os.path.join(self.root, _SAFE_NAME_RE.sub('_', room_id))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _path(self, room_id: str, kind: str) -> str:
+        return os.path.join(self._room_dir(room_id), f'{kind}.jsonl')
+
+    def _append(self, room_id: str, kind: str, record: Dict[str, Any]):
+        line = json.dumps({'archived_at': time.time(), **record}, ensure_ascii=False, default=str)
+        with self._lock:
+            handle = self._files.get((room_id, kind))
+            if handle is None:
+                handle = open(self._path(room_id, kind), 'a', encoding='utf-8')
+                self._files[(room_id, kind)] = handle
+            handle.write(line + '\n')
+
+    def append_message(self, room_id: str, message: Dict[str, Any]):
+        """Archive an ingested chat message"""
+        try:
+            self._append(room_id, 'messages', message)
+        except Exception as e:
+            logger.error(f"Error archiving message: {e}")
+
+    def append_analysis(self, room_id: str, analysis: Dict[str, Any]):
+        """Archive an analysis result (live or from a batch job)"""
+        try:
+            self._append(room_id, 'analyses', analysis)
+        except Exception as e:
+            logger.error(f"Error archiving analysis: {e}")
+
+    def iter_records(self, room_id: str, kind: str = 'messages', since: Optional[float] = None,
+                     until: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate archived records of a room within [since, until)"""
+        self.flush()
+        path = self._path(room_id, kind)
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                ts = record.get('archived_at', 0)
+                if since is not None and ts < since:
+                    continue
+                if until is not None and ts >= until:
+                    continue
+                yield record
+
+    def load_messages(self, room_id: str, since: Optional[float] = None,
+                      until: Optional[float] = None) -> List[Dict[str, Any]]:
+        return list(self.iter_records(room_id, 'messages', since, until))
+
+    def flush(self):
+        """Flush buffered writes to disk"""
+        with self._lock:
+            for handle in self._files.values():
+                handle.flush()
+
+    def close(self):
+        with self._lock:
+            for handle in self._files.values():
+                handle.close()
+            self._files.clear()
@@ -0,0 +1,338 @@
+import bisect
+import math
+import threading
+import time
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple
+
+# Prometheus text exposition format 0.0.4
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], *extra: str) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(e for e in extra if e)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """Metric family: one child per label-value tuple.
+
+    ``labels()`` creates or returns the cached child; hot paths should bind
+    their children once (e.g. in ``__init__``) and only call ``inc``/
+    ``observe`` afterwards, which touches plain attributes and allocates
+    nothing. Updates are not locked: under the GIL a concurrent increment
+    can very rarely be lost, which is acceptable for monitoring.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> Any:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        """Drop a child (e.g. when a room is released)"""
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    @property
+    def sample_name(self) -> str:
+        return self.name
+
+    def _samples(self, const: str) -> List[str]:
+        raise NotImplementedError
+
+    def expose(self, const: str = '') -> str:
+        lines = [f'# HELP {self.sample_name} {self.documentation}', f'# TYPE {self.sample_name} {self.kind}']
+        lines.extend(self._samples(const))
+        return '\n'.join(lines)
+
+
+class _CounterChild:
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Read an existing monotonic count at scrape time (no cost on the hot path)"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return self.function()
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    @property
+    def sample_name(self) -> str:
+        return f'{self.name}_total'
+
+    def inc(self, amount: float = 1):
+        self._default.value += amount
+
+    def _samples(self, const: str) -> List[str]:
+        return [
+            f'{self.name}_total{_format_labels(self.labelnames, key, const)} {_format_value(child.get())}'
+            for key, child in list(self._children.items())
+        ]
+
+
+class _GaugeChild:
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the value at scrape time instead of on every change"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return self.function()
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time"""
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        self._default.function = function
+
+    def _samples(self, const: str) -> List[str]:
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key, const)} {_format_value(child.get())}'
+            for key, child in list(self._children.items())
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ('upper_bounds', 'counts', 'sum')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> '_Timer':
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('child', 'started')
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; cumulative counts are only built at scrape time"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.upper_bounds = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _samples(self, const: str) -> List[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            counts = list(child.counts)
+            for bound, count in zip(self.upper_bounds + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, const, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key, const)
+            lines.append(f'{self.name}_sum{labels} {_format_value(child.sum)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Collection of metric families rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def expose(self, const_labels: Optional[Dict[str, str]] = None) -> str:
+        """Render every family; ``const_labels`` are added to all samples (e.g. the shard worker)"""
+        const = ','.join(f'{k}="{_escape(str(v))}"' for k, v in (const_labels or {}).items())
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.expose(const) for metric in metrics) + '\n'
+
+
+def merge_expositions(texts: Iterable[str]) -> str:
+    """Merge text expositions of several processes into one (one HELP/TYPE per family)"""
+    families: Dict[str, Tuple[List[str], List[str]]] = {}
+    for text in texts:
+        current = None
+        for line in text.splitlines():
+            if line.startswith('# HELP ') or line.startswith('# TYPE '):
+                current = line.split(' ', 3)[2]
+                headers, _ = families.setdefault(current, ([], []))
+                if line not in headers:
+                    headers.append(line)
+            elif line and current is not None:
+                families[current][1].append(line)
+    return '\n'.join('\n'.join(headers + samples) for headers, samples in families.values()) + '\n'
+
+
+REGISTRY = Registry()
+
+# Chat ingest
+CHAT_FRAMES = REGISTRY.counter(
+    'pumpbot_chat_frames', 'Socket.IO frames received, by packet type', ['type'])
+CHAT_EVENTS = REGISTRY.counter(
+    'pumpbot_chat_events_decoded', 'Chat events decoded, by event name', ['event'])
+CHAT_MESSAGES = REGISTRY.counter(
+    'pumpbot_chat_messages', 'Chat messages ingested per room', ['room'])
+CHAT_RECONNECTS = REGISTRY.counter(
+    'pumpbot_chat_reconnects', 'Successful chat reconnects per room', ['room'])
+CHAT_DOWNTIME = REGISTRY.counter(
+    'pumpbot_chat_downtime_seconds', 'Seconds spent disconnected between sessions', ['room'])
+
+# Analysis pipeline
+QUEUE_DEPTH = REGISTRY.gauge(
+    'pumpbot_queue_depth', 'Messages waiting in a pipeline stage', ['room', 'stage'])
+INGEST_TO_ANALYSIS = REGISTRY.histogram(
+    'pumpbot_ingest_to_analysis_seconds', 'Time from message ingest to its analysis request', ['room'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0))
+ANALYSES = REGISTRY.counter(
+    'pumpbot_analyses', 'Completed analysis cycles per room', ['room'])
+MESSAGES_SHED = REGISTRY.counter(
+    'pumpbot_messages_shed', 'Messages dropped before analysis, by reason', ['room', 'reason'])
+LOOP_LAG = REGISTRY.gauge(
+    'pumpbot_loop_lag_seconds', 'Smoothed event loop lag seen by the room', ['room'])
+DEGRADED = REGISTRY.gauge(
+    'pumpbot_degraded', '1 while the room runs in degraded mode', ['room'])
+
+TRACE_STAGE_LATENCY = REGISTRY.histogram(
+    'pumpbot_trace_stage_seconds', 'Per-message latency of each stage from socket frame to analysis commit',
+    ['room', 'stage'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+
+# LLM backends
+LLM_LATENCY = REGISTRY.histogram(
+    'pumpbot_llm_request_duration_seconds', 'LLM completion latency', ['backend'])
+LLM_TOKENS = REGISTRY.counter(
+    'pumpbot_llm_tokens', 'Tokens reported by the LLM backend', ['backend', 'kind'])
+LLM_ERRORS = REGISTRY.counter(
+    'pumpbot_llm_errors', 'Failed LLM requests by status code', ['backend', 'status'])
+
+# HTTP API
+API_LATENCY = REGISTRY.histogram(
+    'pumpbot_api_request_duration_seconds', 'Dashboard API latency per route', ['route', 'method', 'status'])
+API_REJECTED = REGISTRY.counter(
+    'pumpbot_api_rejected', 'API requests rejected before reaching the bot, by reason', ['reason'])
@@ -0,0 +1,255 @@
+import heapq
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterable, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+_NORMALIZE_RE = re.compile(r'[^a-z0-9а-яё]+')
+
+
+class MessagePriorityQueue:
+    """Bounded, scored queue that sits between chat ingest and process_cycle.
+
+    Each message gets a static priority when it is pushed:
+
+        priority = arrival_time / recency_scale + bonus
+
+    Because every item ages at the same rate, adding the arrival time is
+    equivalent to an exponential recency decay and never needs re-scoring.
+    The bonus rewards direct mentions, questions, holder status / reputation
+    fields in the payload and novel text, and penalizes repeated lines.
+
+    Two heaps over the same entries keep push, pop-best and evict-worst at
+    O(log n); removed entries are invalidated lazily. Items older than
+    ``max_age`` seconds are dropped instead of being analyzed.
+
+    Backpressure: reaching ``max_size`` (the high watermark) turns on
+    ``shedding`` until analysis drains the queue to ``low_watermark``. A
+    full queue evicts by ``shed_policy``: ``lowest_priority`` (the worst
+    score), ``oldest`` (the earliest arrival) or ``sample`` (additionally,
+    while shedding only ``sample_rate`` of new messages are admitted;
+    mentions always are). Every message dropped before analysis is
+    counted in ``stats``.
+    """
+
+    SHED_POLICIES = ('lowest_priority', 'oldest', 'sample')
+
+    MENTION_BONUS = 3.0
+    QUESTION_BONUS = 1.5
+    HOLDER_BONUS = 1.0
+    REPUTATION_WEIGHT = 0.5
+    NOVELTY_BONUS = 0.5
+    REPEAT_PENALTY = 2.0
+
+    def __init__(self, max_size: int = 200, max_age: float = 60.0, recency_scale: float = 10.0,
+                 mention_keywords: Iterable[str] = (), novelty_window: int = 500,
+                 low_watermark: float = 0.75, shed_policy: str = 'lowest_priority', sample_rate: float = 0.25):
+        self.max_size = max(1, int(max_size))
+        self.low_watermark_ratio = low_watermark
+        self.low_watermark = max(0, min(self.max_size - 1, int(self.max_size * low_watermark)))
+        if shed_policy not in self.SHED_POLICIES:
+            logger.warning(f"Unknown shed policy {shed_policy!r}, using lowest_priority")
+            shed_policy = 'lowest_priority'
+        self.shed_policy = shed_policy
+        self.sample_rate = min(1.0, max(0.0, sample_rate))
+        self.shedding = False
+        self._sample_credit = 0.0
+        self.max_age = max_age
+        self.recency_scale = max(recency_scale, 1e-6)
+        self.mention_keywords = [k.lower() for k in mention_keywords if k]
+        self.novelty_window = novelty_window
+
+        self._lock = threading.Lock()
+        self._best = []   # (-priority, seq) max-heap for selection
+        self._worst = []  # (priority, -seq) min-heap for eviction
+        self._alive: Dict[int, tuple] = {}
+        self._seq = 0
+        self._seen = OrderedDict()
+        self._epoch = time.monotonic()
+
+        # Statistics
+        self.stats = {
+            'pushed': 0,
+            'analyzed': 0,
+            'dropped_overflow': 0,
+            'dropped_expired': 0,
+            'dropped_sampled': 0,
+            'shed_episodes': 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._alive)
+
+    def score(self, message: Dict[str, Any], arrived: float) -> float:
+        """Compute the static priority of a message"""
+        text = message.get('message') or ''
+        lowered = text.lower()
+        bonus = 0.0
+
+        if self.mention_keywords and any(k in lowered for k in self.mention_keywords):
+            bonus += self.MENTION_BONUS
+        if '?' in text:
+            bonus += self.QUESTION_BONUS
+
+        if message.get('isHolder') or message.get('is_holder') or message.get('holder'):
+            bonus += self.HOLDER_BONUS
+        reputation = message.get('reputation', message.get('userReputation'))
+        if isinstance(reputation, (int, float)) and reputation > 0:
+            bonus += self.REPUTATION_WEIGHT * math.log1p(reputation)
+
+        key = hashlib.blake2b(_NORMALIZE_RE.sub(' ', lowered).strip().encode(), digest_size=8).digest()
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            bonus -= self.REPEAT_PENALTY
+        else:
+            self._seen[key] = True
+            if len(self._seen) > self.novelty_window:
+                self._seen.popitem(last=False)
+            bonus += self.NOVELTY_BONUS
+
+        return (arrived - self._epoch) / self.recency_scale + bonus
+
+    def push(self, message: Dict[str, Any]):
+        """Add a message. Safe to call from the websocket thread."""
+        arrived = time.monotonic()
+        with self._lock:
+            priority = self.score(message, arrived)
+            if self.shedding and self.shed_policy == 'sample':
+                bonus = priority - (arrived - self._epoch) / self.recency_scale
+                if bonus < self.MENTION_BONUS:
+                    self._sample_credit += self.sample_rate
+                    if self._sample_credit < 1.0:
+                        self.stats['dropped_sampled'] += 1
+                        return
+                    self._sample_credit -= 1.0
+            self._seq += 1
+            seq = self._seq
+            self._alive[seq] = (priority, arrived, message)
+            heapq.heappush(self._best, (-priority, seq))
+            heapq.heappush(self._worst, (priority, -seq))
+            self.stats['pushed'] += 1
+            self._enforce_size()
+
+    def _enforce_size(self):
+        """Evict down to ``max_size`` and enter shedding when full (caller holds the lock)"""
+        while len(self._alive) > self.max_size:
+            if self.shed_policy == 'oldest':
+                # _alive хранит порядок вставки: первый ключ - самое старое сообщение
+                del self._alive[next(iter(self._alive))]
+                self.stats['dropped_overflow'] += 1
+                continue
+            _, neg_seq = heapq.heappop(self._worst)
+            if self._alive.pop(-neg_seq, None) is not None:
+                self.stats['dropped_overflow'] += 1
+
+        if not self.shedding and len(self._alive) >= self.max_size:
+            self.shedding = True
+            self._sample_credit = 0.0
+            self.stats['shed_episodes'] += 1
+            logger.warning(f"Analysis queue full ({self.max_size}), shedding by {self.shed_policy}")
+
+        self._compact()
+
+    def configure(self, max_size: Optional[int] = None, low_watermark: Optional[float] = None,
+                  max_age: Optional[float] = None, shed_policy: Optional[str] = None,
+                  sample_rate: Optional[float] = None, mention_keywords: Optional[Iterable[str]] = None):
+        """Change limits of the live queue; a smaller ``max_size`` evicts by the shed policy at once"""
+        with self._lock:
+            if shed_policy in self.SHED_POLICIES:
+                self.shed_policy = shed_policy
+            if sample_rate is not None:
+                self.sample_rate = min(1.0, max(0.0, sample_rate))
+            if max_age is not None:
+                self.max_age = max_age
+            if mention_keywords is not None:
+                self.mention_keywords = [k.lower() for k in mention_keywords if k]
+            if max_size is not None:
+                self.max_size = max(1, int(max_size))
+            if low_watermark is not None:
+                self.low_watermark_ratio = low_watermark
+            self.low_watermark = max(0, min(self.max_size - 1, int(self.max_size * self.low_watermark_ratio)))
+            self._enforce_size()
+            if self.shedding and len(self._alive) <= self.low_watermark:
+                self.shedding = False
+
+    def pop_batch(self, limit: int) -> List[Dict[str, Any]]:
+        """Remove and return up to ``limit`` best messages, in arrival order"""
+        return self._take(limit)[0]
+
+    def pop_within_budget(self, budget: int, cost: Callable[[Dict[str, Any]], int],
+                          limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Pop best messages while their total ``cost`` fits into ``budget``.
+
+        Returns (messages in arrival order, used budget). The best message is
+        always taken so a single oversized line can't stall the queue.
+        """
+        return self._take(limit, budget, cost)
+
+    def _take(self, limit: int, budget: Optional[int] = None,
+              cost: Optional[Callable[[Dict[str, Any]], int]] = None) -> Tuple[List[Dict[str, Any]], int]:
+        selected = []
+        used = 0
+        now = time.monotonic()
+        with self._lock:
+            while self._best and len(selected) < limit:
+                _, seq = self._best[0]
+                entry = self._alive.get(seq)
+                if entry is None:
+                    heapq.heappop(self._best)
+                    continue
+                if now - entry[1] > self.max_age:
+                    heapq.heappop(self._best)
+                    del self._alive[seq]
+                    self.stats['dropped_expired'] += 1
+                    continue
+                if cost is not None:
+                    item_cost = cost(entry[2])
+                    if selected and used + item_cost > budget:
+                        break
+                    used += item_cost
+                heapq.heappop(self._best)
+                del self._alive[seq]
+                selected.append((seq, entry[2]))
+            self.stats['analyzed'] += len(selected)
+            if self.shedding and len(self._alive) <= self.low_watermark:
+                self.shedding = False
+                logger.info(f"Analysis queue drained to {len(self._alive)}, shedding stopped")
+            self._compact()
+
+        selected.sort(key=lambda item: item[0])
+        return [message for _, message in selected], used
+
+    def pop(self) -> Optional[Dict[str, Any]]:
+        """Remove and return the best message, or None"""
+        batch = self.pop_batch(1)
+        return batch[0] if batch else None
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Messages still waiting for analysis, in arrival order (nothing is removed)"""
+        with self._lock:
+            return [message for _, _, message in self._alive.values()]
+
+    def _compact(self):
+        """Rebuild heaps once stale entries dominate them"""
+        alive = len(self._alive)
+        if len(self._best) > 2 * alive + 64:
+            self._best = [(-p, s) for s, (p, _, _) in self._alive.items()]
+            heapq.heapify(self._best)
+        if len(self._worst) > 2 * alive + 64:
+            self._worst = [(p, -s) for s, (p, _, _) in self._alive.items()]
+            heapq.heapify(self._worst)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        stats = dict(self.stats)
+        stats['size'] = len(self._alive)
+        stats['dropped'] = stats['dropped_overflow'] + stats['dropped_expired'] + stats['dropped_sampled']
+        stats['shedding'] = self.shedding
+        stats['shed_policy'] = self.shed_policy
+        return stats
@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _stack(frame, limit: int = 64) -> List[str]:
+    """Root-first list of frame labels"""
+    labels = []
+    while frame is not None and len(labels) < limit:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads with ``sys._current_frames()``.
+
+    Nothing is hooked into the interpreter: a daemon thread wakes up every
+    ``interval`` seconds while the profiler runs, so it costs nothing when
+    stopped. Samples are kept as collapsed stacks (``thread;root;...;leaf``),
+    the input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005, max_duration: float = 300.0, max_stacks: int = 20000):
+        self.interval = interval
+        self.max_duration = max_duration
+        self.max_stacks = max_stacks
+        self.stacks = Counter()
+        self.samples = 0
+        self.dropped = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, duration: Optional[float] = None):
+        """Start sampling (stops by itself after ``duration`` seconds); clears earlier samples"""
+        if self.running:
+            return False
+        self.interval = max(0.001, interval or self.interval)
+        duration = min(duration or self.max_duration, self.max_duration)
+        self.stacks = Counter()
+        self.samples = self.dropped = 0
+        self.started_at, self.stopped_at = time.time(), None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(duration,), name='cpu-profiler', daemon=True)
+        self._thread.start()
+        logger.info(f"CPU profiler started: every {self.interval * 1000:.1f} ms for up to {duration:.0f} s")
+        return True
+
+    def stop(self):
+        if self._thread:
+            self._stop.set()
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self, duration: float):
+        own = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                key = ';'.join([names.get(ident, f'thread-{ident}')] + _stack(frame))
+                if key in self.stacks or len(self.stacks) < self.max_stacks:
+                    self.stacks[key] += 1
+                else:
+                    self.dropped += 1
+            self.samples += 1
+        self.stopped_at = time.time()
+        logger.info(f"CPU profiler stopped after {self.samples} samples")
+
+    def collapsed(self) -> str:
+        """One ``stack count`` line per distinct stack, hottest first"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Functions by self time (leaf samples) and total time (anywhere on the stack)"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        samples = sum(self.stacks.values()) or 1
+        return [{
+            'function': label,
+            'self_samples': count,
+            'self_percent': round(count / samples * 100, 2),
+            'total_percent': round(total[label] / samples * 100, 2)
+        } for label, count in own.most_common(limit)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'interval_ms': round(self.interval * 1000, 3),
+            'samples': self.samples,
+            'stacks': len(self.stacks),
+            'dropped': self.dropped,
+            'started_at': self.started_at,
+            'stopped_at': self.stopped_at
+        }
+
+
+class AllocationTracker:
+    """tracemalloc snapshots and diffs against a baseline (tracing is off until started)"""
+
+    def __init__(self):
+        self.baseline = None
+        self.baseline_at = None
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1):
+        if self.running:
+            return False
+        tracemalloc.start(max(1, frames))
+        self.baseline = self._snapshot()
+        self.baseline_at = time.time()
+        logger.info(f"tracemalloc started ({frames} frames)")
+        return True
+
+    def stop(self):
+        if self.running:
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+        self.baseline = self.baseline_at = None
+
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, _THIS_FILE)
+        ))
+
+    @staticmethod
+    def _site(stat) -> str:
+        frame = stat.traceback[-1] if stat.traceback else None
+        return f"{frame.filename}:{frame.lineno}" if frame else '?'
+
+    def snapshot(self, limit: int = 20, rebase: bool = True) -> Dict[str, Any]:
+        """Largest allocation sites now; with ``rebase`` the snapshot becomes the new diff baseline"""
+        snapshot = self._snapshot()
+        stats = snapshot.statistics('lineno')
+        if rebase:
+            self.baseline, self.baseline_at = snapshot, time.time()
+        return {
+            'total_kb': round(sum(s.size for s in stats) / 1024, 1),
+            'top': [{'site': self._site(s), 'size_kb': round(s.size / 1024, 1), 'count': s.count}
+                    for s in stats[:limit]]
+        }
+
+    def diff(self, limit: int = 20, group_by: str = 'lineno') -> Dict[str, Any]:
+        """Growth per allocation site since the baseline (``group_by`` lineno or traceback)"""
+        snapshot = self._snapshot()
+        stats = snapshot.compare_to(self.baseline, group_by)
+        return {
+            'since': self.baseline_at,
+            'seconds': round(time.time() - self.baseline_at, 1) if self.baseline_at else None,
+            'growth_kb': round(sum(s.size_diff for s in stats) / 1024, 1),
+            'top': [{
+                'site': self._site(s),
+                'traceback': [f"{f.filename}:{f.lineno}" for f in s.traceback] if group_by == 'traceback' else None,
+                'size_diff_kb': round(s.size_diff / 1024, 1),
+                'size_kb': round(s.size / 1024, 1),
+                'count_diff': s.count_diff
+            } for s in stats[:limit]]
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if self.running else (0, 0)
+        return {
+            'running': self.running,
+            'frames': tracemalloc.get_traceback_limit() if self.running else None,
+            'traced_kb': round(current / 1024, 1),
+            'peak_kb': round(peak / 1024, 1),
+            'baseline_at': self.baseline_at
+        }
+
+
+class LoopMonitor:
+    """Event loop lag and slow-callback detection from a watchdog thread.
+
+    Every ``interval`` seconds the watchdog schedules a no-op on the loop
+    and measures how long it waits to run (the lag). If it has not run
+    after ``slow_threshold``, whatever occupies the loop thread at that
+    moment is the slow callback: its stack is recorded. Unlike
+    ``loop.set_debug(True)`` this adds nothing to the loop itself.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, interval: float = 0.1,
+                 slow_threshold: float = 0.1, history: int = 600, slow_history: int = 50):
+        self.loop = loop
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.lags = deque(maxlen=history)
+        self.slow = deque(maxlen=slow_history)
+        self.max_lag = 0.0
+        self.slow_total = 0
+        self._loop_thread = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, slow_threshold: Optional[float] = None):
+        if self.running:
+            return False
+        if not self.loop or self.loop.is_closed():
+            raise RuntimeError('No event loop to monitor')
+        self.interval = max(0.01, interval or self.interval)
+        self.slow_threshold = max(0.001, slow_threshold or self.slow_threshold)
+        self.lags.clear()
+        self.slow.clear()
+        self.max_lag, self.slow_total = 0.0, 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='loop-monitor', daemon=True)
+        self._thread.start()
+        logger.info(f"Loop monitor started: probe every {self.interval:.2f} s, slow > {self.slow_threshold * 1000:.0f} ms")
+        return True
+
+    def stop(self):
+        if self._thread:
+            self._stop.set()
+            self._thread.join(5)
+            self._thread = None
+
+    def _probe(self, posted: float, done: threading.Event, result: list):
+        result.append(time.perf_counter() - posted)
+        self._loop_thread = threading.get_ident()
+        done.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            done, result = threading.Event(), []
+            posted = time.perf_counter()
+            try:
+                self.loop.call_soon_threadsafe(self._probe, posted, done, result)
+            except RuntimeError:
+                break  # Цикл закрыт
+            if not done.wait(self.slow_threshold):
+                frame = sys._current_frames().get(self._loop_thread) if self._loop_thread else None
+                stack = _stack(frame) if frame else []
+                while not done.wait(0.5):
+                    if self._stop.is_set() or self.loop.is_closed():
+                        return
+                self.slow_total += 1
+                self.slow.append({
+                    'at': time.time(),
+                    'lag_ms': round(result[0] * 1000, 3),
+                    'stack': stack
+                })
+            lag = result[0]
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lags = sorted(self.lags)
+
+        def point(p):
+            return round(lags[min(len(lags) - 1, int(p / 100.0 * len(lags)))] * 1000, 3) if lags else None
+
+        return {
+            'running': self.running,
+            'interval_ms': round(self.interval * 1000, 1),
+            'slow_threshold_ms': round(self.slow_threshold * 1000, 1),
+            'probes': len(lags),
+            'lag_ms': {'last': round(self.lags[-1] * 1000, 3) if self.lags else None,
+                       'p50': point(50), 'p99': point(99), 'max': round(self.max_lag * 1000, 3)},
+            'slow_callbacks': self.slow_total,
+            'recent_slow': list(self.slow)[-10:]
+        }
+
+
+class ProfilingService:
+    """CPU sampler, allocation tracker and loop monitor behind the /api/debug/profile endpoints.
+
+    Each tool is started and stopped at runtime; while stopped none of them
+    has a thread, hook or tracemalloc tracing active. ``token`` (optional)
+    is compared with the ``X-Debug-Token`` request header by the API server.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, token: str = ''):
+        self.token = token
+        self.cpu = SamplingProfiler()
+        self.memory = AllocationTracker()
+        self.loop_monitor = LoopMonitor(loop)
+
+    def stop(self):
+        self.cpu.stop()
+        self.memory.stop()
+        self.loop_monitor.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'cpu': self.cpu.get_stats(),
+            'memory': self.memory.get_stats(),
+            'loop': self.loop_monitor.get_stats()
+        }
+
+
+def create_profiling_service(config: Dict[str, Any], loop=None) -> Optional[ProfilingService]:
+    """ProfilingService if DEBUG_ENDPOINTS is on, else None (the endpoints answer 404)"""
+    if not config.get('DEBUG_ENDPOINTS'):
+        return None
+    if not config.get('DEBUG_TOKEN'):
+        logger.warning("DEBUG_ENDPOINTS is on without DEBUG_TOKEN: profiling endpoints are unauthenticated")
+    return ProfilingService(loop=loop, token=config.get('DEBUG_TOKEN') or '')
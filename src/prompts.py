@@ -0,0 +1,190 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+from string import Formatter
+from typing import List, Dict, Any, Optional, Tuple
+
+from .tokenizer import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'prompts')
+LINE_FIELDS = ('index', 'line')
+
+
+class LineTemplate:
+    """A chat line format parsed once: ``render`` only joins literals and values.
+
+    Fields are ``{index}`` (1-based position in the batch) and ``{line}``
+    (``nickname + message``); format specs and conversions are not
+    supported so every render produces exactly the same framing.
+    """
+
+    def __init__(self, template: str):
+        parts = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if field is not None and (field not in LINE_FIELDS or spec or conversion):
+                raise ValueError(f"Unsupported field {{{field}}} in line template {template!r}")
+            parts.append((literal, field))
+        self.template = template
+        self._parts: Tuple[Tuple[str, Optional[str]], ...] = tuple(parts)
+
+    def render(self, index: int, line: str) -> str:
+        values = {'index': str(index), 'line': line}
+        return ''.join(literal + (values[field] if field else '') for literal, field in self._parts)
+
+
+class PromptSpec:
+    """One version of a mode: system prompt, request parameters and the line template.
+
+    Built once per version. The system message dict and its token count
+    are cached here, so every request of the mode starts with the same
+    bytes (what provider-side prompt caching keys on) and budgeting never
+    re-tokenizes the prompt. ``model``, ``max_tokens`` and ``temperature``
+    are None when the mode uses the global settings. A mode with an empty
+    system prompt runs no analyses; ``pause_chat`` also stops chat ingest.
+    """
+
+    def __init__(self, data: Dict[str, Any], counter: TokenCounter, source: str = ''):
+        self.mode = str(data['mode'])
+        self.version = int(data.get('version', 1))
+        self.system = data.get('system') or ''
+        self.model = data.get('model') or None
+        self.max_tokens = data.get('max_tokens')
+        self.temperature = data.get('temperature')
+        self.pause_chat = bool(data.get('pause_chat', False))
+        self.description = data.get('description', '')
+        self.source = source
+        self.line_template = LineTemplate(data.get('line_template') or 'Message {index}: {line}')
+
+        self.system_message = {'role': 'system', 'content': self.system}
+        self.system_tokens = counter.count(self.system)
+        # Template framing plus the joining newline, with a two-digit index as the typical case
+        self.line_overhead = counter.count(self.line_template.render(10, '')) + 1
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [self.system, self.model, self.max_tokens, self.temperature, self.line_template.template]
+        ).encode('utf-8')).hexdigest()[:12]
+
+    @property
+    def analyzes(self) -> bool:
+        return bool(self.system)
+
+    def format_lines(self, lines: List[str]) -> str:
+        return '\n'.join(self.line_template.render(i, line) for i, line in enumerate(lines, 1))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'version': self.version,
+            'fingerprint': self.fingerprint,
+            'model': self.model,
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+            'line_template': self.line_template.template,
+            'pause_chat': self.pause_chat,
+            'system_tokens': self.system_tokens,
+            'description': self.description,
+            'source': self.source
+        }
+
+
+class PromptRegistry:
+    """Prompt modes loaded from versioned JSON files.
+
+    Every ``*.json`` file in ``directory`` holds one version of one mode
+    (``mode``, ``version``, ``system``, optional ``model``, ``max_tokens``,
+    ``temperature``, ``line_template``, ``pause_chat``). The highest version
+    of a mode is active unless ``pins`` (``{mode: version}``) selects an
+    older one, which makes a rollback a config change. The active specs
+    live in one dict that ``reload`` replaces as a whole, so readers on
+    any thread never lock and never see a half-loaded set.
+    """
+
+    def __init__(self, directory: str, counter: TokenCounter, pins: Optional[Dict[str, int]] = None):
+        self.directory = directory
+        self.counter = counter
+        self.pins = dict(pins or {})
+        self.active: Dict[str, PromptSpec] = {}
+        self.versions: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self, pins: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Re-read the directory; returns ``{mode: version}`` of the modes that changed.
+
+        ``pins`` replaces the pinned versions. Raises ValueError, keeping the
+        current set, when no usable ``normal`` prompt is found.
+        """
+        with self._lock:
+            pins = self.pins if pins is None else dict(pins)
+            loaded: Dict[str, Dict[int, PromptSpec]] = {}
+            for path in sorted(glob.glob(os.path.join(self.directory, '*.json'))):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        spec = PromptSpec(json.load(f), self.counter, source=os.path.basename(path))
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    logger.error(f"Skipping prompt file {path}: {e}")
+                    continue
+                loaded.setdefault(spec.mode, {})[spec.version] = spec
+
+            if 'normal' not in loaded:
+                raise ValueError(f"No prompt for mode 'normal' in {self.directory}")
+
+            active = {}
+            for mode, versions in loaded.items():
+                pinned = pins.get(mode)
+                if pinned is not None and pinned not in versions:
+                    logger.warning(f"Pinned {mode} v{pinned} not found, using v{max(versions)}")
+                    pinned = None
+                active[mode] = versions[pinned if pinned is not None else max(versions)]
+
+            changed = {mode: spec.version for mode, spec in active.items()
+                       if mode not in self.active or self.active[mode].fingerprint != spec.fingerprint}
+            self.active = active
+            self.pins = pins
+            self.versions = {mode: sorted(versions) for mode, versions in loaded.items()}
+        if changed:
+            logger.info(f"Prompt modes loaded from {self.directory}: "
+                        + ', '.join(f"{mode} v{version}" for mode, version in sorted(changed.items())))
+        return changed
+
+    def get(self, mode: Optional[str]) -> PromptSpec:
+        """Active spec of a mode; unknown modes fall back to ``normal``"""
+        active = self.active
+        return active.get(mode) or active['normal']
+
+    def modes(self) -> List[str]:
+        return sorted(self.active)
+
+    def describe(self) -> Dict[str, Any]:
+        active = self.active
+        return {
+            'directory': self.directory,
+            'pins': dict(self.pins),
+            'modes': {mode: {**spec.describe(), 'available_versions': self.versions.get(mode, [])}
+                      for mode, spec in sorted(active.items())}
+        }
+
+
+def parse_pins(value: str) -> Dict[str, int]:
+    """``"normal=2,music=1"`` -> ``{'normal': 2, 'music': 1}``"""
+    pins = {}
+    for item in (value or '').split(','):
+        mode, _, version = item.partition('=')
+        if mode.strip() and version.strip().isdigit():
+            pins[mode.strip()] = int(version)
+    return pins
+
+
+def format_pins(pins: Dict[str, int]) -> str:
+    """Inverse of ``parse_pins``"""
+    return ','.join(f'{mode}={version}' for mode, version in sorted(pins.items()))
+
+
+def create_prompt_registry(config: Dict[str, Any], counter: TokenCounter) -> PromptRegistry:
+    """Registry over PROMPTS_DIR (the repo's prompts/ by default) with PROMPT_PINS applied"""
+    return PromptRegistry(config.get('PROMPTS_DIR') or DEFAULT_PROMPTS_DIR, counter,
+                          pins=parse_pins(config.get('PROMPT_PINS', '')))
@@ -3,54 +3,172 @@ import threading
 import json
 import time
 import logging
+import random
 import re
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 
+from .metrics import CHAT_FRAMES, CHAT_EVENTS, CHAT_MESSAGES, CHAT_RECONNECTS, CHAT_DOWNTIME
+from .snapshots import SnapshotLog, SnapshotMap
+from .capture import OPEN, CLOSE
+from . import startup
+
 logger = logging.getLogger(__name__)
 
+# Счетчики метрик привязаны заранее. На горячем пути (кадр 42 / newMessage)
+# используется прямой `.value += 1` - без вызова метода и без аллокаций
+_FRAME_OPEN = CHAT_FRAMES.labels('open')
+_FRAME_CONNECT = CHAT_FRAMES.labels('connect')
+_FRAME_EVENT = CHAT_FRAMES.labels('event')
+_FRAME_ACK = CHAT_FRAMES.labels('ack')
+_FRAME_PING = CHAT_FRAMES.labels('ping')
+_FRAME_OTHER = CHAT_FRAMES.labels('other')
+_EVENT_NEW_MESSAGE = CHAT_EVENTS.labels('newMessage')
+_EVENT_SET_COOKIE = CHAT_EVENTS.labels('setCookie')
+_EVENT_USER_LEFT = CHAT_EVENTS.labels('userLeft')
+_EVENT_OTHER = CHAT_EVENTS.labels('other')
+
+DEFAULT_CHAT_URL = "wss://livechat.pump.fun/socket.io/?EIO=4&transport=websocket"
+
 class PumpChatClient:
-    def __init__(self, room_id, buffer_size=10, username="anonymous", message_history_limit=100):
+    def __init__(self, room_id, buffer_size=10, username="anonymous", message_history_limit=100,
+                 backoff_base=1.0, backoff_cap=30.0, max_reconnect_attempts=0, heartbeat_interval=None,
+                 max_missed_pongs=2, chat_url=DEFAULT_CHAT_URL):
         self.room_id = room_id
+        self.chat_url = chat_url or DEFAULT_CHAT_URL
         self.buffer_size = buffer_size
         self.username = username
         self.message_history_limit = message_history_limit
         self.ws = None
-        self.message_history = []
+        # Пишут поток websocket и пул декодирования, читают цикл бота и Flask - без блокировок на чтение
+        self.history = SnapshotLog(maxlen=message_history_limit)
         self.is_connected = False
         self.ack_id = 0
-        self.pending_acks = {}
+        self.pending_acks = SnapshotMap()
         self.ping_timer = None
         self.reconnect_attempts = 0
-        self.max_reconnect_attempts = 5
+        self.max_reconnect_attempts = max_reconnect_attempts  # 0 - без ограничения
         self.reconnect_lock = threading.Lock()
+
+        # Супервизор соединения: idle -> connecting -> connected -> backoff -> connecting ... -> stopped
+        self.state = 'idle'
+        self.thread = None
+        self._stop_event = threading.Event()
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.backoff_reset_after = 30.0  # Сессия дольше этого сбрасывает backoff
+        self.heartbeat_interval = heartbeat_interval  # None - берем pingInterval сервера
+        self.max_missed_pongs = max_missed_pongs
+        self.last_frame_at = 0.0
+        self.last_pong_at = 0.0
+        self.connected_at = None
+        self._down_since = None
+        self._last_session_length = 0.0
+        self.metrics = {
+            'connects': 0,
+            'reconnects': 0,
+            'reconnect_attempts': 0,
+            'disconnects': 0,
+            'downtime_seconds': 0.0,
+            'missed_pongs': 0,
+            'liveness_failures': 0,
+            'duplicates_skipped': 0,
+            'resume_gaps': 0
+        }
+        # Ключи недавно принятых сообщений - отсекают дубли при догрузке истории после переподключения
+        self._seen_keys = OrderedDict()
+        self._seen_limit = max(1000, message_history_limit * 4)
+
+        # Число принятых сообщений уже есть в message_seq - читаем его при сборе метрик
+        CHAT_MESSAGES.labels(room_id).set_function(lambda: self.message_seq)
+        self._reconnects_metric = CHAT_RECONNECTS.labels(room_id)
+        self._downtime_metric = CHAT_DOWNTIME.labels(room_id)
         self.message_seq = 0  # Счетчик для сообщений
+        self.message_listeners = []  # Колбэки на новые сообщения (вызываются из потока websocket)
+        self.frame_pool = None  # Опциональный пул процессов для декодирования кадров
+        self.tracer = None  # Опциональная трассировка сообщений (src.tracing.Tracer)
+        self._frame_stamps = (0.0, 0.0)  # (получение кадра, декодирование) текущего события
+        self.capture = None  # Опциональная запись сырых кадров (src.capture.FrameCapture)
+        self.clock = time.time  # Часы пути сообщений; ReplayDriver подменяет их виртуальными
+
+    def add_message_listener(self, callback):
+        """Register a callback invoked with every newly ingested message"""
+        self.message_listeners.append(callback)
+
+    def _notify_listeners(self, message):
+        for callback in self.message_listeners:
+            try:
+                callback(message)
+            except Exception as e:
+                logger.error(f"Message listener failed: {e}")
+
+    def enable_frame_pool(self, frame_pool):
+        """Decode event frames in a FrameDecoderPool instead of the websocket thread"""
+        self.frame_pool = frame_pool
+
+    def enable_tracing(self, tracer):
+        """Open a trace (frame, decode, buffer stamps) for every live message"""
+        self.tracer = tracer
+
+    def enable_capture(self, capture):
+        """Record every raw frame (and socket open/close) to a FrameCapture"""
+        self.capture = capture
+
+    @property
+    def message_history(self):
+        """Current immutable snapshot of the message history"""
+        return self.history.snapshot
 
     def get_connection_status(self):
         return self.is_connected
 
     def on_open(self, ws):
-        print("Connected to pump.fun chat")
-        self.is_connected = True
-        self.reconnect_attempts = 0
+        logger.info("Connected to pump.fun chat")
+        if self.capture:
+            self.capture.write('', OPEN)
+        now = self.clock()
+        with self.reconnect_lock:
+            self.is_connected = True
+            self.state = 'connected'
+            self.last_frame_at = now
+            self.last_pong_at = now
+            self.metrics['connects'] += 1
+            if self._down_since is not None:
+                self.metrics['reconnects'] += 1
+                self.metrics['downtime_seconds'] += now - self._down_since
+                self._reconnects_metric.inc()
+                self._downtime_metric.inc(now - self._down_since)
+                self._down_since = None
+            self.connected_at = now
+        startup.mark('chat_connected')
 
     def on_message(self, ws, message):
+        self.last_frame_at = self.clock()
+        if self.capture:
+            self.capture.write(message)
         type_message = message[:4]
 
         # print("ON_MESSAGE:", type_message)
         if type_message.startswith("0"):
+            _FRAME_OPEN.value += 1
             connect_data = json.loads(message[1:])
             if 'pingInterval' in connect_data:
                 interval = connect_data['pingInterval'] / 1000.0
                 self.start_ping(interval)
-            self.send(f'40{{"origin":"https://pump.fun","timestamp":{int(time.time()*1000)},"token":null}}')
-
+            self.send(f'40{{"origin":"https://pump.fun","timestamp":{int(self.clock()*1000)},"token":null}}')
         elif type_message.startswith("40"):
+            _FRAME_CONNECT.value += 1
             self.join_room()
 
         elif type_message.startswith("42"):
-            self.handle_event(message[2:])
+            _FRAME_EVENT.value += 1
+            if self.frame_pool:
+                self.frame_pool.submit(message[2:])
+            else:
+                self.handle_event(message[2:])
 
         elif type_message.startswith("43"):
+            _FRAME_ACK.value += 1
             # Обрабатываем acknowledgment messages (43X где X может быть цифрой или пустым)
             if len(message) > 2 and message[2].isdigit():
                 # Это numbered acknowledgment (430-439)
@@ -69,65 +187,133 @@ class PumpChatClient:
             self.handle_numbered_ack(message)
 
         elif type_message.startswith("2"):
+            _FRAME_PING.value += 1
             self.send("3")
 
-    def on_close(self, ws, close_status_code, close_msg):
-        print("Disconnected from chat:")
-        self.is_connected = False
-        self.stop_ping()
-        self.attempt_reconnect()
+        else:
+            _FRAME_OTHER.value += 1
+
+    def on_pong(self, ws, data):
+        self.last_pong_at = self.clock()
+
+    def on_close(self, ws, close_status_code=None, close_msg=None):
+        logger.info(f"Disconnected from chat: {close_status_code} {close_msg or ''}")
+        if self.capture:
+            self.capture.write('', CLOSE)
+        self._mark_disconnected()
 
     def on_error(self, ws, error):
-        print("Error:", error)
+        logger.error(f"Error: {error}")
+
+    def _mark_disconnected(self):
+        with self.reconnect_lock:
+            if self.is_connected:
+                self.metrics['disconnects'] += 1
+                self._last_session_length = self.clock() - self.connected_at if self.connected_at else 0.0
+                self.connected_at = None
+            if self._down_since is None and self.metrics['connects']:
+                self._down_since = self.clock()
+            self.is_connected = False
+        self.stop_ping()
+
+    def start(self):
+        """Start the supervised connection in a background thread (no-op if already running)"""
+        old = self.thread
+        if old and old.is_alive() and self._stop_event.is_set() and old is not threading.current_thread():
+            # Resumed right after stop(): the old supervisor may still be inside run_forever
+            # (up to ping_timeout) and would exit after we return. Wait for it, outside
+            # reconnect_lock which it takes on the way out.
+            old.join(5)
+            if old.is_alive():
+                logger.warning("[PumpChatClient] Previous connection thread is still stopping")
+        with self.reconnect_lock:
+            if self.thread and self.thread.is_alive():
+                # Already running, or an old supervisor stuck past the join: with the event
+                # cleared it keeps reconnecting instead of exiting
+                self._stop_event.clear()
+                return self.thread
+            self._stop_event.clear()
+            self.thread = threading.Thread(target=self.connect, name="pump-chat", daemon=True)
+            self.thread.start()
+            return self.thread
 
     def connect(self):
-        self.ws = websocket.WebSocketApp(
-            "wss://livechat.pump.fun/socket.io/?EIO=4&transport=websocket",
-            on_open=self.on_open,
-            on_message=self.on_message,
-            on_close=self.on_close,
-            on_error=self.on_error
-        )
-        self.ws.run_forever()
+        """Supervision loop: connect, wait for the socket to drop, back off, reconnect.
+
+        Blocks until ``stop()``; run it through ``start()`` to keep it off
+        the caller's thread.
+        """
+        while not self._stop_event.is_set():
+            self.state = 'connecting'
+            self.ws = websocket.WebSocketApp(
+                self.chat_url,
+                on_open=self.on_open,
+                on_message=self.on_message,
+                on_close=self.on_close,
+                on_error=self.on_error,
+                on_pong=self.on_pong
+            )
+            try:
+                # ping_timeout only bounds the read poll, so close() from another thread takes effect
+                self.ws.run_forever(ping_timeout=1, reconnect=0)
+            except Exception as e:
+                logger.warning(f"[PumpChatClient] Connection error: {e}")
+            self._mark_disconnected()
+
+            if self._stop_event.is_set():
+                break
+            if not self._healthy_for(self.backoff_reset_after):
+                self.reconnect_attempts += 1
+            else:
+                self.reconnect_attempts = 1
+            if self.max_reconnect_attempts and self.reconnect_attempts > self.max_reconnect_attempts:
+                logger.error("Достигнуто максимальное количество попыток переподключения")
+                break
+
+            delay = self._backoff_delay(self.reconnect_attempts)
+            self.state = 'backoff'
+            self.metrics['reconnect_attempts'] += 1
+            logger.info(f"Попытка переподключения #{self.reconnect_attempts} через {delay:.1f} сек...")
+            self._stop_event.wait(delay)
+
+        self.state = 'stopped'
         return True
 
+    def _healthy_for(self, seconds):
+        return self._last_session_length >= seconds
+
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with equal jitter (half fixed, half random)"""
+        ceiling = min(self.backoff_cap, self.backoff_base * (2 ** max(0, attempt - 1)))
+        return random.uniform(ceiling / 2, ceiling)
+
     def disconnect(self):
-        self.on_close()
+        """Drop the current socket; the supervisor reconnects with backoff"""
+        if self.ws:
+            self.ws.close()
 
     def stop(self):
-        print("Stop from chat:")
-        self.is_connected = False
+        logger.info("Stop from chat")
+        self._stop_event.set()
         self.stop_ping()
+        if self.ws:
+            try:
+                self.ws.close()
+            except Exception as e:
+                logger.warning(f"[PumpChatClient] Error closing socket: {e}")
+        self.is_connected = False
 
     def send(self, data):
         if self.is_connected and self.ws:
             self.ws.send(data)
         else:
-            print("Not connected. Cannot send data.")
-
-    def attempt_reconnect(self):
-        if not self.is_connected:
-            return
-        with self.reconnect_lock:
-            if self.reconnect_attempts < self.max_reconnect_attempts:
-                self.reconnect_attempts += 1
-                delay = min(2 ** self.reconnect_attempts, 30)
-                print(f"Попытка переподключения #{self.reconnect_attempts} через {delay} сек...")
-
-                def delayed_reconnect():
-                    print("Идет переподключение...")
-                    self.connect()
-
-                timer = threading.Timer(delay, delayed_reconnect)
-                timer.start()
-            else:
-                print("Достигнуто максимальное количество попыток переподключения")
+            logger.warning("Not connected. Cannot send data.")
 
     def join_room(self):
         ack_id = self.get_next_ack_id()
         join_json = json.dumps(["joinRoom", {"roomId": self.room_id, "username": self.username}])
         msg = f"42{ack_id}{join_json}"
-        self.pending_acks[ack_id] = {"event": "joinRoom", "timestamp": time.time()}
+        self.pending_acks.set(ack_id, {"event": "joinRoom", "timestamp": self.clock()})
         self.send(msg)
 
     def get_next_ack_id(self):
@@ -136,65 +322,178 @@ class PumpChatClient:
         return current
 
     def start_ping(self, interval_seconds):
-        if self.ping_timer:
-            self.ping_timer.cancel()
+        """Start the heartbeat: a WebSocket ping every interval, reconnect after missed pongs"""
+        self.stop_ping()
+        if getattr(self.ws, 'replay', False):
+            return  # Воспроизведение записи: сокета нет, heartbeat не нужен
+        if self.heartbeat_interval:
+            interval_seconds = self.heartbeat_interval
+        stop_event = threading.Event()
+        self.ping_timer = stop_event
+        ws = self.ws
 
         def ping_loop():
-            if self.is_connected:
-                self.send("2")
+            missed = 0
+            last_ping = self.clock()
+            while not stop_event.wait(interval_seconds):
+                if ws is not self.ws or not self.is_connected:
+                    return
+                # Любой кадр от сервера тоже подтверждает, что соединение живо
+                if max(self.last_pong_at, self.last_frame_at) < last_ping:
+                    missed += 1
+                    self.metrics['missed_pongs'] += 1
+                else:
+                    missed = 0
+                if missed >= self.max_missed_pongs:
+                    logger.warning(f"[PumpChatClient] No pong for {missed} heartbeats, reconnecting")
+                    self.metrics['liveness_failures'] += 1
+                    ws.close()
+                    return
+                try:
+                    last_ping = self.clock()
+                    ws.sock.ping()
+                except Exception as e:
+                    logger.warning(f"[PumpChatClient] Heartbeat failed: {e}")
 
-        self.ping_timer = threading.Timer(interval_seconds, ping_loop)
-        self.ping_timer.start()
+        threading.Thread(target=ping_loop, name="pump-chat-heartbeat", daemon=True).start()
 
     def stop_ping(self):
         if self.ping_timer:
-            self.ping_timer.cancel()
+            self.ping_timer.set()
             self.ping_timer = None
 
     def set_paused(self, is_paused: bool):
         if is_paused:
             self.stop()
-        elif not self.ping_timer and not self.is_connected:
-            try:
-                self.connect()
-            except Exception as e:
-                print(f"[PumpChatClient] Error connect for Pump.fun: {e}")
+        else:
+            self.start()
+
+    def get_connection_metrics(self) -> Dict[str, Any]:
+        """Supervisor state, reconnect counters and downtime"""
+        now = self.clock()
+        metrics = dict(self.metrics)
+        if self._down_since is not None:
+            metrics['downtime_seconds'] += now - self._down_since
+        metrics.update({
+            'state': self.state,
+            'connected': self.is_connected,
+            'uptime_seconds': now - self.connected_at if self.connected_at else 0,
+            'last_message_id': self.message_seq
+        })
+        return metrics
 
     def handle_event(self, json_str):
         try:
             event = json.loads(json_str)
+            self._frame_stamps = (self.last_frame_at, self.clock())
             event_name = event[0]
             payload = event[1]
 
-            if event_name == "newMessage":
-                # Добавляем локальную временную метку и монотонно возрастающий ID
-                try:
-                    payload['timestamp'] = time.time()
-                except Exception:
-                    pass
-
-                self.message_seq += 1
-                payload['_id'] = self.message_seq
+            self._dispatch_event(event_name, payload)
 
-                # Поддерживаем лимит истории сообщений
-                if len(self.message_history) >= self.message_history_limit:
-                    self.message_history.pop(0)
+        except Exception as e:
+            logger.error(f"Error handling event: {e}")
 
-                if payload.get('message') and len(payload['message'] ) > self.buffer_size:
-                    payload['message'] = payload["message"][:self.buffer_size]
+    def _dispatch_event(self, event_name, payload):
+        if event_name == "newMessage":
+            _EVENT_NEW_MESSAGE.value += 1
+            if payload.get('message') and len(payload['message'] ) > self.buffer_size:
+                payload['message'] = payload["message"][:self.buffer_size]
+            self._append_message(payload)
+            # print(f"[{payload.get('username')}]: {payload.get('message')}")
 
-                self.message_history.append(payload)
-                # print(f"[{payload.get('username')}]: {payload.get('message')}")
+        elif event_name == "setCookie":
+            _EVENT_SET_COOKIE.value += 1
+            self.request_message_history()
 
-            elif event_name == "setCookie":
-                self.request_message_history()
+        elif event_name == "userLeft":
+            _EVENT_USER_LEFT.value += 1
+            # print(f"User left: {payload}")
 
-            elif event_name == "userLeft":
-                pass
-                # print(f"User left: {payload}")
+        else:
+            _EVENT_OTHER.value += 1
+
+    @staticmethod
+    def _message_key(msg):
+        """Stable identity of a chat message, used to drop duplicates after a resume"""
+        for field in ('id', 'messageId', 'signature'):
+            if msg.get(field):
+                return f"{field}:{msg[field]}"
+        author = msg.get('userAddress') or msg.get('user') or msg.get('username')
+        sent_at = msg.get('timestamp') or msg.get('createdAt')
+        return f"{author}|{sent_at}|{msg.get('message')}"
+
+    def _remember(self, key):
+        """Record a message key; False if it was already seen (caller holds history.lock)"""
+        if key in self._seen_keys:
+            return False
+        self._seen_keys[key] = None
+        if len(self._seen_keys) > self._seen_limit:
+            self._seen_keys.popitem(last=False)
+        return True
 
-        except Exception as e:
-            print("Error handling event:", e)
+    def set_history_limit(self, limit):
+        """Resize the message history in place; shrinking drops the oldest messages"""
+        with self.history.lock:
+            self.message_history_limit = limit
+            self._seen_limit = max(1000, limit * 4)
+            self.history.resize(limit)
+
+    def export_resume_state(self):
+        """Counter, recent history and dedup keys for a checkpoint"""
+        with self.history.lock:
+            return {
+                'message_seq': self.message_seq,
+                'history': self.history.snapshot.to_list(),
+                'seen_keys': list(self._seen_keys)
+            }
+
+    def restore_resume_state(self, state):
+        """Continue from a checkpoint; call before start() so the history page after join dedups against it"""
+        with self.history.lock:
+            self.message_seq = max(self.message_seq, int(state.get('message_seq') or 0))
+            self.history.replace(state.get('history') or [])
+            for key in state.get('seen_keys') or []:
+                self._remember(key)
+        logger.info(f"Resuming {self.room_id} after message #{self.message_seq} "
+                    f"({len(self.history.snapshot)} messages of history)")
+
+    def _append_message(self, payload):
+        # Ключ считаем до того, как заменим серверную метку времени локальной
+        key = self._message_key(payload)
+
+        # Добавляем локальную временную метку и монотонно возрастающий ID
+        try:
+            payload['timestamp'] = self.clock()
+        except Exception:
+            pass
+
+        # Лимит истории поддерживает сам SnapshotLog
+        with self.history.lock:
+            if not self._remember(key):
+                self.metrics['duplicates_skipped'] += 1
+                return
+            self.message_seq += 1
+            payload['_id'] = self.message_seq
+            self.history.append(payload)
+        if self.tracer:
+            self.tracer.begin(payload['_id'], *self._frame_stamps, self.clock())
+        self._notify_listeners(payload)
+
+    def ingest_records(self, records, stamps=None):
+        """Apply records decoded by the frame pool, in frame order"""
+        if stamps:
+            self._frame_stamps = stamps
+        for event_name, payload in records:
+            try:
+                if event_name == "newMessage":
+                    # Пул уже обрезал сообщение до buffer_size
+                    _EVENT_NEW_MESSAGE.value += 1
+                    self._append_message(payload)
+                elif event_name != "invalid":
+                    self._dispatch_event(event_name, payload)
+            except Exception as e:
+                logger.error(f"Error handling event: {e}")
 
     def handle_event_with_ack(self, json_str):
         """
@@ -206,7 +505,7 @@ class PumpChatClient:
             # Парсим данные ответа (json_str уже без префикса "43")
             ack_data = json.loads(json_str)
 
-            print(f"Received generic acknowledgment: {json_str[:100]}...")  # Логируем для отладки
+            logger.debug("Received generic acknowledgment: %.100s...", json_str)
 
             # Получаем первый элемент данных
             event_data = ack_data[0] if ack_data and len(ack_data) > 0 else None
@@ -216,56 +515,72 @@ class PumpChatClient:
                 # Ответ содержит массив сообщений в объекте
                 messages = event_data['messages']
                 if isinstance(messages, list):
-                    print(f"Received message history via eventWithAck (format 1): {len(messages)} messages")
+                    logger.info(f"Received message history via eventWithAck (format 1): {len(messages)} messages")
                     self._process_message_history(messages)
 
             elif isinstance(event_data, list):
                 # Ответ напрямую является массивом сообщений
-                print(f"Received message history via eventWithAck (format 2): {len(event_data)} messages")
+                logger.info(f"Received message history via eventWithAck (format 2): {len(event_data)} messages")
                 self._process_message_history(event_data)
 
             elif isinstance(ack_data, list) and len(ack_data) > 0 and isinstance(ack_data[0], list):
                 # Ответ обернут в дополнительный массив
                 messages = ack_data[0]
-                print(f"Received message history via eventWithAck (format 3): {len(messages)} messages")
+                logger.info(f"Received message history via eventWithAck (format 3): {len(messages)} messages")
                 self._process_message_history(messages)
 
             else:
-                print(f"Unknown eventWithAck format: {type(event_data)}")
+                logger.warning(f"Unknown eventWithAck format: {type(event_data)}")
 
         except json.JSONDecodeError as e:
-            print(f"Error parsing eventWithAck JSON: {e}")
+            logger.error(f"Error parsing eventWithAck JSON: {e}")
         except Exception as e:
-            print(f"Error handling eventWithAck: {e}")
+            logger.error(f"Error handling eventWithAck: {e}")
 
     def _process_message_history(self, messages):
         """
         Вспомогательная функция для обработки истории сообщений.
         Добавляет уникальные ID и обновляет message_history.
+
+        После переподключения сервер присылает последнюю страницу истории:
+        уже принятые сообщения отбрасываются по ключу, пропущенные за время
+        простоя добавляются в конец с продолжением нумерации ``_id``.
         """
         if not isinstance(messages, list):
             return
 
-        # Добавляем уникальные ID к историческим сообщениям
-        for msg in messages:
-            if not isinstance(msg, dict):
-                continue
-            if '_id' not in msg:
+        fresh = []
+        with self.history.lock:
+            resuming = bool(self.history.snapshot)
+            overlap = False
+            for msg in messages:
+                if not isinstance(msg, dict) or '_id' in msg:
+                    continue
+                if 'message' in msg and len(msg["message"]) > self.buffer_size:
+                    msg['message'] = msg["message"][:self.buffer_size]
+                if not self._remember(self._message_key(msg)):
+                    overlap = True
+                    self.metrics['duplicates_skipped'] += 1
+                    continue
                 self.message_seq += 1
                 msg['_id'] = self.message_seq
-            if 'message' in msg and len(msg["message"]) > self.buffer_size:
-                msg['message'] = msg["message"][:self.buffer_size]
+                fresh.append(msg)
+
+            if resuming:
+                if fresh and not overlap:
+                    # Страница истории целиком новая - часть сообщений за время простоя потеряна
+                    self.metrics['resume_gaps'] += 1
+                    logger.warning(f"History page did not overlap seen messages, possible gap in {self.room_id}")
+                for msg in fresh:
+                    self.history.append(msg)
+                snapshot = self.history.snapshot
+            else:
+                snapshot = self.history.replace(fresh)
 
-        # Обновляем историю сообщений
-        if not self.message_history:
-            # Если история пустая, заполняем историческими сообщениями
-            self.message_history = messages[-self.message_history_limit:]
-        else:
-            # Объединяем с существующей историей
-            combined_history = messages + self.message_history
-            self.message_history = combined_history[-self.message_history_limit:]
+        logger.debug("Message history updated: %d total messages", len(snapshot))
 
-        print(f"Message history updated: {len(self.message_history)} total messages")
+        for msg in fresh:
+            self._notify_listeners(msg)
 
     def handle_numbered_ack(self, message):
         """
@@ -286,24 +601,23 @@ class PumpChatClient:
                 return
 
             # Ищем ожидающее подтверждение
-            pending_ack = self.pending_acks.get(ack_id)
+            # Забираем из списка ожидающих
+            pending_ack = self.pending_acks.pop(ack_id)
 
             if pending_ack:
-                # Удаляем из списка ожидающих
-                del self.pending_acks[ack_id]
-                print(f"Received ack {message_type} for {pending_ack['event']}")
+                logger.debug("Received ack %s for %s", message_type, pending_ack['event'])
 
             # Парсим данные ответа (удаляем 3-символьный префикс)
             try:
                 ack_data = json.loads(message[3:])
             except json.JSONDecodeError:
-                print(f"Failed to parse ack data: {message[3:]}")
+                logger.warning(f"Failed to parse ack data: {message[3:]}")
                 return
 
             # Обрабатываем ответ в зависимости от типа оригинального запроса
             if pending_ack and pending_ack['event'] == "joinRoom":
                 # Успешно присоединились к комнате, запрашиваем историю сообщений
-                print("Successfully joined room, requesting message history...")
+                logger.info("Successfully joined room, requesting message history...")
                 self.request_message_history()
 
             elif pending_ack and pending_ack['event'] == "getMessageHistory":
@@ -311,19 +625,19 @@ class PumpChatClient:
                 messages = ack_data[0] if ack_data and len(ack_data) > 0 else []
 
                 if isinstance(messages, list):
-                    print(f"Received {len(messages)} historical messages via numbered ack")
+                    logger.info(f"Received {len(messages)} historical messages via numbered ack")
                     self._process_message_history(messages)
                 else:
-                    print(f"Unexpected message history format in numbered ack: {type(messages)}")
+                    logger.warning(f"Unexpected message history format in numbered ack: {type(messages)}")
 
             elif pending_ack and pending_ack['event'] == "sendMessage":
                 # Обрабатываем ответ на отправку сообщения
                 if ack_data and len(ack_data) > 0 and isinstance(ack_data[0], dict):
                     if 'error' in ack_data[0]:
-                        print(f"Server error: {ack_data[0]}")
+                        logger.error(f"Server error: {ack_data[0]}")
 
         except Exception as e:
-            print(f"Error parsing numbered acknowledgment: {e}")
+            logger.error(f"Error parsing numbered acknowledgment: {e}")
 
     def request_message_history(self, limit=None):
         """Запрашивает историю сообщений с сервера"""
@@ -337,23 +651,21 @@ class PumpChatClient:
         }])
 
         msg = f"42{ack_id}{history_json}"
-        self.pending_acks[ack_id] = {"event": "getMessageHistory", "timestamp": time.time()}
+        self.pending_acks.set(ack_id, {"event": "getMessageHistory", "timestamp": self.clock()})
 
-        print(f"Requesting message history with limit {limit_history}")
+        logger.info(f"Requesting message history with limit {limit_history}")
         self.send(msg)
 
     def get_count_messages(self, count: int = 5) -> List[Dict[str, Any]]:
         """Get messages from last count position"""
-        if len(self.message_history) > 0:
-            return self.message_history[-count:] if count <= len(self.message_history) else self.message_history
-        return []
+        return self.history.snapshot.tail(count)
 
     def get_new_messages(self, last_id: int, limit: int) -> tuple:
         """Return messages with _id greater than last_id, up to limit. Also returns max _id seen."""
         new_messages = []
         max_id = last_id
 
-        for msg in self.message_history:
+        for msg in self.history.snapshot:
             msg_id = msg.get('_id', 0)
             if msg_id > last_id:
                 new_messages.append(msg)
@@ -366,12 +678,12 @@ class PumpChatClient:
 
     def get_message_history(self) -> List[Dict[str, Any]]:
         """Возвращает полную историю сообщений"""
-        return self.message_history.copy()
+        return self.history.snapshot.to_list()[:]
 
     def get_recent_messages(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Возвращает последние сообщения"""
-        return self.message_history[-limit:] if limit <= len(self.message_history) else self.message_history
+        return self.history.snapshot.tail(limit)
 
     def get_latest_message(self) -> Optional[Dict[str, Any]]:
         """Возвращает последнее сообщение или None если сообщений нет"""
-        return self.message_history[-1] if self.message_history else None
\ No newline at end of file
+        return self.history.snapshot.last()
\ No newline at end of file
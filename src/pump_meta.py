@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional, Iterable
+
+from .snapshots import SnapshotMap
+
+logger = logging.getLogger(__name__)
+
+
+class PumpMetaFetcher:
+    """Server-side cache of pump.fun frontend API data per room.
+
+    One pooled HTTP session polls ``/replies/<mint>`` for every tracked room
+    with conditional requests (``If-None-Match``), so a 304 costs neither
+    body transfer nor parsing. Dashboards read the aggregated entry from a
+    copy-on-write map; a stale entry is refreshed on demand (one request per
+    room at a time) and served as ``stale`` when pump.fun is unreachable.
+    After a failure the room is not asked again before ``retry_at``
+    (exponential backoff from ``backoff_base`` up to ``backoff_max``, or
+    the ``Retry-After`` of a 429), so an outage does not turn every
+    dashboard poll into an upstream request.
+    """
+
+    def __init__(self, base_url: str = 'https://frontend-api-v3.pump.fun', ttl: float = 30.0,
+                 poll_interval: float = 15.0, timeout: float = 5.0, replies_limit: int = 1000,
+                 pool_size: int = 8, backoff_base: float = 5.0, backoff_max: float = 300.0):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.replies_limit = replies_limit
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept': 'application/json', 'Origin': 'https://pump.fun'})
+
+        self.cache = SnapshotMap()
+        self.rooms: List[str] = []
+        self._room_locks: Dict[str, threading.Lock] = {}
+        self._failures: Dict[str, tuple] = {}  # room -> (consecutive failures, retry_at)
+        self._locks_guard = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'requests': 0, 'not_modified': 0, 'errors': 0, 'cache_hits': 0, 'backoff_hits': 0}
+
+    def track(self, rooms: Iterable[str]):
+        """Rooms refreshed by the background poller"""
+        for room in rooms:
+            if room and room not in self.rooms:
+                self.rooms.append(room)
+
+    def start(self):
+        if self.poll_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._poll_loop, name='pump-meta', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.timeout + 1)
+        self.session.close()
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            for room in list(self.rooms):
+                if self._stop.is_set():
+                    break
+                self.refresh(room)
+            self._stop.wait(self.poll_interval)
+
+    def get(self, room: str) -> Optional[Dict[str, Any]]:
+        """Cached meta of a room, refreshed first when older than ``ttl``"""
+        entry = self.cache.get(room)
+        if entry is not None and time.time() - entry['fetched_at'] < self.ttl:
+            self.stats['cache_hits'] += 1
+            return self._public(entry)
+        entry = self.refresh(room)
+        return self._public(entry) if entry else None
+
+    def refresh(self, room: str) -> Optional[Dict[str, Any]]:
+        """Revalidate one room; concurrent callers wait for the request in flight"""
+        with self._locks_guard:
+            lock = self._room_locks.setdefault(room, threading.Lock())
+        started = time.time()
+        with lock:
+            entry = self.cache.get(room)
+            if entry is not None and entry['fetched_at'] >= started:
+                return entry  # Refreshed by the caller we waited for
+            failures = self._failures.get(room)
+            if failures and time.time() < failures[1]:
+                self.stats['backoff_hits'] += 1
+                return entry  # Still backing off: the stale entry (or nothing) until retry_at
+            return self._fetch(room, entry)
+
+    def _fetch(self, room: str, entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        self.stats['requests'] += 1
+        try:
+            response = self.session.get(
+                f"{self.base_url}/replies/{room}",
+                params={'limit': self.replies_limit, 'offset': 0, 'reverseOrder': 'true'},
+                headers=headers,
+                timeout=self.timeout
+            )
+            if response.status_code == 304 and entry:
+                self.stats['not_modified'] += 1
+                updated = {k: v for k, v in entry.items() if k != 'retry_at'}
+                updated.update(fetched_at=time.time(), stale=False)
+            else:
+                response.raise_for_status()
+                updated = {
+                    **self._aggregate(response.json()),
+                    'room': room,
+                    'etag': response.headers.get('ETag'),
+                    'fetched_at': time.time(),
+                    'stale': False
+                }
+        except Exception as e:
+            self.stats['errors'] += 1
+            retry_at = self._back_off(room, getattr(e, 'response', None))
+            logger.warning(f"pump.fun meta fetch for {room} failed, next try in {retry_at - time.time():.0f}s: {e}")
+            if entry is None:
+                return None
+            updated = {**entry, 'stale': True, 'retry_at': retry_at}
+            self.cache.set(room, updated)
+            return updated
+        self._failures.pop(room, None)
+        self.cache.set(room, updated)
+        return updated
+
+    def _back_off(self, room: str, response) -> float:
+        """Record a failure; returns when the room may be fetched again"""
+        count = self._failures.get(room, (0, 0.0))[0] + 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (count - 1))
+        if response is not None and response.status_code == 429:
+            delay = max(delay, self._retry_after(response.headers.get('Retry-After')))
+        retry_at = time.time() + delay
+        self._failures[room] = (count, retry_at)
+        return retry_at
+
+    @staticmethod
+    def _retry_after(value: Optional[str]) -> float:
+        """Seconds from a ``Retry-After`` header (delta-seconds or an HTTP date)"""
+        if not value:
+            return 0.0
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _aggregate(data: Any) -> Dict[str, Any]:
+        """Reply and participant counts from a ``/replies`` page (list or ``{'replies': [...]}``)"""
+        replies = data.get('replies', []) if isinstance(data, dict) else data
+        if not isinstance(replies, list):
+            replies = []
+        authors = {r.get('user') or r.get('userAddress') for r in replies if isinstance(r, dict)}
+        authors.discard(None)
+        participants = data.get('num_participants') if isinstance(data, dict) else None
+        last = max((r.get('timestamp') or 0 for r in replies if isinstance(r, dict)), default=None)
+        return {
+            'reply_count': len(replies),
+            'participants': participants if participants is not None else len(authors),
+            'last_reply_at': last,
+            'has_more': bool(data.get('hasMore')) if isinstance(data, dict) else False
+        }
+
+    @staticmethod
+    def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        meta = {k: v for k, v in entry.items() if k != 'etag'}
+        meta['age_seconds'] = round(time.time() - entry['fetched_at'], 3)
+        return meta
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'rooms': len(self.rooms)}
@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Rolling window of request latencies with percentile lookups"""
+
+    def __init__(self, window: int = 200, default: float = 5.0, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.default = default
+        self.min_samples = min_samples
+
+    def observe(self, latency: float):
+        self.samples.append(latency)
+
+    def percentile(self, q: float) -> float:
+        """Latency at percentile ``q`` (0-100); ``default`` until enough samples"""
+        if len(self.samples) < self.min_samples:
+            return self.default
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'samples': len(self.samples),
+            'p50': round(self.percentile(50), 3),
+            'p95': round(self.percentile(95), 3),
+            'p99': round(self.percentile(99), 3)
+        }
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over a rolling window of outcomes.
+
+    The breaker opens when the error rate of the last ``window`` calls
+    reaches ``error_threshold``. After ``cooldown`` seconds a single probe
+    is let through; its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, error_threshold: float = 0.5, window: int = 20, min_requests: int = 5, cooldown: float = 30.0):
+        self.error_threshold = error_threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.outcomes = deque(maxlen=window)
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may go to the protected backend"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.outcomes.append(True)
+            if self.state == self.HALF_OPEN:
+                logger.info("Circuit breaker closed")
+                self.state = self.CLOSED
+                self.outcomes.clear()
+                self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.outcomes.append(False)
+            if self.state == self.HALF_OPEN:
+                self._open()
+                return
+            if self.state == self.CLOSED and len(self.outcomes) >= self.min_requests:
+                errors = self.outcomes.count(False)
+                if errors / len(self.outcomes) >= self.error_threshold:
+                    self._open()
+
+    def release_probe(self):
+        """The half-open probe ended without an outcome (cancelled): let the next call probe"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.probe_in_flight = False
+
+    def _open(self):
+        logger.warning("Circuit breaker opened, routing to fallback model")
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self.times_opened += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        outcomes = list(self.outcomes)
+        return {
+            'state': self.state,
+            'error_rate': round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0,
+            'times_opened': self.times_opened
+        }
@@ -0,0 +1,236 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Settings that can change while the bot runs: name -> (type, minimum, maximum or choices).
+# Everything else (backends, URLs, workers, ports) still needs a restart.
+# Model names are further checked against the allowlist (MODEL_SETTINGS).
+TUNABLES: Dict[str, tuple] = {
+    'ANALYSIS_INTERVAL':            (float, 0.1, 3600),
+    'ANALYSIS_MAX_LATENCY':         (float, 0.1, 3600),
+    'ANALYSIS_BACKLOG_TRIGGER':     (int, 1, 100000),
+    'ANALYSIS_RATE_SPIKE':          (float, 1.0, 1000),
+    'ANALYSIS_MENTION_KEYWORDS':    (str, None, None),
+    'ANALYSIS_BACKLOG_DEBOUNCE':    (float, 0, 3600),
+    'ANALYSIS_RATE_SPIKE_DEBOUNCE': (float, 0, 3600),
+    'ANALYSIS_MENTION_DEBOUNCE':    (float, 0, 3600),
+
+    'OPENAI_MODEL':                 (str, 1, None),
+    'CREATIVE':                     (float, 0, 2),
+    'MAX_TOKEN_ANSVERS':            (int, 1, 32000),
+    'MAX_RETRIES':                  (int, 1, 10),
+    'RATE_LIMIT_DELAY':             (float, 0, 60),
+    'HEDGE_ENABLED':                (bool, None, None),
+    'HEDGE_PERCENTILE':             (float, 50, 99.9),
+    'HEDGE_MIN_DELAY':              (float, 0, 120),
+    'BREAKER_ERROR_THRESHOLD':      (float, 0.01, 1),
+    'BREAKER_COOLDOWN':             (float, 0, 3600),
+
+    'PROMPT_TOKEN_BUDGET':          (int, 50, 100000),
+    'PROMPT_MAX_LINES':             (int, 1, 1000),
+    'CONTEXT_EXCHANGES':            (int, 0, 100),
+    'CONTEXT_TOKEN_CEILING':        (int, 100, 128000),
+
+    'MESSAGE_BUFFER_SIZE':          (int, 1, 10000),
+    'MESSAGE_HISTORY_LIMIT':        (int, 1, 100000),
+    'MAX_ANALYSIS_RESULTS':         (int, 1, 10000),
+    'PRIORITY_QUEUE_SIZE':          (int, 1, 1000000),
+    'PRIORITY_MAX_AGE':             (float, 1, 86400),
+    'PRIORITY_LOW_WATERMARK':       (float, 0, 1),
+    'SHED_POLICY':                  (str, ('lowest_priority', 'oldest', 'sample'), None),
+    'SHED_SAMPLE_RATE':             (float, 0, 1),
+    'LOOP_LAG_DEGRADE':             (float, 0.001, 60),
+    'LOOP_LAG_RECOVER':             (float, 0, 60),
+    'DEGRADED_HOLD':                (float, 0, 3600),
+    'DEGRADED_BATCH_FACTOR':        (float, 1, 20),
+    'DEGRADED_MODEL':               (str, None, None),
+
+    'LOG_LEVEL':                    (str, ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'), None),
+}
+MODEL_SETTINGS = ('OPENAI_MODEL', 'DEGRADED_MODEL')
+# Startup models that are always allowed
+CONFIGURED_MODELS = ('OPENAI_MODEL', 'DEGRADED_MODEL', 'FALLBACK_MODEL', 'HEDGE_MODEL', 'LOW_PRIORITY_MODEL')
+
+
+def _coerce(name: str, value: Any) -> Any:
+    """Convert a JSON or env-style value to the setting's type; raises ValueError"""
+    kind, low, high = TUNABLES[name]
+    if kind is bool:
+        if isinstance(value, str):
+            if value.lower() not in ('true', 'false'):
+                raise ValueError('expected true or false')
+            return value.lower() == 'true'
+        if not isinstance(value, bool):
+            raise ValueError('expected a boolean')
+        return value
+    if kind is str:
+        value = '' if value is None else str(value).strip()
+        if isinstance(low, tuple):
+            if name == 'LOG_LEVEL':
+                value = value.upper()
+            if value not in low:
+                raise ValueError(f"expected one of {', '.join(low)}")
+        elif low and len(value) < low:
+            raise ValueError('must not be empty')
+        return value
+    if isinstance(value, bool):
+        raise ValueError('expected a number')
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('expected a number')
+    if kind is int:
+        if not value.is_integer():
+            raise ValueError('expected an integer')
+        value = int(value)
+    if low is not None and value < low or high is not None and value > high:
+        raise ValueError(f'must be between {low} and {high}')
+    return value
+
+
+class RuntimeConfig:
+    """Live-tunable subset of the bot settings.
+
+    Updates come from ``/api/config`` or from ``path``, a JSON object of
+    settings polled for changes every ``poll_interval`` seconds. A batch
+    of updates is validated as a whole (types, ranges, cross-field rules)
+    and either applied completely or rejected; the current values are
+    replaced by a new dict, so readers never see half an update.
+    Subscribers receive only the settings whose value changed. Models
+    can only be switched to ``allowed_models`` (None - any model).
+    """
+
+    def __init__(self, initial: Dict[str, Any], path: str = '', poll_interval: float = 2.0,
+                 allowed_models: Optional[List[str]] = None):
+        self.values: Dict[str, Any] = {k: initial[k] for k in TUNABLES if initial.get(k) is not None}
+        self.allowed_models = allowed_models
+        self.path = path
+        self.poll_interval = max(0.2, poll_interval)
+        self.version = 0
+        self.history: List[Dict[str, Any]] = []
+        self.last_error = None
+        self._subscribers: List[Callable[[Dict[str, Any]], Any]] = []
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], Any]):
+        """``callback(changes)`` is called after every applied update (from the updating thread)"""
+        self._subscribers.append(callback)
+
+    def validate(self, updates: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """(coerced values, errors by setting); errors is empty when the batch is valid"""
+        clean, errors = {}, {}
+        if not isinstance(updates, dict):
+            return {}, {'': 'expected a JSON object of settings'}
+        for name, value in updates.items():
+            if name not in TUNABLES:
+                errors[name] = 'unknown setting or requires a restart'
+                continue
+            try:
+                clean[name] = _coerce(name, value)
+            except (TypeError, ValueError) as e:
+                errors[name] = str(e)
+                continue
+            if (name in MODEL_SETTINGS and clean[name] and self.allowed_models is not None
+                    and clean[name] not in self.allowed_models):
+                errors[name] = f"not in ALLOWED_MODELS ({', '.join(self.allowed_models)})"
+        merged = {**self.values, **clean}
+        if merged.get('LOOP_LAG_RECOVER', 0) > merged.get('LOOP_LAG_DEGRADE', float('inf')):
+            errors['LOOP_LAG_RECOVER'] = 'must not exceed LOOP_LAG_DEGRADE'
+        return clean, errors
+
+    def update(self, updates: Dict[str, Any], source: str = 'api') -> Dict[str, Any]:
+        """Validate and apply a batch; returns ``{'version', 'changed', 'errors'}``"""
+        with self._lock:
+            clean, errors = self.validate(updates)
+            if errors:
+                self.last_error = {'source': source, 'errors': errors, 'at': time.time()}
+                logger.warning(f"Rejected config update from {source}: {errors}")
+                return {'version': self.version, 'changed': {}, 'errors': errors}
+            changes = {k: v for k, v in clean.items() if self.values.get(k) != v}
+            if not changes:
+                return {'version': self.version, 'changed': {}, 'errors': {}}
+            self.values = {**self.values, **changes}
+            self.version += 1
+            self.history = (self.history + [{'version': self.version, 'source': source,
+                                             'changed': changes, 'at': time.time()}])[-20:]
+            logger.info(f"Config v{self.version} from {source}: {changes}")
+            # Still under the lock: components see concurrent updates in version order
+            for callback in self._subscribers:
+                try:
+                    callback(changes)
+                except Exception as e:
+                    logger.error(f"Applying config v{self.version} failed: {e}")
+            return {'version': self.version, 'changed': changes, 'errors': {}}
+
+    # File watching (mtime polling, no extra dependency)
+
+    def start(self):
+        if not self.path or self._thread:
+            return
+        self._thread = threading.Thread(target=self._watch, name='config-watcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.path} for config changes")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def _watch(self):
+        while True:
+            self.reload()
+            if self._stop.wait(self.poll_interval):
+                return
+
+    def reload(self) -> Optional[Dict[str, Any]]:
+        """Apply the file if it changed since the last read"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+        if mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                updates = json.load(f)
+        except (OSError, ValueError) as e:
+            self.last_error = {'source': self.path, 'errors': {'': str(e)}, 'at': time.time()}
+            logger.error(f"Unreadable config file {self.path}, keeping the current settings: {e}")
+            return None
+        return self.update(updates, source=self.path)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'values': dict(self.values),
+            'tunable': sorted(TUNABLES),
+            'allowed_models': self.allowed_models,
+            'file': self.path or None,
+            'history': list(self.history),
+            'last_error': self.last_error
+        }
+
+
+def create_runtime_config(config: Dict[str, Any]) -> RuntimeConfig:
+    """RuntimeConfig seeded with the startup values and RUNTIME_CONFIG_FILE, if it exists.
+
+    The file is read once here so components are built with its values;
+    call ``start()`` after subscribing them to follow later edits.
+    """
+    allowed = [m.strip() for m in (config.get('ALLOWED_MODELS') or '').split(',') if m.strip()]
+    allowed.extend(config[name] for name in CONFIGURED_MODELS if config.get(name) and config[name] not in allowed)
+    runtime = RuntimeConfig(config, path=config.get('RUNTIME_CONFIG_FILE') or '',
+                            poll_interval=config.get('RUNTIME_CONFIG_POLL', 2.0), allowed_models=allowed)
+    if runtime.path:
+        runtime.reload()
+    return runtime
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from .utils import parse_keywords
+
+logger = logging.getLogger(__name__)
+
+
+class Trigger:
+    """A single analysis trigger with its own debounce window"""
+
+    def __init__(self, name: str, debounce: float):
+        self.name = name
+        self.debounce = max(0.0, float(debounce))
+        self.last_fired = 0.0
+        self.fired_count = 0
+
+    def remaining(self, now: float) -> float:
+        """Seconds left until the trigger may fire again"""
+        return max(0.0, self.last_fired + self.debounce - now)
+
+    def fire(self, now: float):
+        self.last_fired = now
+        self.fired_count += 1
+
+
+class AnalysisScheduler:
+    """Event-driven scheduler that decides when BotCore should run an analysis.
+
+    Ingest calls ``notify`` for every new chat message (from any thread). The
+    bot loop awaits ``wait`` and only wakes up when one of the triggers fires:
+
+    * ``backlog``    - enough unanalyzed messages have piled up
+    * ``rate_spike`` - the short-term message rate jumped above the baseline
+    * ``mention``    - a message contains one of the mention keywords
+    * ``deadline``   - the oldest pending message waited ``max_latency`` seconds
+
+    With nothing pending no timers are armed, so an idle room costs no CPU.
+    """
+
+    RATE_WINDOW = 5.0
+    BASELINE_ALPHA = 0.05
+
+    def __init__(self, config: Dict[str, Any]):
+        interval = config.get('ANALYSIS_INTERVAL', 5)
+
+        self.backlog_threshold = config.get('ANALYSIS_BACKLOG_TRIGGER', 6)
+        self.rate_spike_factor = config.get('ANALYSIS_RATE_SPIKE', 3.0)
+        self.min_spike_rate = config.get('ANALYSIS_MIN_SPIKE_RATE', 1.0)
+        self.max_latency = config.get('ANALYSIS_MAX_LATENCY', interval)
+        self.mention_keywords = parse_keywords(config.get('ANALYSIS_MENTION_KEYWORDS', ''))
+
+        self.triggers = {
+            'backlog': Trigger('backlog', config.get('ANALYSIS_BACKLOG_DEBOUNCE', 2)),
+            'rate_spike': Trigger('rate_spike', config.get('ANALYSIS_RATE_SPIKE_DEBOUNCE', 5)),
+            'mention': Trigger('mention', config.get('ANALYSIS_MENTION_DEBOUNCE', 1)),
+            'deadline': Trigger('deadline', config.get('ANALYSIS_DEADLINE_DEBOUNCE', 0)),
+        }
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+        self._reasons: List[str] = []
+        self._armed: Dict[str, asyncio.TimerHandle] = {}
+        self._stopped = False
+
+        # Pending state (touched only on the loop thread)
+        self.pending = 0
+        self.pending_since = 0.0
+        self._mention_pending = False
+        self._spike_pending = False
+        self._arrivals = deque(maxlen=4096)
+        self.message_rate = 0.0
+        self.baseline_rate = 0.0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Attach the scheduler to the event loop that runs the bot"""
+        self.loop = loop
+        self._event = asyncio.Event()
+        self._stopped = False
+
+    def notify(self, message: Dict[str, Any]):
+        """Signal a newly ingested message. Safe to call from any thread."""
+        loop = self.loop
+        if loop is None or self._stopped:
+            return
+        text = (message.get('message') or '') if isinstance(message, dict) else str(message)
+        try:
+            loop.call_soon_threadsafe(self._on_message, text, time.monotonic())
+        except RuntimeError:
+            # Loop already closed
+            pass
+
+    def wake(self):
+        """Re-check the triggers, e.g. after a resume left a backlog. Safe to call from any thread."""
+        loop = self.loop
+        if loop is None or self._stopped:
+            return
+        try:
+            loop.call_soon_threadsafe(lambda: self._evaluate(time.monotonic()))
+        except RuntimeError:
+            # Loop already closed
+            pass
+
+    def _on_message(self, text: str, now: float):
+        if self.pending == 0:
+            self.pending_since = now
+        self.pending += 1
+
+        self._arrivals.append(now)
+        rate = self.current_rate(now)
+        self.message_rate = rate
+        if rate >= self.min_spike_rate and rate >= self.rate_spike_factor * max(self.baseline_rate, 1e-9):
+            self._spike_pending = True
+        self.baseline_rate += self.BASELINE_ALPHA * (rate - self.baseline_rate)
+
+        if self.mention_keywords:
+            lowered = text.lower()
+            if any(word in lowered for word in self.mention_keywords):
+                self._mention_pending = True
+
+        self._evaluate(now)
+
+    def current_rate(self, now: float) -> float:
+        """Messages per second over the short rate window"""
+        cutoff = now - self.RATE_WINDOW
+        while self._arrivals and self._arrivals[0] < cutoff:
+            self._arrivals.popleft()
+        return len(self._arrivals) / self.RATE_WINDOW
+
+    def _conditions(self, now: float) -> Dict[str, bool]:
+        return {
+            'mention': self._mention_pending,
+            'rate_spike': self._spike_pending,
+            'backlog': self.pending >= self.backlog_threshold,
+            'deadline': self.pending > 0 and now - self.pending_since >= self.max_latency,
+        }
+
+    def _evaluate(self, now: float):
+        """Fire every ready trigger, arm timers for the debounced ones"""
+        if self._stopped or self.pending == 0:
+            return
+
+        for name, met in self._conditions(now).items():
+            if not met:
+                continue
+            trigger = self.triggers[name]
+            wait = trigger.remaining(now)
+            if wait <= 0:
+                trigger.fire(now)
+                self._fire(name)
+                return
+            self._arm(name, wait)
+
+        # Make sure the pending backlog is served within max_latency
+        deadline_in = self.pending_since + self.max_latency - now
+        if deadline_in > 0:
+            self._arm('deadline', deadline_in)
+
+    def _arm(self, name: str, delay: float):
+        if name in self._armed or self.loop is None:
+            return
+        self._armed[name] = self.loop.call_later(delay, self._on_timer, name)
+
+    def _on_timer(self, name: str):
+        self._armed.pop(name, None)
+        self._evaluate(time.monotonic())
+
+    def _fire(self, reason: str):
+        self._reasons.append(reason)
+        if self._event is not None:
+            self._event.set()
+
+    async def wait(self) -> str:
+        """Block until a trigger fires and return its name"""
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            if self._stopped:
+                return 'stop'
+            if self._reasons:
+                reason = self._reasons[0]
+                self._reasons.clear()
+                return reason
+
+    def mark_analyzed(self, remaining: int = 0):
+        """Reset pending state after an analysis cycle. Call on the loop thread."""
+        now = time.monotonic()
+        self._mention_pending = False
+        self._spike_pending = False
+        self.pending = max(0, remaining)
+        self.pending_since = now if self.pending else 0.0
+        self._cancel_timers()
+        self._evaluate(now)
+
+    def _cancel_timers(self):
+        for handle in self._armed.values():
+            handle.cancel()
+        self._armed.clear()
+
+    def configure(self, config: Dict[str, Any]):
+        """Apply changed trigger settings. Call on the loop thread."""
+        if 'ANALYSIS_MAX_LATENCY' in config:
+            self.max_latency = config['ANALYSIS_MAX_LATENCY']
+        self.backlog_threshold = config.get('ANALYSIS_BACKLOG_TRIGGER', self.backlog_threshold)
+        self.rate_spike_factor = config.get('ANALYSIS_RATE_SPIKE', self.rate_spike_factor)
+        if 'ANALYSIS_MENTION_KEYWORDS' in config:
+            self.mention_keywords = parse_keywords(config['ANALYSIS_MENTION_KEYWORDS'])
+        for name in ('backlog', 'rate_spike', 'mention'):
+            key = f'ANALYSIS_{name.upper()}_DEBOUNCE'
+            if key in config:
+                self.triggers[name].debounce = max(0.0, float(config[key]))
+        # Timers were armed with the old delays
+        self._cancel_timers()
+        self._evaluate(time.monotonic())
+
+    def stop(self):
+        """Wake the waiter and stop scheduling further analyses"""
+        self._stopped = True
+        self._cancel_timers()
+        if self._event is not None:
+            self._event.set()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get scheduler status information"""
+        return {
+            'pending': self.pending,
+            'message_rate': round(self.message_rate, 3),
+            'baseline_rate': round(self.baseline_rate, 3),
+            'max_latency': self.max_latency,
+            'triggers': {name: t.fired_count for name, t in self.triggers.items()}
+        }
@@ -0,0 +1,613 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from .metrics import REGISTRY, merge_expositions
+from .prompts import create_prompt_registry, format_pins
+from .tokenizer import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ConsistentHashRing:
+    """Consistent hash ring with virtual nodes.
+
+    Adding or removing a node only moves the keys that hash next to its
+    virtual nodes, so a worker joining or dying reshuffles ~1/N of the rooms.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 64):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            point = _hash(f'{node}#{i}')
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for i in range(self.replicas):
+            point = _hash(f'{node}#{i}')
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.pop(bisect.bisect_left(self._points, point))
+
+    def get(self, key: str) -> Optional[str]:
+        """Node that owns ``key``"""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def assign(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        """Map every node to the keys it owns"""
+        assignment = {node: [] for node in self.nodes}
+        for key in keys:
+            node = self.get(key)
+            if node is not None:
+                assignment[node].append(key)
+        return assignment
+
+
+# Worker process
+
+def run_worker(worker_id: str, openai_key: str, bot_config: Dict[str, Any], commands, replies,
+               heartbeat_interval: float = 1.0):
+    """Worker process entry point: runs one BotCore per assigned room on its own event loop"""
+    from .utils import setup_logging
+
+    # Ctrl+C reaches the whole process group; the coordinator sends 'stop' so rooms get drained
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    base, ext = os.path.splitext(bot_config.get('LOG_FILE') or 'bot.log')
+    setup_logging(bot_config, log_file=f"{base}-{worker_id}{ext or '.log'}")
+    try:
+        asyncio.run(_worker_main(worker_id, openai_key, bot_config, commands, replies, heartbeat_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_main(worker_id: str, openai_key: str, bot_config: Dict[str, Any], commands, replies,
+                       heartbeat_interval: float):
+    from .bot_core import BotCore
+
+    bots: Dict[str, BotCore] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def stop_room(room: str, graceful: bool = False, timeout: Optional[float] = None):
+        bot = bots.pop(room)
+        if graceful:
+            # Drain the in-flight analysis and checkpoint the room
+            await bot.shutdown(bot_config.get('SHUTDOWN_TIMEOUT', 20.0) if timeout is None else timeout)
+        else:
+            await bot.stop()
+        task = tasks.pop(room)
+        try:
+            await asyncio.wait_for(task, timeout=5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            task.cancel()
+
+    async def assign(rooms: List[str]):
+        released = [r for r in bots if r not in rooms]
+        if released:
+            # Drain and checkpoint before the coordinator hands the rooms to their new owners
+            logger.info(f"[{worker_id}] Releasing rooms {', '.join(released)}")
+            results = await asyncio.gather(*(stop_room(room, graceful=True) for room in released),
+                                           return_exceptions=True)
+            for room, result in zip(released, results):
+                if isinstance(result, Exception):
+                    logger.error(f"[{worker_id}] Release of {room} failed: {result}")
+            replies.put(('released', worker_id, released, time.time()))
+        for room in rooms:
+            if room not in bots:
+                logger.info(f"[{worker_id}] Taking room {room}")
+                bots[room] = BotCore(openai_key=openai_key, token_address=room, config=bot_config)
+                tasks[room] = asyncio.create_task(bots[room].start())
+
+    def call(method: str, args: tuple) -> Dict[str, Any]:
+        # Rooms assigned to this worker later are built from bot_config: keep it current
+        if method == 'apply_config':
+            bot_config.update(args[0])
+        elif method == 'reload_prompts' and args[0] is not None:
+            bot_config['PROMPT_PINS'] = format_pins(args[0])
+        results = {}
+        for room, bot in bots.items():
+            try:
+                results[room] = getattr(bot, method)(*args)
+            except Exception as e:
+                logger.error(f"[{worker_id}] {method} failed for {room}: {e}")
+                results[room] = {'error': str(e)}
+        return results
+
+    while True:
+        try:
+            command = await asyncio.to_thread(commands.get, True, heartbeat_interval)
+        except queue.Empty:
+            replies.put(('heartbeat', worker_id, list(bots), time.time()))
+            continue
+
+        kind = command[0]
+        if kind == 'assign':
+            await assign(command[1])
+            replies.put(('heartbeat', worker_id, list(bots), time.time()))
+        elif kind == 'call':
+            _, request_id, method, args = command
+            replies.put(('reply', worker_id, request_id, call(method, args)))
+        elif kind == 'metrics':
+            replies.put(('reply', worker_id, command[1], REGISTRY.expose({'worker': worker_id})))
+        elif kind == 'stop':
+            rooms = list(bots)
+            timeout = command[1] if len(command) > 1 else None
+            results = await asyncio.gather(*(stop_room(room, graceful=True, timeout=timeout) for room in rooms),
+                                           return_exceptions=True)
+            for room, result in zip(rooms, results):
+                if isinstance(result, Exception):
+                    logger.error(f"[{worker_id}] Shutdown of {room} failed: {result}")
+            replies.put(('stopped', worker_id, [], time.time()))
+            return
+
+
+class _Worker:
+    """Coordinator-side handle of one worker process"""
+
+    def __init__(self, worker_id: str, process, commands):
+        self.worker_id = worker_id
+        self.process = process
+        self.commands = commands
+        self.rooms: List[str] = []
+        self.started_at = time.time()
+        self.last_heartbeat = time.time()
+        self.restarts = 0
+
+
+class ShardCoordinator:
+    """Spreads rooms over worker processes and aggregates their state.
+
+    Rooms are placed with a consistent hash ring over worker ids. Workers
+    report heartbeats on a shared reply queue. A worker that exits or stops
+    heartbeating is restarted under the same id when ``respawn`` is on (so
+    only its own rooms move), otherwise it is dropped from the ring and its
+    rooms go to the survivors. The coordinator exposes the same methods as
+    ``BotCore``, so ``APIServer`` can serve it unchanged.
+    """
+
+    mode = "normal"
+
+    def __init__(self, openai_key: str, rooms: List[str], bot_config: Dict[str, Any], workers: int = 2,
+                 heartbeat_interval: float = 1.0, heartbeat_timeout: float = 10.0, respawn: bool = True,
+                 request_timeout: float = 3.0):
+        self.openai_key = openai_key
+        self.rooms = list(dict.fromkeys(rooms))
+        self.bot_config = bot_config
+        self.worker_count = max(1, workers)
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.respawn = respawn
+        self.request_timeout = request_timeout
+
+        # Same prompt files as the workers: validates modes before fanning out
+        self.prompts = create_prompt_registry(bot_config, TokenCounter(bot_config.get('OPENAI_MODEL') or 'gpt-4o-mini'))
+
+        self.ctx = multiprocessing.get_context('spawn')
+        self.replies = self.ctx.Queue()
+        self.ring = ConsistentHashRing()
+        self.workers: Dict[str, _Worker] = {}
+        self._lock = threading.RLock()
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        # Rooms being released: room -> (old owner, monotonic deadline of the hand-off)
+        self._handoffs: Dict[str, Tuple[str, float]] = {}
+        self._request_ids = itertools.count(1)
+        self._next_worker = itertools.count(0)
+        self._monitor = None
+        self.is_running = False
+        self.is_paused = False
+        self.start_time = None
+        self.rebalances = 0
+
+    @property
+    def token_address(self) -> str:
+        return ','.join(self.rooms)
+
+    # Lifecycle
+
+    def start(self):
+        """Spawn the workers, place the rooms and start supervising"""
+        self.start_time = time.time()
+        self.is_running = True
+        with self._lock:
+            for _ in range(self.worker_count):
+                worker_id = f'worker-{next(self._next_worker)}'
+                self._spawn(worker_id)
+                self.ring.add(worker_id)
+            self._rebalance()
+        self._monitor = threading.Thread(target=self._monitor_loop, name='shard-monitor', daemon=True)
+        self._monitor.start()
+
+    def _spawn(self, worker_id: str) -> _Worker:
+        commands = self.ctx.Queue()
+        process = self.ctx.Process(
+            target=run_worker,
+            args=(worker_id, self.openai_key, self.bot_config, commands, self.replies, self.heartbeat_interval),
+            name=f'shard-{worker_id}',
+            daemon=True
+        )
+        process.start()
+        previous = self.workers.get(worker_id)
+        worker = _Worker(worker_id, process, commands)
+        if previous:
+            worker.restarts = previous.restarts + 1
+        self.workers[worker_id] = worker
+        logger.info(f"Started {worker_id} (pid {process.pid})")
+        return worker
+
+    def add_worker(self) -> str:
+        """Start one more worker; it takes over its share of the ring"""
+        with self._lock:
+            worker_id = f'worker-{next(self._next_worker)}'
+            self._spawn(worker_id)
+            self.ring.add(worker_id)
+            self._rebalance()
+        return worker_id
+
+    def remove_worker(self, worker_id: str):
+        """Gracefully stop a worker and hand its rooms to the others"""
+        with self._lock:
+            worker = self.workers.pop(worker_id, None)
+            if worker is None:
+                return
+            self.ring.remove(worker_id)
+            # Release first: the stop command queues behind it
+            self._release(worker, [])
+            worker.commands.put(('stop',))
+            self._rebalance()
+        worker.process.join(self._handoff_timeout())
+        if worker.process.is_alive():
+            worker.process.terminate()
+        with self._lock:
+            self._handoffs_done(worker_id)
+
+    def stop(self, timeout: Optional[float] = None, force: Optional[threading.Event] = None):
+        """Stop every worker within ``timeout`` seconds (SHUTDOWN_TIMEOUT + 10 by default).
+
+        Workers get the budget minus a margin for their checkpoints and exit.
+        Workers still running at the deadline, or once ``force`` is set, are
+        terminated.
+        """
+        self.is_running = False
+        if timeout is None:
+            timeout = self._handoff_timeout()
+        with self._lock:
+            workers = list(self.workers.values())
+            self.workers.clear()
+        for worker in workers:
+            worker.commands.put(('stop', max(0.0, timeout - 2.0)))
+        # Workers drain and checkpoint their rooms in parallel
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            while worker.process.is_alive() and not (force and force.is_set()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                worker.process.join(min(remaining, 0.2))
+            if worker.process.is_alive():
+                worker.process.terminate()
+        logger.info("Shard coordinator stopped")
+
+    # Placement and supervision
+
+    def _rebalance(self):
+        """Move rooms to their ring owners.
+
+        A room that changes owner is released first: the old owner drains
+        and checkpoints it and replies ``released``, only then is the room
+        assigned to the new owner, which loads that checkpoint. A room
+        never has two owners answering its chat at once.
+        """
+        assignment = self.ring.assign(self.rooms)
+        for worker_id, worker in self.workers.items():
+            keep = [room for room in worker.rooms if room in assignment.get(worker_id, ())]
+            if len(keep) != len(worker.rooms):
+                self._release(worker, keep)
+        self._dispatch()
+        self.rebalances += 1
+
+    def _handoff_timeout(self) -> float:
+        return self.bot_config.get('SHUTDOWN_TIMEOUT', 20.0) + 10
+
+    def _release(self, worker: _Worker, keep: List[str]):
+        deadline = time.monotonic() + self._handoff_timeout()
+        for room in worker.rooms:
+            if room not in keep:
+                self._handoffs[room] = (worker.worker_id, deadline)
+        worker.rooms = keep
+        worker.commands.put(('assign', keep))
+
+    def _dispatch(self):
+        """Assign every room that is not waiting for its old owner to let go"""
+        for worker_id, rooms in self.ring.assign(self.rooms).items():
+            worker = self.workers.get(worker_id)
+            rooms = [room for room in rooms if room not in self._handoffs]
+            if worker is not None and sorted(rooms) != sorted(worker.rooms):
+                worker.rooms = rooms
+                worker.commands.put(('assign', rooms))
+
+    def _handoffs_done(self, worker_id: str, rooms: Optional[List[str]] = None):
+        """The old owner let go of ``rooms`` (all of its rooms when None): assign them"""
+        done = [room for room, (owner, _) in self._handoffs.items()
+                if owner == worker_id and (rooms is None or room in rooms)]
+        for room in done:
+            del self._handoffs[room]
+        if done and self.is_running:
+            self._dispatch()
+
+    def _handle_dead(self, worker: _Worker, reason: str):
+        logger.warning(f"{worker.worker_id} is dead ({reason}), rebalancing {len(worker.rooms)} rooms")
+        if worker.process.is_alive():
+            worker.process.terminate()
+        self.ring.remove(worker.worker_id)
+        if self.respawn and self.is_running:
+            replacement = self._spawn(worker.worker_id)
+            replacement.last_heartbeat = time.time()
+            self.ring.add(worker.worker_id)
+        else:
+            del self.workers[worker.worker_id]
+        # Whatever it was releasing is as checkpointed as it will get
+        self._handoffs_done(worker.worker_id)
+        self._rebalance()
+
+    def _monitor_loop(self):
+        while self.is_running:
+            try:
+                message = self.replies.get(timeout=self.heartbeat_interval)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+
+            if message is not None:
+                self._handle_reply(message)
+
+            now = time.time()
+            with self._lock:
+                if not self.is_running:
+                    break
+                for worker in list(self.workers.values()):
+                    if not worker.process.is_alive():
+                        self._handle_dead(worker, f'exit code {worker.process.exitcode}')
+                    elif now - worker.last_heartbeat > self.heartbeat_timeout:
+                        self._handle_dead(worker, 'heartbeat timeout')
+                expired = [room for room, (_, deadline) in self._handoffs.items() if deadline < time.monotonic()]
+                for room in expired:
+                    owner, _ = self._handoffs.pop(room)
+                    logger.warning(f"{owner} did not release {room} in time, assigning it anyway")
+                if expired:
+                    self._dispatch()
+
+    def _handle_reply(self, message):
+        kind, worker_id = message[0], message[1]
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if worker is not None:
+                worker.last_heartbeat = time.time()
+            if kind == 'released':
+                self._handoffs_done(worker_id, message[2])
+            elif kind == 'reply':
+                pending = self._pending.get(message[2])
+                if pending is not None:
+                    pending['results'][worker_id] = message[3]
+                    if pending['expected'] <= set(pending['results']):
+                        pending['event'].set()
+
+    # Fan-out queries
+
+    def _gather(self, kind: str, *args, with_rooms_only: bool = True) -> Dict[str, Any]:
+        """Send a request to the workers and wait for their replies; returns ``{worker_id: result}``"""
+        request_id = next(self._request_ids)
+        pending = {'event': threading.Event(), 'results': {}}
+        with self._lock:
+            workers = [w for w in self.workers.values() if w.rooms or not with_rooms_only]
+            pending['expected'] = {w.worker_id for w in workers}
+            self._pending[request_id] = pending
+        if not workers:
+            pending['event'].set()
+        for worker in workers:
+            worker.commands.put((kind, request_id, *args))
+
+        pending['event'].wait(self.request_timeout)
+        with self._lock:
+            self._pending.pop(request_id, None)
+            missing = pending['expected'] - set(pending['results'])
+        if missing:
+            logger.warning(f"No {kind} {args[:1]} reply from {', '.join(sorted(missing))}")
+        return dict(pending['results'])
+
+    def _call(self, method: str, *args) -> Dict[str, Any]:
+        """Run a BotCore method in every worker; returns ``{room: result}``"""
+        merged = {}
+        for results in self._gather('call', method, args).values():
+            merged.update(results)
+        return merged
+
+    def get_metrics(self) -> str:
+        """Metrics of the coordinator and all workers, labelled by worker"""
+        texts = [REGISTRY.expose({'worker': 'coordinator'})]
+        texts.extend(self._gather('metrics', with_rooms_only=False).values())
+        return merge_expositions(texts)
+
+    def get_shards(self) -> Dict[str, Any]:
+        """Placement and health of the workers"""
+        now = time.time()
+        with self._lock:
+            return {
+                worker_id: {
+                    'pid': worker.process.pid,
+                    'alive': worker.process.is_alive(),
+                    'rooms': list(worker.rooms),
+                    'heartbeat_age': now - worker.last_heartbeat,
+                    'restarts': worker.restarts
+                }
+                for worker_id, worker in self.workers.items()
+            }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Aggregated status of all rooms (same top-level shape as ``BotCore.get_status``)"""
+        rooms = self._call('get_status')
+        statuses = [s for s in rooms.values() if 'error' not in s]
+        uptime = time.time() - self.start_time if self.start_time else 0
+        connections = [s.get('connection') or {} for s in statuses]
+
+        return {
+            'is_running': self.is_running and any(s.get('is_running') for s in statuses),
+            'is_paused': bool(statuses) and all(s.get('is_paused') for s in statuses),
+            'token_address': self.token_address,
+            'uptime_seconds': uptime,
+            'start_time': self.start_time,
+            'last_analysis_time': max((s.get('last_analysis_time') or 0 for s in statuses), default=0),
+            'last_error': next((s.get('last_error') for s in statuses if s.get('last_error')), None),
+            'pump_connection': {
+                'room_id': f'{len(statuses)}/{len(self.rooms)} rooms',
+                'connected': sum(1 for s in statuses if s.get('pump_connection')),
+                'reconnects': sum(c.get('reconnects', 0) for c in connections),
+                'downtime_seconds': sum(c.get('downtime_seconds', 0) for c in connections)
+            },
+            'statistics': self._sum_statistics([s.get('statistics') or {} for s in statuses], uptime),
+            'sharding': {
+                'workers': self.get_shards(),
+                'rooms': len(self.rooms),
+                'rebalances': self.rebalances
+            },
+            'rooms': rooms
+        }
+
+    def get_readiness(self) -> Dict[str, Any]:
+        """Ready once every room is placed on a worker and its bot reports ready"""
+        rooms = self._call('get_readiness')
+        ready = [room for room, r in rooms.items() if r.get('ready')]
+        return {
+            'ready': self.is_running and len(ready) == len(self.rooms),
+            'checks': {'rooms': f'{len(ready)}/{len(self.rooms)}'},
+            'rooms': rooms
+        }
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Aggregated statistics of all rooms (same shape as ``BotCore.get_statistics``)"""
+        rooms = self._call('get_statistics')
+        stats = [s for s in rooms.values() if 'error' not in s]
+        uptime = time.time() - self.start_time if self.start_time else 0
+        total_analyses = sum(s.get('total_analyses', 0) for s in stats)
+        api_errors = sum(s.get('api_errors', 0) for s in stats)
+        hours, rest = divmod(int(uptime), 3600)
+
+        return {
+            'uptime_seconds': uptime,
+            'uptime_formatted': f"{hours:02d}:{rest // 60:02d}:{rest % 60:02d}",
+            'messages_per_minute': sum(s.get('messages_per_minute', 0) for s in stats),
+            'analyses_per_minute': sum(s.get('analyses_per_minute', 0) for s in stats),
+            'success_rate': (total_analyses / (total_analyses + api_errors) * 100) if total_analyses + api_errors else 100.0,
+            'last_analysis': max((s['last_analysis'] for s in stats if s.get('last_analysis')), default=None),
+            'total_messages': sum(s.get('total_messages', 0) for s in stats),
+            'total_analyses': total_analyses,
+            'api_errors': api_errors,
+            'connection_errors': sum(s.get('connection_errors', 0) for s in stats),
+            'messages_dropped': sum(s.get('messages_dropped', 0) for s in stats),
+            'rooms': rooms
+        }
+
+    def _sum_statistics(self, stats: List[Dict[str, Any]], uptime: float) -> Dict[str, Any]:
+        totals = {'uptime': uptime}
+        for entry in stats:
+            for key, value in entry.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and key != 'uptime':
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def get_recent_messages(self, limit: int = 50) -> List[Dict[str, Any]]:
+        messages = [m for room in self._call('get_recent_messages', limit).values() for m in room]
+        messages.sort(key=lambda m: m.get('timestamp') or 0)
+        return messages[-limit:]
+
+    def get_analysis_results(self, limit: int = 10) -> List[Dict[str, Any]]:
+        results = [r for room in self._call('get_analysis_results', limit).values() for r in room]
+        results.sort(key=lambda r: r.get('timestamp') or 0)
+        return results[-limit:]
+
+    def get_latest_analysis(self) -> Optional[Dict[str, Any]]:
+        results = self.get_analysis_results(1)
+        return results[-1] if results else None
+
+    def get_traces(self, limit: int = 20) -> Optional[Dict[str, Any]]:
+        """Traces per room"""
+        traces = {r: t for r, t in self._call('get_traces', limit).items() if t}
+        return traces or None
+
+    def get_topics(self, room: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        topics = self._call('get_topics')
+        if room is not None:
+            return topics.get(room)
+        return {r: t for r, t in topics.items() if t} or None
+
+    def pause(self, room: Optional[str] = None) -> Optional[bool]:
+        """Pause every room, or only ``room``; None when no worker serves that room"""
+        results = self._call('pause', room)
+        if room is None:
+            self.is_paused = True
+            return True
+        return results.get(room)
+
+    def resume(self, room: Optional[str] = None) -> Optional[bool]:
+        results = self._call('resume', room)
+        if room is None:
+            self.is_paused = False
+            return True
+        return results.get(room)
+
+    def apply_config(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Forward live settings to every room; respawned workers start with them"""
+        self.bot_config.update(changes)
+        return self._call('apply_config', changes)
+
+    def _change_mode(self, mode: str, room: Optional[str] = None) -> Optional[str]:
+        """Switch every room, or only ``room``; None when no worker serves that room"""
+        if mode not in self.prompts.active:
+            raise ValueError(f"Unknown mode: {mode}")
+        results = self._call('_change_mode', mode, room)
+        if room is None:
+            self.mode = mode
+            return mode
+        return results.get(room)
+
+    def get_prompts(self) -> Dict[str, Any]:
+        rooms = {room: prompts['rooms'].get(room) for room, prompts in self._call('get_prompts').items()
+                 if 'error' not in prompts}
+        return {**self.prompts.describe(), 'rooms': rooms}
+
+    def reload_prompts(self, pins: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Reload in every room; new pins are kept so respawned workers start with them"""
+        changed = self.prompts.reload(pins)
+        if pins is not None:
+            self.bot_config['PROMPT_PINS'] = format_pins(pins)
+        self._call('reload_prompts', pins)
+        return changed
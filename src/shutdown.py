@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import signal
+import time
+from typing import List, Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ShutdownCoordinator:
+    """Turns SIGINT/SIGTERM into an orderly stop on the event loop.
+
+    The signal handler only sets an event. ``run`` then executes the
+    registered steps in order, each with what is left of ``timeout``:
+    bots stop taking new analyses and finish the in-flight one, persist
+    their checkpoints, then the API server and the log pipeline are shut
+    down. A second signal while draining cancels the step in progress and
+    leaves no time to the ones after it (they still run, without waiting).
+    """
+
+    def __init__(self, timeout: float = 20.0):
+        self.timeout = timeout
+        self.requested = asyncio.Event()
+        self.forced = asyncio.Event()
+        self.signal = None
+        self.report: Dict[str, Any] = {}
+        self._steps: List[tuple] = []
+        self._loop = None
+
+    def install(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Route SIGINT and SIGTERM to ``request`` on the running loop"""
+        self._loop = loop or asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(signum, self.request, signum)
+            except (NotImplementedError, RuntimeError):
+                # Windows: обычный обработчик, событие выставляем через цикл
+                signal.signal(signum, lambda s, f: self._loop.call_soon_threadsafe(self.request, s))
+
+    def request(self, signum: Optional[int] = None):
+        if self.requested.is_set():
+            logger.warning("Second shutdown signal, not waiting for the drain any more")
+            self.timeout = 0
+            self.forced.set()
+            return
+        self.signal = signum
+        logger.info(f"Shutdown requested{f' (signal {signum})' if signum else ''}")
+        self.requested.set()
+
+    def add_step(self, name: str, step: Callable[[float], Any]):
+        """Register ``step(remaining_seconds)``; it may be sync or a coroutine function"""
+        self._steps.append((name, step))
+
+    async def wait(self):
+        await self.requested.wait()
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every step; a failing or slow step does not stop the ones after it"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        for name, step in self._steps:
+            remaining = max(0.0, deadline - time.monotonic()) if self.timeout else 0.0
+            step_started = time.monotonic()
+            try:
+                result = step(remaining)
+                if asyncio.iscoroutine(result):
+                    # Шаг получает остаток времени сам, здесь только страховка от зависания
+                    result = await self._await_step(result, remaining + 5.0)
+                self.report[name] = {'ok': True, 'seconds': round(time.monotonic() - step_started, 3),
+                                     'result': result}
+            except Exception as e:
+                logger.error(f"Shutdown step {name} failed: {e!r}")
+                self.report[name] = {'ok': False, 'seconds': round(time.monotonic() - step_started, 3),
+                                     'error': repr(e)}
+        logger.info(f"Shutdown finished in {time.monotonic() - started:.2f}s")
+        return self.report
+
+    async def _await_step(self, coro, timeout: float) -> Any:
+        """Await a step, cancelling it on timeout or on a second signal"""
+        task = asyncio.ensure_future(coro)
+        forced = asyncio.ensure_future(self.forced.wait())
+        try:
+            done, _ = await asyncio.wait({task, forced}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            forced.cancel()
+        if task in done:
+            return task.result()
+        task.cancel()
+        # Give the step a moment to unwind its cancellation, but never hang on it
+        await asyncio.wait({task}, timeout=1.0)
+        if self.forced.is_set():
+            raise RuntimeError('cancelled by a second shutdown signal')
+        raise asyncio.TimeoutError(f'step did not finish within {timeout:.1f}s')
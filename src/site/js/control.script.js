@@ -1,6 +1,21 @@
 var refreshInterval;
 // var isPaused = false;
 
+// API key for servers started with API_KEYS: asked for on 401 and kept in the browser
+async function apiFetch(url, options = {}) {
+    const key = localStorage.getItem('apiKey');
+    const headers = Object.assign({}, options.headers, key ? { 'X-API-Key': key } : {});
+    const response = await fetch(url, Object.assign({}, options, { headers: headers }));
+    if (response.status === 401) {
+        const entered = window.prompt('API key');
+        if (entered) {
+            localStorage.setItem('apiKey', entered);
+            return apiFetch(url, options);
+        }
+    }
+    return response;
+}
+
 // Load initial data
 document.addEventListener('DOMContentLoaded', function () {
     loadAllData();
@@ -14,7 +29,7 @@ async function changeMode(e) {
 
     if (mode) {
         try {
-            const response = await fetch('/api/mode', {
+            const response = await apiFetch('/api/mode', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json;charset=utf-8'
@@ -57,7 +72,7 @@ async function loadAllData() {
 
 async function loadStatus() {
     try {
-        const response = await fetch('/api/status');
+        const response = await apiFetch('/api/status');
         const data = await response.json();
 
         if (data.success) {
@@ -121,7 +136,7 @@ function updateControlButtons(status) {
 
 async function pauseBot() {
     try {
-        const response = await fetch('/api/pause', { method: 'POST' });
+        const response = await apiFetch('/api/pause', { method: 'POST' });
         const data = await response.json();
 
         if (data.success) {
@@ -137,7 +152,7 @@ async function pauseBot() {
 
 async function resumeBot() {
     try {
-        const response = await fetch('/api/resume', { method: 'POST' });
+        const response = await apiFetch('/api/resume', { method: 'POST' });
         const data = await response.json();
 
         if (data.success) {
@@ -153,7 +168,7 @@ async function resumeBot() {
 
 async function loadMessages() {
     try {
-        const response = await fetch('/api/messages?limit=15');
+        const response = await apiFetch('/api/messages?limit=15');
         const data = await response.json();
 
         if (data.success) {
@@ -193,7 +208,7 @@ function displayMessages(messages) {
 
 async function loadAnalysis() {
     try {
-        const response = await fetch('/api/analysis?limit=8');
+        const response = await apiFetch('/api/analysis?limit=8');
         const data = await response.json();
 
         if (data.success) {
@@ -233,7 +248,7 @@ function displayAnalysis(analyses) {
 
 async function loadStatistics() {
     try {
-        const response = await fetch('/api/statistics');
+        const response = await apiFetch('/api/statistics');
         const data = await response.json();
 
         if (data.success) {
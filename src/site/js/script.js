@@ -1,9 +1,25 @@
 var refreshInterval;
+var roomAddress = null;
 
 //# DOM bloks
 var textarea;
 // var isPaused = false;
 
+// API key for servers started with API_KEYS: asked for on 401 and kept in the browser
+async function apiFetch(url, options = {}) {
+    const key = localStorage.getItem('apiKey');
+    const headers = Object.assign({}, options.headers, key ? { 'X-API-Key': key } : {});
+    const response = await fetch(url, Object.assign({}, options, { headers: headers }));
+    if (response.status === 401) {
+        const entered = window.prompt('API key');
+        if (entered) {
+            localStorage.setItem('apiKey', entered);
+            return apiFetch(url, options);
+        }
+    }
+    return response;
+}
+
 console.log("[Bot] Run...")
 
 // Красивый ввод текса
@@ -116,11 +132,13 @@ async function loadAllData() {
 }
 
 async function loadCountLiveChat() {
+    if (!roomAddress) return;
     try {
-        const response = await fetch('https://frontend-api-v3.pump.fun/replies/9h5y3WCqfeNt2fiAP7iM2ZRp9apFb58ipvTzcWi9pump?limit=1000&offset=0&reverseOrder=true');
+        // Бот кэширует данные pump.fun на сервере - браузеры не ходят туда напрямую
+        const response = await apiFetch(`/api/rooms/${roomAddress}/meta`);
         const data = await response.json();
 
-        console.log("loadCountLiveChat", data, data?.num_participants);
+        console.log("loadCountLiveChat", data, data?.data?.participants);
     } catch (error) {
         console.error("loadCountLiveChat");
     }
@@ -128,11 +146,12 @@ async function loadCountLiveChat() {
 
 async function loadStatus() {
     try {
-        const response = await fetch('/api/status');
+        const response = await apiFetch('/api/status');
         const data = await response.json();
 
         if (data.success) {
             const status = data.data;
+            roomAddress = (status.token_address || "").split(",")[0] || null;
             updateBotStatus(status);
             // updateConnectionStatus(status);
             // updateControlButtons(status);
@@ -220,7 +239,7 @@ function updateControlButtons(status) {
 
 async function pauseBot() {
     try {
-        const response = await fetch('/api/pause', { method: 'POST' });
+        const response = await apiFetch('/api/pause', { method: 'POST' });
         const data = await response.json();
 
         if (data.success) {
@@ -236,7 +255,7 @@ async function pauseBot() {
 
 async function resumeBot() {
     try {
-        const response = await fetch('/api/resume', { method: 'POST' });
+        const response = await apiFetch('/api/resume', { method: 'POST' });
         const data = await response.json();
 
         if (data.success) {
@@ -252,7 +271,7 @@ async function resumeBot() {
 
 async function loadMessages() {
     try {
-        const response = await fetch('/api/messages?limit=15');
+        const response = await apiFetch('/api/messages?limit=15');
         const data = await response.json();
 
         if (data.success) {
@@ -305,7 +324,7 @@ function displayMessages(messages) {
 
 async function loadAnalysis() {
     try {
-        const response = await fetch('/api/analysis?limit=8');
+        const response = await apiFetch('/api/analysis?limit=8');
         const data = await response.json();
 
         if (data.success) {
@@ -359,7 +378,7 @@ function displayAnalysis(analyses) {
 
 async function loadStatistics() {
     try {
-        const response = await fetch('/api/statistics');
+        const response = await apiFetch('/api/statistics');
         const data = await response.json();
 
         if (data.success) {
@@ -0,0 +1,165 @@
+import threading
+from types import MappingProxyType
+from typing import List, Any, Optional, Iterator, Iterable, Mapping, Tuple
+
+
+class Snapshot:
+    """Immutable, versioned view of a ``SnapshotLog``.
+
+    Sealed chunks are shared with older and newer snapshots; nothing here is
+    ever mutated after publication, so readers need no lock.
+    """
+
+    __slots__ = ('version', '_chunks', '_offset', '_tail', '_length', '_items')
+
+    def __init__(self, version: int, chunks: Tuple[tuple, ...], offset: int, tail: tuple, length: int):
+        self.version = version
+        self._chunks = chunks
+        self._offset = offset
+        self._tail = tail
+        self._length = length
+        self._items = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __iter__(self) -> Iterator[Any]:
+        for index, chunk in enumerate(self._chunks):
+            yield from (chunk[self._offset:] if index == 0 else chunk)
+        yield from self._tail
+
+    def __getitem__(self, index):
+        if isinstance(index, int) and index == -1 and self._length:
+            return self.last()
+        return self.to_list()[index]
+
+    def to_list(self) -> List[Any]:
+        """Materialized items (built once per snapshot, then shared)"""
+        if self._items is None:
+            self._items = list(self)
+        return self._items
+
+    def tail(self, count: int) -> List[Any]:
+        """Last ``count`` items, oldest first, copying only what is returned"""
+        if count <= 0:
+            return []
+        if count >= self._length:
+            return self.to_list()[:]
+        if count <= len(self._tail):
+            return list(self._tail[-count:])
+
+        parts = [self._tail]
+        needed = count - len(self._tail)
+        for index in range(len(self._chunks) - 1, -1, -1):
+            chunk = self._chunks[index][self._offset:] if index == 0 else self._chunks[index]
+            if needed <= len(chunk):
+                parts.append(chunk[-needed:])
+                break
+            parts.append(chunk)
+            needed -= len(chunk)
+        return [item for part in reversed(parts) for item in part]
+
+    def last(self) -> Optional[Any]:
+        if self._tail:
+            return self._tail[-1]
+        if self._chunks and self._length:
+            return self._chunks[-1][-1]
+        return None
+
+
+_EMPTY = Snapshot(0, (), 0, (), 0)
+
+
+class SnapshotLog:
+    """Bounded append-only log published as immutable snapshots.
+
+    Writers serialize on ``lock`` and publish a new ``Snapshot`` by replacing
+    a single attribute; readers take ``log.snapshot`` (one atomic reference
+    read) and work on it without locking. Items are kept in tuples of
+    ``chunk_size``: an append copies at most one chunk plus the chunk index,
+    older chunks are shared between versions (copy-on-write).
+    """
+
+    def __init__(self, maxlen: Optional[int] = None, chunk_size: int = 32):
+        self.maxlen = maxlen
+        self.chunk_size = max(1, chunk_size)
+        self.lock = threading.RLock()
+        self.snapshot: Snapshot = _EMPTY
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def append(self, item: Any) -> Snapshot:
+        with self.lock:
+            current = self.snapshot
+            chunks, offset, tail = current._chunks, current._offset, current._tail + (item,)
+            if len(tail) >= self.chunk_size:
+                chunks, tail = chunks + (tail,), ()
+            length = current._length + 1
+
+            if self.maxlen is not None and length > self.maxlen:
+                chunks, offset, tail = self._trim(chunks, offset + length - self.maxlen, tail)
+                length = self.maxlen
+
+            self.snapshot = Snapshot(current.version + 1, chunks, offset, tail, length)
+            return self.snapshot
+
+    def _trim(self, chunks: Tuple[tuple, ...], offset: int, tail: tuple):
+        while chunks and offset >= len(chunks[0]):
+            offset -= len(chunks[0])
+            chunks = chunks[1:]
+        if not chunks:
+            return (), 0, tail[offset:]
+        return chunks, offset, tail
+
+    def replace(self, items: Iterable[Any]) -> Snapshot:
+        """Publish a whole new content (e.g. after merging a history backfill)"""
+        items = list(items)
+        if self.maxlen is not None:
+            items = items[-self.maxlen:] if self.maxlen else []
+        size = self.chunk_size
+        sealed = len(items) - len(items) % size
+        chunks = tuple(tuple(items[i:i + size]) for i in range(0, sealed, size))
+        with self.lock:
+            self.snapshot = Snapshot(self.snapshot.version + 1, chunks, 0, tuple(items[sealed:]), len(items))
+            return self.snapshot
+
+    def resize(self, maxlen: Optional[int]) -> Snapshot:
+        """Change the limit in place; shrinking drops the oldest items"""
+        with self.lock:
+            self.maxlen = maxlen
+            if maxlen is not None and len(self.snapshot) > maxlen:
+                return self.replace(self.snapshot.to_list())
+            return self.snapshot
+
+
+class SnapshotMap:
+    """Small copy-on-write dict: every write publishes a new read-only mapping"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot: Mapping[Any, Any] = MappingProxyType({})
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self.snapshot.get(key, default)
+
+    def set(self, key: Any, value: Any):
+        with self.lock:
+            updated = dict(self.snapshot)
+            updated[key] = value
+            self.snapshot = MappingProxyType(updated)
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        with self.lock:
+            if key not in self.snapshot:
+                return default
+            updated = dict(self.snapshot)
+            value = updated.pop(key)
+            self.snapshot = MappingProxyType(updated)
+            return value
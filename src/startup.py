@@ -0,0 +1,17 @@
+import time
+from typing import Dict
+
+# Момент импорта модуля - main.py импортирует его первым, это и есть старт процесса
+BOOT = time.perf_counter()
+_marks: Dict[str, float] = {}
+
+
+def mark(event: str):
+    """Record the first time ``event`` happened, in seconds since boot"""
+    if event not in _marks:
+        _marks[event] = round(time.perf_counter() - BOOT, 4)
+
+
+def timeline() -> Dict[str, float]:
+    """Boot milestones in the order they happened"""
+    return dict(sorted(_marks.items(), key=lambda item: item[1]))
@@ -0,0 +1,68 @@
+import logging
+import re
+from typing import List, Dict, Any
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Chat format overhead per message and for priming the reply (OpenAI cookbook numbers)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate used when tiktoken is not installed"""
+    if not text:
+        return 0
+    total = 0
+    for piece in _PIECE_RE.findall(text):
+        if piece.isascii():
+            total += (len(piece) + 3) // 4
+        else:
+            # Cyrillic, CJK and emoji are roughly one token per character
+            total += len(piece)
+    return total
+
+
+class TokenCounter:
+    """Counts prompt tokens locally: tiktoken when installed, estimator otherwise"""
+
+    def __init__(self, model: str = 'gpt-4o-mini'):
+        self.model = model
+        self.encoding = None
+
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                # Unknown model (e.g. a local one): the default encoding may still need a download
+                try:
+                    self.encoding = tiktoken.get_encoding('o200k_base')
+                except Exception as e:
+                    logger.warning(f"tiktoken has no encoding for {model}, using estimator: {e}")
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable, using estimator: {e}")
+
+        self.backend = 'tiktoken' if self.encoding is not None else 'estimate'
+
+    def count(self, text: str) -> int:
+        """Count tokens in a piece of text"""
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return estimate_tokens(text)
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        """Count tokens of a chat completion message list"""
+        total = TOKENS_PER_REPLY
+        for message in messages:
+            total += TOKENS_PER_MESSAGE + self.count(message.get('content') or '')
+        return total
+
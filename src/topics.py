@@ -0,0 +1,258 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, Counter, deque
+from typing import List, Dict, Any, Optional
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[\w']+", re.UNICODE)
+_STOPWORDS = {
+    'the', 'a', 'an', 'and', 'or', 'is', 'are', 'to', 'of', 'in', 'on', 'it', 'this', 'that',
+    'i', 'you', 'we', 'he', 'she', 'they', 'my', 'your', 'for', 'with', 'be', 'so', 'just', 'lol'
+}
+
+
+def _text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+class HashingEmbedder:
+    """Dependency-free embedder: hashed word unigrams and character trigrams"""
+
+    name = 'hashing'
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> 'np.ndarray':
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            lowered = text.lower()
+            features = _WORD_RE.findall(lowered)
+            padded = f' {lowered} '
+            features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=4).digest()
+                value = int.from_bytes(digest, 'little')
+                matrix[row, value % self.dim] += 1.0 if value & 0x80000000 else -1.0
+        return _normalize(matrix)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-embedding model (sentence-transformers)"""
+
+    name = 'local'
+
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> 'np.ndarray':
+        vectors = self.model.encode(texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False)
+        return _normalize(vectors.astype(np.float32))
+
+
+class OpenAIEmbedder:
+    """OpenAI embeddings API"""
+
+    name = 'openai'
+
+    def __init__(self, api_key: str, model: str = 'text-embedding-3-small', dim: int = 256):
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=api_key)
+        self.model = model
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> 'np.ndarray':
+        response = self.client.embeddings.create(model=self.model, input=texts, dimensions=self.dim)
+        vectors = np.array([item.embedding for item in response.data], dtype=np.float32)
+        return _normalize(vectors)
+
+
+def _normalize(matrix: 'np.ndarray') -> 'np.ndarray':
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class CachedEmbedder:
+    """LRU cache keyed on the text hash in front of an embedder; misses are embedded in one batch"""
+
+    def __init__(self, embedder, max_size: int = 4096):
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, texts: List[str]) -> 'np.ndarray':
+        result = np.empty((len(texts), self.dim), dtype=np.float32)
+        missing = OrderedDict()  # key -> (text, rows); identical lines are embedded once
+        for row, text in enumerate(texts):
+            key = _text_key(text)
+            vector = self.cache.get(key)
+            if vector is None:
+                missing.setdefault(key, (text, []))[1].append(row)
+            else:
+                self.cache.move_to_end(key)
+                result[row] = vector
+                self.hits += 1
+
+        if missing:
+            vectors = self.embedder.embed([text for text, _ in missing.values()])
+            self.misses += len(missing)
+            for (key, (_, rows)), vector in zip(missing.items(), vectors):
+                result[rows] = vector
+                self.cache[key] = vector
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return result
+
+
+class StreamingKMeans:
+    """Online k-means over unit vectors (cosine similarity).
+
+    The first ``k`` distinct points seed the centroids; afterwards every point
+    moves its nearest centroid by ``1 / min(count, max_count)`` so clusters can
+    drift with the conversation instead of freezing.
+    """
+
+    def __init__(self, k: int, dim: int, max_count: int = 200, examples: int = 5):
+        self.k = k
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.counts: List[int] = []
+        self.max_count = max_count
+        self.examples = [deque(maxlen=examples) for _ in range(k)]
+        self.words = [Counter() for _ in range(k)]
+        self.last_seen = [0.0] * k
+
+    def partial_fit(self, vectors: 'np.ndarray', texts: List[str]) -> List[int]:
+        """Assign a batch of vectors to clusters and update the centroids"""
+        labels = []
+        now = time.time()
+        for vector, text in zip(vectors, texts):
+            if len(self.counts) < self.k:
+                self.centroids = np.vstack([self.centroids, vector])
+                self.counts.append(0)
+                label = len(self.counts) - 1
+            else:
+                label = int(np.argmax(self.centroids @ vector))
+            self.counts[label] += 1
+            rate = 1.0 / min(self.counts[label], self.max_count)
+            centroid = self.centroids[label] + rate * (vector - self.centroids[label])
+            self.centroids[label] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+            self.examples[label].append(text)
+            self.words[label].update(
+                w for w in _WORD_RE.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS
+            )
+            if len(self.words[label]) > 500:
+                self.words[label] = Counter(dict(self.words[label].most_common(100)))
+            self.last_seen[label] = now
+            labels.append(label)
+        return labels
+
+    def get_clusters(self) -> List[Dict[str, Any]]:
+        clusters = [
+            {
+                'id': label,
+                'size': count,
+                'keywords': [w for w, _ in self.words[label].most_common(5)],
+                'examples': list(self.examples[label]),
+                'last_seen': self.last_seen[label]
+            }
+            for label, count in enumerate(self.counts)
+        ]
+        clusters.sort(key=lambda c: c['size'], reverse=True)
+        return clusters
+
+
+class TopicPipeline:
+    """Embeds chat lines in batches, collapses near-duplicates and clusters topics for one room"""
+
+    def __init__(self, embedder: CachedEmbedder, clusters: int = 8, dedup_threshold: float = 0.9,
+                 dedup_window: int = 256):
+        self.embedder = embedder
+        self.dedup_threshold = dedup_threshold
+        self.kmeans = StreamingKMeans(clusters, embedder.dim)
+        self.recent = np.zeros((dedup_window, embedder.dim), dtype=np.float32)
+        self.recent_count = 0
+        self.recent_pos = 0
+        self._lock = threading.Lock()
+        self.stats = {'embedded': 0, 'collapsed': 0}
+
+    def process(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the messages that are not near-duplicates, updating the topic clusters"""
+        if not messages:
+            return []
+        texts = [m.get('message') or '' for m in messages]
+        with self._lock:
+            vectors = self.embedder.embed(texts)
+            self.stats['embedded'] += len(texts)
+
+            kept, kept_vectors, kept_texts = [], [], []
+            for message, vector, text in zip(messages, vectors, texts):
+                window = self.recent[:self.recent_count]
+                if self.recent_count and float(np.max(window @ vector)) >= self.dedup_threshold:
+                    self.stats['collapsed'] += 1
+                    continue
+                self.recent[self.recent_pos] = vector
+                self.recent_pos = (self.recent_pos + 1) % len(self.recent)
+                self.recent_count = min(self.recent_count + 1, len(self.recent))
+                kept.append(message)
+                kept_vectors.append(vector)
+                kept_texts.append(text)
+
+            if kept:
+                for message, label in zip(kept, self.kmeans.partial_fit(np.vstack(kept_vectors), kept_texts)):
+                    message['topic'] = label
+        return kept
+
+    def get_topics(self) -> Dict[str, Any]:
+        """Get current topic clusters and dedup statistics"""
+        with self._lock:
+            return {
+                'clusters': self.kmeans.get_clusters(),
+                'embedder': self.embedder.embedder.name,
+                'cache': {'hits': self.embedder.hits, 'misses': self.embedder.misses, 'size': len(self.embedder.cache)},
+                **self.stats
+            }
+
+
+def create_topic_pipeline(config: Dict[str, Any], api_key: Optional[str] = None) -> Optional[TopicPipeline]:
+    """Build the topic stage from config, or None when disabled or NumPy is missing"""
+    if not config.get('TOPIC_CLUSTERING'):
+        return None
+    if np is None:
+        logger.warning("TOPIC_CLUSTERING is enabled but numpy is not installed; topic stage disabled")
+        return None
+
+    kind = (config.get('EMBEDDING_BACKEND') or 'hashing').lower()
+    try:
+        if kind == 'local':
+            embedder = SentenceTransformerEmbedder(config.get('EMBEDDING_MODEL') or 'all-MiniLM-L6-v2')
+        elif kind == 'openai':
+            embedder = OpenAIEmbedder(api_key, config.get('EMBEDDING_MODEL') or 'text-embedding-3-small')
+        else:
+            embedder = HashingEmbedder()
+    except Exception as e:
+        logger.warning(f"Embedding backend '{kind}' unavailable ({e}), using hashing embedder")
+        embedder = HashingEmbedder()
+
+    return TopicPipeline(
+        CachedEmbedder(embedder, max_size=config.get('EMBEDDING_CACHE_SIZE', 4096)),
+        clusters=config.get('TOPIC_CLUSTERS', 8),
+        dedup_threshold=config.get('DEDUP_THRESHOLD', 0.9)
+    )
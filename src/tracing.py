@@ -0,0 +1,235 @@
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Iterable
+
+from .metrics import TRACE_STAGE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Points a chat message passes on its way to a reply, in order. A stage's
+# duration is the time from the previous stamp to its own.
+STAGES = ('frame', 'decode', 'buffer', 'select', 'llm_start', 'first_token', 'commit')
+_INGEST_STAGES = 3  # frame, decode, buffer - stamped on the chat client thread
+
+
+class Tracer:
+    """Per-room span tracing of chat messages, from socket frame to analysis commit.
+
+    The chat client opens a trace per ingested message (``begin``); the
+    analysis cycle collects the traces of the messages it selected
+    (``select``) and closes them with the stamps of its LLM call
+    (``finish``). Finished traces go to a bounded ring and the per-stage
+    histogram; traces of messages that never get selected fall out of the
+    ``max_open`` window and are only counted.
+    """
+
+    def __init__(self, room: str, capacity: int = 256, max_open: int = 2000, sample_rate: float = 1.0,
+                 exporter: Optional['OtlpExporter'] = None):
+        self.room = room
+        self.max_open = max_open
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.ring = deque(maxlen=capacity)
+        self._open: 'OrderedDict[int, List[float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stage_metrics = {stage: TRACE_STAGE_LATENCY.labels(room, stage) for stage in STAGES[1:]}
+        self.stats = {'started': 0, 'finished': 0, 'abandoned': 0}
+
+    def begin(self, message_id: int, frame: float, decode: float, buffer: float):
+        """Open a trace for an ingested message (wall-clock stamps)"""
+        if not frame or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return
+        with self._lock:
+            self._open[message_id] = [frame, decode, buffer]
+            self.stats['started'] += 1
+            if len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+                self.stats['abandoned'] += 1
+
+    def select(self, message_ids: Iterable[int], at: Optional[float] = None) -> List[tuple]:
+        """Take the open traces of messages picked for an analysis cycle"""
+        at = at or time.time()
+        batch = []
+        with self._lock:
+            for message_id in message_ids:
+                stamps = self._open.pop(message_id, None)
+                if stamps is not None:
+                    stamps.append(at)
+                    batch.append((message_id, stamps))
+        return batch
+
+    def finish(self, batch: List[tuple], stamps: Dict[str, float], outcome: str = 'ok'):
+        """Close the traces of a cycle with its ``llm_start``/``first_token``/``commit`` stamps"""
+        if not batch:
+            return
+        cycle = [(stage, stamps[stage]) for stage in STAGES[_INGEST_STAGES + 1:] if stamps.get(stage)]
+        for message_id, ingest in batch:
+            # A stage that was not reached (e.g. no first token on a fallback reply) is skipped,
+            # the next one is measured from the last stamp that exists
+            stages = {}
+            previous = ingest[0]
+            for stage, at in list(zip(STAGES[1:], ingest[1:])) + cycle:
+                duration = max(0.0, at - previous)
+                stages[stage] = duration
+                self._stage_metrics[stage].observe(duration)
+                previous = at
+            trace = {
+                'trace_id': os.urandom(16).hex(),
+                'message_id': message_id,
+                'room': self.room,
+                'start': ingest[0],
+                'end': previous,
+                'total': max(0.0, previous - ingest[0]),
+                'stages': stages,
+                'outcome': outcome
+            }
+            self.ring.append(trace)
+            if self.exporter:
+                self.exporter.submit(trace)
+        self.stats['finished'] += len(batch)
+
+    def get_traces(self, limit: int = 20) -> Dict[str, Any]:
+        """Per-stage latency summary over the ring and the slowest traces"""
+        traces = list(self.ring)
+        summary = {}
+        for stage in STAGES[1:]:
+            values = sorted(t['stages'][stage] for t in traces if stage in t['stages'])
+            if values:
+                summary[stage] = {
+                    'count': len(values),
+                    'p50': values[int(0.5 * (len(values) - 1))],
+                    'p95': values[int(0.95 * (len(values) - 1))],
+                    'max': values[-1]
+                }
+        slowest = sorted(traces, key=lambda t: t['total'], reverse=True)[:limit]
+        return {
+            'stages': summary,
+            'slowest': slowest,
+            'open': len(self._open),
+            'export': dict(self.exporter.stats) if self.exporter else None,
+            **self.stats
+        }
+
+    def close(self):
+        for stage in STAGES[1:]:
+            TRACE_STAGE_LATENCY.remove(self.room, stage)
+        if self.exporter:
+            self.exporter.close()
+
+
+class OtlpExporter:
+    """Ships finished traces to an OTLP/HTTP collector (JSON encoding) from a background thread.
+
+    Each trace becomes a root ``chat.message`` span with one child span per
+    stage. Spans are batched every ``flush_interval``; when the collector is
+    down or slow the queue fills up and new traces are dropped.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = 'pumpbot', flush_interval: float = 2.0,
+                 max_queue: int = 2048, timeout: float = 2.0):
+        import requests
+
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {'exported': 0, 'dropped': 0, 'errors': 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='otlp-exporter', daemon=True)
+        self._thread.start()
+
+    def submit(self, trace: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        traces = []
+        while True:
+            try:
+                traces.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if not traces:
+            return
+        try:
+            response = self.session.post(self.endpoint, json=self._encode(traces), timeout=self.timeout)
+            response.raise_for_status()
+            self.stats['exported'] += len(traces)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"OTLP export of {len(traces)} traces failed: {e}")
+
+    def _encode(self, traces: List[Dict[str, Any]]) -> Dict[str, Any]:
+        spans = []
+        for trace in traces:
+            root_id = os.urandom(8).hex()
+            attributes = [
+                {'key': 'pumpbot.room', 'value': {'stringValue': trace['room']}},
+                {'key': 'pumpbot.message_id', 'value': {'intValue': str(trace['message_id'])}},
+                {'key': 'pumpbot.outcome', 'value': {'stringValue': trace['outcome']}}
+            ]
+            spans.append(self._span(trace['trace_id'], root_id, None, 'chat.message',
+                                    trace['start'], trace['end'], attributes))
+            started = trace['start']
+            for stage in STAGES[1:]:
+                if stage not in trace['stages']:
+                    continue
+                ended = started + trace['stages'][stage]
+                spans.append(self._span(trace['trace_id'], os.urandom(8).hex(), root_id, stage, started, ended, []))
+                started = ended
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+                'scopeSpans': [{'scope': {'name': 'pumpbot.tracing'}, 'spans': spans}]
+            }]
+        }
+
+    @staticmethod
+    def _span(trace_id: str, span_id: str, parent_id: Optional[str], name: str, start: float, end: float,
+              attributes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        span = {
+            'traceId': trace_id,
+            'spanId': span_id,
+            'name': name,
+            'kind': 1,
+            'startTimeUnixNano': str(int(start * 1e9)),
+            'endTimeUnixNano': str(int(end * 1e9)),
+            'attributes': attributes
+        }
+        if parent_id:
+            span['parentSpanId'] = parent_id
+        return span
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(self.timeout + self.flush_interval)
+        self.session.close()
+
+
+def create_tracer(config: Dict[str, Any], room: str) -> Optional[Tracer]:
+    """Build the room tracer from config, or None when tracing is disabled"""
+    if not config.get('TRACE_ENABLED', True):
+        return None
+    exporter = None
+    if config.get('TRACE_OTLP_ENDPOINT'):
+        exporter = OtlpExporter(config.get('TRACE_OTLP_ENDPOINT'))
+    return Tracer(
+        room,
+        capacity=config.get('TRACE_CAPACITY', 256),
+        sample_rate=config.get('TRACE_SAMPLE_RATE', 1.0),
+        exporter=exporter
+    )
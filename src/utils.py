@@ -1,20 +1,19 @@
-import logging
 import time
 from typing import Dict, Any
 from collections import deque
 import json
 
-def setup_logging():
-    """Setup logging configuration"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('bot.log'),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger(__name__)
+def setup_logging(config: Dict[str, Any] = None, log_file: str = None):
+    """Setup logging configuration (queued, rotating, rate-limited - see log_pipeline)"""
+    from .log_pipeline import setup_logging as setup_pipeline
+
+    return setup_pipeline(config, log_file)
+
+def shutdown_logging():
+    """Flush and stop the background log writer"""
+    from .log_pipeline import shutdown_logging as shutdown_pipeline
+
+    shutdown_pipeline()
 
 def create_message_buffer(maxlen: int = 100) -> deque:
     """Create a message buffer with timestamp"""
@@ -69,6 +68,14 @@ def format_message_for_analysis(messages: list) -> str:
     
     return "\n".join(formatted)
 
+def parse_keywords(value) -> list:
+    """Parse a comma-separated keyword setting into a lowercase list"""
+    if isinstance(value, (list, tuple)):
+        words = value
+    else:
+        words = str(value or '').split(',')
+    return [w.strip().lower() for w in words if w and w.strip()]
+
 def validate_token_address(address: str) -> bool:
     """Validate Solana token address format"""
     if not address or not isinstance(address, str):